@@ -1,6 +1,9 @@
 # API main entry point 
 import os
+import sqlite3
 from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
@@ -16,6 +19,15 @@ login_manager.login_view = 'auth.login'
 # login_manager.login_message = "Please log in to access this page."
 # login_manager.login_message_category = "info"
 
+# SQLite ignores foreign keys (and therefore ON DELETE CASCADE) unless enabled per connection.
+# PostgreSQL always enforces them, so this only matters for the fallback SQLite database.
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 def create_app(config_class=Config):
     """Factory function to create and configure the Flask application."""
     app = Flask(__name__)
@@ -43,6 +55,17 @@ def create_app(config_class=Config):
     from .main import main as main_blueprint
     app.register_blueprint(main_blueprint) # No prefix for main routes like /scan, /orders etc.
 
+    from .analytics import analytics as analytics_blueprint
+    app.register_blueprint(analytics_blueprint, url_prefix='/analytics')
+
+    # Per-class concurrency limits; excess requests get 503 + Retry-After (see api/admission.py)
+    from . import admission
+    admission.init_app(app)
+
+    # Compress large responses for clients that accept it (see api/compression.py)
+    from . import compression
+    compression.init_app(app)
+
     # The user loader callback is used to reload the user object from the user ID stored in the session
     # We will define the User model in models.py
     # Need to ensure models.py is imported AFTER db is initialized but before it's used here.
@@ -0,0 +1,116 @@
+# Priority-aware admission control: per-class concurrency limits with fast 503s
+import threading
+import time
+from flask import current_app, request
+from .wire import jsonify
+from . import metrics
+
+# Every request is classified by endpoint. Each class may run at most its limit
+# of requests at once in this worker process; the excess is turned away at once
+# with 503 + Retry-After instead of piling up on a slow database until every
+# client times out together.
+#   scan    scan writes; wait up to ADMISSION_SCAN_WAIT for a slot
+#   read    list/detail reads; refused immediately, and also while scans are waiting
+#   export  analytics reports; same as read with its own (small) limit
+# Unclassified endpoints (login, logout, the event stream, admin writes) are not limited.
+SCAN_ENDPOINTS = {'main.record_scan', 'main.record_scans', 'main.update_scan', 'main.delete_scan'}
+EXPORT_BLUEPRINTS = {'analytics'}
+UNLIMITED_ENDPOINTS = {'main.index', 'main.event_stream', 'main.login', 'main.logout',
+                       'auth.login', 'auth.logout', 'static'}
+_ENVIRON_KEY = 'api.admission' # Stored per request environ, so /batch sub-requests never release it
+
+
+def classify(endpoint, method):
+    """Returns 'scan', 'read', 'export' or None (not limited) for a request."""
+    if endpoint is None or endpoint in UNLIMITED_ENDPOINTS:
+        return None
+    if endpoint in SCAN_ENDPOINTS:
+        return 'scan'
+    if endpoint.partition('.')[0] in EXPORT_BLUEPRINTS:
+        return 'export'
+    if method in ('GET', 'HEAD') or endpoint == 'main.batch':
+        return 'read'
+    return None
+
+
+class AdmissionController:
+    """Counts in-flight requests per class; thread-safe."""
+
+    def __init__(self, limits, scan_wait):
+        self.limits = dict(limits)
+        self.scan_wait = scan_wait
+        self.in_flight = {name: 0 for name in self.limits}
+        self.rejected = {name: 0 for name in self.limits}
+        self.scans_waiting = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(limits={'scan': config.get('ADMISSION_SCAN_LIMIT', 6),
+                           'read': config.get('ADMISSION_READ_LIMIT', 8),
+                           'export': config.get('ADMISSION_EXPORT_LIMIT', 1)},
+                   scan_wait=config.get('ADMISSION_SCAN_WAIT', 2.0))
+
+    def try_acquire(self, name):
+        """Takes a slot in class `name`; returns False if the request must be refused."""
+        with self._cond:
+            if name == 'scan':
+                deadline = time.monotonic() + self.scan_wait
+                self.scans_waiting += 1
+                try:
+                    while self.in_flight['scan'] >= self.limits['scan']:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected['scan'] += 1
+                            return False
+                        self._cond.wait(remaining)
+                finally:
+                    self.scans_waiting -= 1
+            elif self.in_flight[name] >= self.limits[name] or self.scans_waiting:
+                # Lower classes never queue, and step aside while scans are waiting
+                self.rejected[name] += 1
+                return False
+            self.in_flight[name] += 1
+            return True
+
+    def release(self, name):
+        with self._cond:
+            self.in_flight[name] -= 1
+            self._cond.notify_all()
+
+    def status(self):
+        with self._cond:
+            return {name: {"limit": self.limits[name], "in_flight": self.in_flight[name],
+                           "rejected": self.rejected[name]} for name in self.limits}
+
+
+def _controller():
+    return current_app.extensions['admission']
+
+
+def _admit():
+    name = classify(request.endpoint, request.method)
+    if name is None:
+        return None
+    t0 = time.perf_counter()
+    admitted = _controller().try_acquire(name)
+    metrics.observe(f'admission_wait_{name}', time.perf_counter() - t0)
+    if not admitted:
+        retry_after = current_app.config.get('ADMISSION_RETRY_AFTER', {}).get(name, 1)
+        current_app.logger.warning(f"Admission: refused {request.method} {request.path} ({name} class at capacity or yielding to scans).")
+        return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": str(retry_after)}
+    request.environ[_ENVIRON_KEY] = name
+    return None
+
+
+def _release(exc=None):
+    name = request.environ.pop(_ENVIRON_KEY, None)
+    if name is not None:
+        _controller().release(name)
+
+
+def init_app(app):
+    if app.config.get('ADMISSION_CONTROL', True):
+        app.extensions['admission'] = AdmissionController.from_config(app.config)
+        app.before_request(_admit)
+        app.teardown_request(_release)
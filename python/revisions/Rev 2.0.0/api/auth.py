@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify, flash, current_app
+from flask import Blueprint, request, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from .models import User, db # Import User model and db instance
+from .wire import jsonify, get_request_data
+from . import passwords, metrics
 
 # Create a Blueprint object for authentication routes
 auth = Blueprint('auth', __name__)
@@ -12,7 +14,7 @@ def login():
         # If user is already logged in, prevent re-login
         return jsonify({"message": "Already logged in", "user": current_user.username}), 200
 
-    data = request.get_json()
+    data = get_request_data()
     if not data or not data.get('username') or not data.get('password'):
         return jsonify({"message": "Username and password required"}), 400
 
@@ -20,26 +22,27 @@ def login():
     password = data.get('password')
     remember = data.get('remember', False) # Optional "remember me" functionality
 
-    # Find user by username (case-insensitive search might be better in production)
-    user = db.session.scalars(db.select(User).filter_by(username=username)).first()
+    with metrics.timed('login'):
+        # Find user by username (case-insensitive search might be better in production)
+        user = db.session.scalars(db.select(User).filter_by(username=username)).first()
 
-    # Validate user and password
-    if user is None or not user.check_password(password):
-        # flash('Invalid username or password') # Flashing is more for web forms
-        return jsonify({"message": "Invalid username or password"}), 401 # Unauthorized
+        # Validate user and password (hashed in the password pool, see api/passwords.py)
+        try:
+            valid = user is not None and passwords.check_user_password(user, password)
+        except passwords.PasswordServiceBusy as e:
+            current_app.logger.warning(f"Login for '{username}' rejected: password queue full.")
+            return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": str(e.retry_after)}
+        if not valid:
+            # flash('Invalid username or password') # Flashing is more for web forms
+            return jsonify({"message": "Invalid username or password"}), 401 # Unauthorized
+        db.session.commit() # Persists a rehashed password, if any
 
     # Log the user in using Flask-Login
     # The session cookie will be set by Flask-Login
     login_user(user, remember=remember)
     
     # Include user details in the response for the GUI client
-    user_data = {
-        "id": user.id,
-        "username": user.username,
-        "role": user.role.name.value,
-        "department_id": user.department_id,
-        "department_name": user.department.name if user.department else ""
-    }
+    user_data = user.to_dict(missing_department="")
     
     current_app.logger.info(f"User '{username}' logged in successfully.")
     return jsonify({
@@ -70,11 +73,5 @@ def register():
 @login_required
 def me():
     """Returns current logged-in user information."""
-    user_data = {
-        "id": current_user.id,
-        "username": current_user.username,
-        "role": current_user.role.name.value,
-        "department_id": current_user.department_id,
-        "department_name": current_user.department.name if current_user.department else ""
-    }
+    user_data = current_user.to_dict(missing_department="")
     return jsonify({"user": user_data}), 200 
\ No newline at end of file
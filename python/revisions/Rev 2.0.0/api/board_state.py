@@ -0,0 +1,98 @@
+# Current location of every board (board_state table), kept in step with scan writes
+from sqlalchemy.dialects import postgresql, sqlite
+from .models import db, BoardState, Scan
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+_STATE_COLUMNS = ('department_id', 'status', 'last_scan_at', 'order_id', 'last_scan_id')
+REBUILD_CHUNK = 500 # Barcodes per rebuild statement (keeps IN lists under database parameter limits)
+
+
+def apply_scans(scans):
+    """Moves boards to the department of their newly recorded scans.
+
+    `scans` are dicts with id, barcode, department_id, status, timestamp and order_id.
+    Call inside the writing transaction (after the scans have IDs), before commit.
+    """
+    latest = {}
+    for scan in scans:
+        current = latest.get(scan['barcode'])
+        if current is None or (scan['timestamp'], scan['id']) >= (current['timestamp'], current['id']):
+            latest[scan['barcode']] = scan
+    if not latest:
+        return
+    rows = [{
+        "barcode": scan['barcode'],
+        "department_id": scan['department_id'],
+        "status": scan['status'],
+        "last_scan_at": scan['timestamp'],
+        "order_id": scan['order_id'],
+        "last_scan_id": scan['id'],
+    } for scan in latest.values()]
+
+    insert = _UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is None:
+        for row in rows: # Fallback for other databases (not safe against concurrent writers)
+            db.session.merge(BoardState(**row))
+        return
+    # executemany with bound parameters, so the statement compiles once and is cached
+    stmt = insert(BoardState.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BoardState.barcode],
+        set_={column: stmt.excluded[column] for column in _STATE_COLUMNS},
+        where=BoardState.last_scan_at <= stmt.excluded.last_scan_at, # Never move a board back in time
+    )
+    db.session.execute(stmt, rows)
+
+
+def status_changed(scan):
+    """Mirrors an edited scan status if that scan is the board's latest. Call before commit."""
+    db.session.execute(
+        db.update(BoardState).where(BoardState.last_scan_id == scan.id).values(status=scan.status)
+    )
+
+
+def latest_scan_barcodes(scan_condition):
+    """Barcodes of the boards whose latest scan matches `scan_condition` (e.g. Scan.order_id == 3).
+
+    Those board_state rows go with their scan (ON DELETE CASCADE), so read them before
+    deleting scans in bulk (an order, a user) and rebuild() them after the delete.
+    """
+    return db.session.scalars(
+        db.select(BoardState.barcode).join(Scan, Scan.id == BoardState.last_scan_id).where(scan_condition)
+    ).all()
+
+
+def rebuild(barcodes=None):
+    """Recomputes board state from scan history, for all boards or just `barcodes`.
+
+    Used after scans are deleted and by `flask rebuild-board-state`. Does not commit.
+    """
+    if barcodes is not None:
+        barcodes = list(barcodes)
+        return sum(_rebuild(barcodes[start:start + REBUILD_CHUNK]) for start in range(0, len(barcodes), REBUILD_CHUNK))
+    return _rebuild(None)
+
+
+def _rebuild(barcodes):
+    delete = db.delete(BoardState)
+    ranked = db.select(
+        Scan.barcode, Scan.department_id, Scan.status, Scan.timestamp, Scan.order_id, Scan.id,
+        db.func.row_number().over(
+            partition_by=Scan.barcode, order_by=(Scan.timestamp.desc(), Scan.id.desc())
+        ).label('rank'),
+    )
+    if barcodes is not None:
+        delete = delete.where(BoardState.barcode.in_(barcodes))
+        ranked = ranked.where(Scan.barcode.in_(barcodes))
+    ranked = ranked.subquery()
+    db.session.execute(delete)
+    result = db.session.execute(
+        db.insert(BoardState.__table__).from_select(
+            ['barcode', *_STATE_COLUMNS],
+            db.select(ranked.c.barcode, ranked.c.department_id, ranked.c.status,
+                      ranked.c.timestamp, ranked.c.order_id, ranked.c.id)
+            .where(ranked.c.rank == 1)
+        )
+    )
+    return result.rowcount
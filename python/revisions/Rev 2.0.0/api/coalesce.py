@@ -0,0 +1,102 @@
+# Request coalescing for idempotent list routes
+import threading
+import time
+from functools import wraps
+from flask import current_app, request, make_response
+from flask_login import current_user
+
+# Entries are either in flight (done not set) or cached until expires_at.
+# Keyed by (endpoint, view args, query args, Accept header, authorization scope).
+_flights = {}
+_lock = threading.Lock()
+_PURGE_THRESHOLD = 256
+
+
+class _Flight:
+    """One shared execution of a view; followers wait on `done` and reuse the body."""
+    __slots__ = ('done', 'body', 'status', 'content_type', 'expires_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.body = None
+        self.status = None
+        self.content_type = None
+        self.expires_at = None
+
+    def is_expired(self, now):
+        return self.done.is_set() and (self.expires_at is None or self.expires_at <= now)
+
+
+def role_scope():
+    """Responses differ per role/department (the default)."""
+    return ('role', current_user.role_id, current_user.department_id)
+
+
+def shared_scope():
+    """Responses are identical for every authenticated user."""
+    return ('authenticated',)
+
+
+def coalesced(scope=role_scope):
+    """Decorator: concurrent identical GETs in this worker share one execution.
+
+    The first request (the leader) runs the view; identical requests arriving
+    while it runs wait for its serialized body instead of querying the DB again.
+    Successful bodies stay cached for COALESCE_TTL_SECONDS to absorb bursts such
+    as every station logging in at shift start. Must be applied after login_required.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))),
+                   request.headers.get('Accept'), scope()) # Accept picks the wire format
+            now = time.monotonic()
+            with _lock:
+                flight = _flights.get(key)
+                if flight is not None and flight.is_expired(now):
+                    flight = None
+                is_leader = flight is None
+                if is_leader:
+                    if len(_flights) > _PURGE_THRESHOLD:
+                        _purge_expired(now)
+                    flight = _Flight()
+                    _flights[key] = flight
+
+            if not is_leader:
+                wait_seconds = current_app.config.get('COALESCE_WAIT_SECONDS', 10)
+                if flight.done.wait(wait_seconds) and flight.body is not None:
+                    return current_app.response_class(flight.body, status=flight.status,
+                                                      content_type=flight.content_type)
+                # Leader failed or is too slow - serve this request on its own
+                return f(*args, **kwargs)
+
+            response = None
+            try:
+                response = make_response(f(*args, **kwargs))
+                return response
+            finally:
+                ttl = current_app.config.get('COALESCE_TTL_SECONDS', 0)
+                with _lock:
+                    if response is not None and response.status_code < 400 and not response.is_streamed:
+                        flight.body = response.get_data()
+                        flight.status = response.status_code
+                        flight.content_type = response.content_type
+                        flight.expires_at = time.monotonic() + ttl
+                    elif _flights.get(key) is flight:
+                        del _flights[key] # Never cache errors
+                flight.done.set()
+        return decorated_function
+    return decorator
+
+
+def invalidate(*endpoints):
+    """Drops cached and in-flight entries for the given endpoints (call after writes)."""
+    with _lock:
+        for key in [k for k in _flights if k[0] in endpoints]:
+            del _flights[key]
+
+
+def _purge_expired(now):
+    for key in [k for k, flight in _flights.items() if flight.is_expired(now)]:
+        del _flights[key]
@@ -0,0 +1,103 @@
+# Negotiated response compression (brotli / gzip / deflate)
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError: # Optional - gzip and deflate are always available
+    brotli = None
+
+# Only bodies that compress well; images, archives etc. are already compressed.
+# Server-sent events are left alone so every event reaches the client immediately.
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/msgpack',
+    'text/csv',
+    'text/plain',
+    'text/html',
+}
+
+
+def supported_encodings():
+    """Encodings this server can produce, in order of preference."""
+    return (['br'] if brotli is not None else []) + ['gzip', 'deflate']
+
+
+class _Encoder:
+    """Incremental compressor with one interface for brotli and zlib."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=current_app.config.get('COMPRESS_BROTLI_QUALITY', 5))
+        else:
+            # gzip = zlib stream with a gzip header (wbits 16+15); HTTP "deflate" = zlib format (wbits 15)
+            wbits = 31 if encoding == 'gzip' else 15
+            self._compressor = zlib.compressobj(current_app.config.get('COMPRESS_LEVEL', 6), zlib.DEFLATED, wbits)
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def _negotiate():
+    """Returns the client's preferred supported encoding, or None for identity."""
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+def _compress_stream(chunks, encoder):
+    # Yield compressed output as it becomes available; the compressor buffers small chunks
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            compressed = encoder.compress(chunk)
+            if compressed:
+                yield compressed
+        yield encoder.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response):
+    """after_request hook: compresses eligible responses for clients that accept it.
+
+    Buffered bodies are compressed only above COMPRESS_MIN_SIZE bytes (small bodies
+    gain nothing). Streamed bodies (export routes) are compressed incrementally.
+    """
+    if (request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding') # Body depends on it from here on
+    encoding = _negotiate()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, _Encoder(encoding))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+            return response
+        encoder = _Encoder(encoding)
+        response.set_data(encoder.compress(data) + encoder.finish()) # Also updates Content-Length
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app):
+    if app.config.get('COMPRESS_RESPONSES', True):
+        app.after_request(compress_response)
+        app.logger.info(f"Response compression enabled ({', '.join(supported_encodings())}).")
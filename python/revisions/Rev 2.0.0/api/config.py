@@ -42,5 +42,58 @@ class Config:
         except Exception:
              print(f"[Config Debug] Using configured database URI (unmasked): {SQLALCHEMY_DATABASE_URI}")
 
+    # Request coalescing for list routes (see api/coalesce.py).
+    # Identical GETs share one query; successful bodies are reused for this many seconds.
+    COALESCE_TTL_SECONDS = float(os.environ.get('COALESCE_TTL_SECONDS', 1.0))
+    COALESCE_WAIT_SECONDS = 10 # Followers give up on a slow leader and query themselves
+
+    # Workers re-check the reference-data generation counter (api/refdata.py) this often
+    REFDATA_CHECK_SECONDS = float(os.environ.get('REFDATA_CHECK_SECONDS', 5))
+
+    # Negotiated response compression (see api/compression.py)
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', 'true').lower() in ('true', '1', 'yes')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024)) # Bytes; smaller bodies are sent as-is
+    COMPRESS_LEVEL = 6 # gzip/deflate level (1-9)
+    COMPRESS_BROTLI_QUALITY = 5 # brotli quality (0-11); higher levels are too slow for dynamic responses
+
+    # Line-protocol listener for fixed-mount scanners (`flask scan-listener`, see api/scan_listener.py)
+    SCAN_LISTENER_HOST = os.environ.get('SCAN_LISTENER_HOST', '0.0.0.0')
+    SCAN_LISTENER_PORT = int(os.environ.get('SCAN_LISTENER_PORT', 5001))
+    SCAN_LISTENER_BATCH_SIZE = int(os.environ.get('SCAN_LISTENER_BATCH_SIZE', 500)) # Max scans per transaction
+    SCAN_LISTENER_MAX_LINE = 1024 # Bytes
+
+    # Columnar scan snapshot for reporting (`flask snapshot-scans`, see api/snapshot.py).
+    # When set, /analytics reads the snapshot instead of the scans table.
+    SCAN_SNAPSHOT_DIR = os.environ.get('SCAN_SNAPSHOT_DIR')
+    SCAN_SNAPSHOT_LAG_SECONDS = 60 # Export only scans at least this old (late-committing transactions)
+
+    # Streaming fail-rate monitor (see api/live_stats.py): an alert is raised when a key's
+    # EWMA fail rate reaches the threshold (after MIN_SCANS scans) and cleared below 80% of it
+    LIVE_STATS_EWMA_ALPHA = float(os.environ.get('LIVE_STATS_EWMA_ALPHA', 0.05)) # ~ last 20 scans
+    LIVE_STATS_FAIL_THRESHOLD = float(os.environ.get('LIVE_STATS_FAIL_THRESHOLD', 0.10))
+    LIVE_STATS_MIN_SCANS = 20
+    LIVE_STATS_WINDOW_MINUTES = 60 # Rolling counts window
+
+    # Password hashing (see api/passwords.py and benchmarks/bench_password_hash.py).
+    # Existing hashes made with another method are upgraded on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 4))) # 0 = hash on the request thread
+    PASSWORD_MAX_PENDING = int(os.environ.get('PASSWORD_MAX_PENDING', 32)) # Queued + running hashes before logins get 503
+    PASSWORD_QUEUE_TIMEOUT = 5 # Seconds a login waits for a queue slot
+    PASSWORD_HASH_TIMEOUT = 30 # Seconds
+    PASSWORD_RETRY_AFTER = 2 # Retry-After (seconds) sent with 503
+
+    # Admission control (see api/admission.py). Limits are per worker process; keep the
+    # sum of a process's limits at or below its database connection pool size (SQLAlchemy's
+    # default: 5 + 10 overflow = 15). Keep the read limit above the GUI's [Transport] pool_size
+    # (6 by default, gui/transport.py): that is how many calls one station makes at once, e.g.
+    # its initial reads at login, and a lone station should never be turned away by an idle server.
+    ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', 'true').lower() in ('true', '1', 't')
+    ADMISSION_SCAN_LIMIT = int(os.environ.get('ADMISSION_SCAN_LIMIT', 6))
+    ADMISSION_READ_LIMIT = int(os.environ.get('ADMISSION_READ_LIMIT', 8))
+    ADMISSION_EXPORT_LIMIT = int(os.environ.get('ADMISSION_EXPORT_LIMIT', 1))
+    ADMISSION_SCAN_WAIT = 2.0 # Seconds a scan write may queue for a slot before 503
+    ADMISSION_RETRY_AFTER = {'scan': 1, 'read': 2, 'export': 10} # Retry-After seconds per class
+
     # Add other configuration variables as needed
     # e.g., MAIL_SERVER, MAIL_PORT, etc. 
\ No newline at end of file
@@ -0,0 +1,98 @@
+# In-process publish/subscribe for server-sent events (GET /stream)
+import queue
+import threading
+import time
+from .wire import encode_json
+
+# Each subscriber gets a bounded queue. A client too slow to keep up is sent a
+# final "resync" event and disconnected instead of buffering without limit;
+# it should reload its data and reconnect.
+_subscribers = set()
+_lock = threading.Lock()
+_SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class Subscriber:
+    """One connected stream client.
+
+    `visible(event_type, data)`, if given, returns what of an event this client may
+    see: the data (possibly narrowed), or None to skip the event.
+    """
+
+    def __init__(self, event_types=None, visible=None):
+        self.event_types = set(event_types) if event_types else None
+        self.visible = visible
+        self.queue = queue.Queue(maxsize=_SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event_type):
+        return self.event_types is None or event_type in self.event_types
+
+
+def subscribe(event_types=None, visible=None):
+    subscriber = Subscriber(event_types, visible)
+    with _lock:
+        _subscribers.add(subscriber)
+    return subscriber
+
+
+def unsubscribe(subscriber):
+    with _lock:
+        _subscribers.discard(subscriber)
+
+
+def publish(event_type, data):
+    """Sends an event to every interested subscriber in this process (never blocks)."""
+    with _lock:
+        subscribers = list(_subscribers)
+    for subscriber in subscribers:
+        if subscriber.overflowed or not subscriber.wants(event_type):
+            continue
+        subscriber_data = subscriber.visible(event_type, data) if subscriber.visible else data
+        if subscriber_data is None:
+            continue
+        try:
+            subscriber.queue.put_nowait((event_type, subscriber_data))
+        except queue.Full:
+            subscriber.overflowed = True
+
+
+def publish_change(table, op, items=(), where=None):
+    """Publishes a 'change' event: rows of `table` ("scans", "orders") were inserted, updated or deleted.
+
+    `items` are small dicts identifying the rows (at least "id"; scans also carry
+    department_id, which GET /stream uses to show each client only what it may read).
+    A bulk change is published as `where` instead, e.g. {"order_id": 5} for all of an
+    order's scans deleted with it, without reading or listing the rows.
+    Clients read the rows themselves through the regular routes. Call after commit.
+    """
+    items = list(items)
+    if items or where:
+        data = {"table": table, "op": op, "items": items}
+        if where:
+            data["where"] = where
+        publish('change', data)
+
+
+def format_event(event_type, data):
+    return f"event: {event_type}\ndata: {encode_json(data).rstrip()}\n\n"
+
+
+def stream(subscriber, initial_events=(), heartbeat_seconds=15):
+    """Yields SSE-formatted events for `subscriber` until the client goes away."""
+    try:
+        yield ": connected\n\n" # Sends the response headers now, not with the first event or heartbeat
+        for event_type, data in initial_events:
+            yield format_event(event_type, data)
+        while True:
+            if subscriber.overflowed:
+                yield format_event('resync', {"reason": "client too slow, events were dropped"})
+                return
+            try:
+                event_type, data = subscriber.queue.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield f": heartbeat {int(time.time())}\n\n" # Comment line keeps proxies from timing out
+                continue
+            yield format_event(event_type, data)
+    finally:
+        unsubscribe(subscriber)
@@ -0,0 +1,171 @@
+# Streaming fail-rate statistics per order, department and user
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from .models import ScanStatus
+from . import events
+
+# Fed with every committed scan; never queries history. Each key keeps an EWMA of
+# its fail rate plus per-minute pass/fail counts in a fixed ring, so memory per
+# key is constant. State is per process and starts empty on restart.
+KINDS = ('order', 'department', 'user')
+_IDLE_SECONDS = 24 * 3600 # Keys without scans for this long are dropped
+_PRUNE_EVERY = 10_000 # Scans between idle-key sweeps
+
+
+class KeyStats:
+    """EWMA fail rate and rolling per-minute counts for one order/department/user."""
+    __slots__ = ('ewma', 'total', 'fails', 'last_seen', 'alerting',
+                 'ring_totals', 'ring_fails', 'ring_minute', 'window_total', 'window_fails')
+
+    def __init__(self, window_minutes):
+        self.ewma = 0.0
+        self.total = 0 # Since this process started
+        self.fails = 0
+        self.last_seen = None
+        self.alerting = False
+        self.ring_totals = [0] * window_minutes
+        self.ring_fails = [0] * window_minutes
+        self.ring_minute = None # Minute number of the newest ring slot
+        self.window_total = 0 # Running sums over the ring
+        self.window_fails = 0
+
+    def _advance(self, minute):
+        # Clear slots for minutes that passed since the last scan (at most one full turn)
+        size = len(self.ring_totals)
+        if self.ring_minute is None:
+            self.ring_minute = minute
+            return
+        for m in range(self.ring_minute + 1, min(minute, self.ring_minute + size) + 1):
+            slot = m % size
+            self.window_total -= self.ring_totals[slot]
+            self.window_fails -= self.ring_fails[slot]
+            self.ring_totals[slot] = self.ring_fails[slot] = 0
+        self.ring_minute = max(self.ring_minute, minute)
+
+    def add(self, failed, now, alpha):
+        minute = int(now // 60)
+        self._advance(minute)
+        slot = minute % len(self.ring_totals)
+        self.ring_totals[slot] += 1
+        self.window_total += 1
+        if failed:
+            self.ring_fails[slot] += 1
+            self.window_fails += 1
+            self.fails += 1
+        self.total += 1
+        # Warm-up: until 1/alpha scans have been seen this is the plain running mean
+        weight = max(alpha, 1.0 / self.total)
+        self.ewma += weight * (float(failed) - self.ewma)
+        self.last_seen = now
+
+    def to_dict(self, now):
+        self._advance(int(now // 60)) # Age out minutes without scans before reporting
+        return {
+            "ewma_fail_rate": round(self.ewma, 4),
+            "window_total": self.window_total,
+            "window_fails": self.window_fails,
+            "window_fail_rate": round(self.window_fails / self.window_total, 4) if self.window_total else None,
+            "total": self.total,
+            "fails": self.fails,
+            "last_scan_at": datetime.fromtimestamp(self.last_seen, tz=timezone.utc) if self.last_seen else None,
+            "alerting": self.alerting,
+        }
+
+
+class LiveStats:
+    """All keys plus alert evaluation; thread-safe."""
+
+    def __init__(self, alpha, threshold, clear_threshold, min_scans, window_minutes):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.clear_threshold = clear_threshold
+        self.min_scans = min_scans
+        self.window_minutes = window_minutes
+        self.keys = {}
+        self._lock = threading.Lock()
+        self._since_prune = 0
+
+    @classmethod
+    def from_config(cls, config):
+        threshold = config.get('LIVE_STATS_FAIL_THRESHOLD', 0.10)
+        return cls(alpha=config.get('LIVE_STATS_EWMA_ALPHA', 0.05),
+                   threshold=threshold,
+                   clear_threshold=config.get('LIVE_STATS_CLEAR_THRESHOLD', threshold * 0.8),
+                   min_scans=config.get('LIVE_STATS_MIN_SCANS', 20),
+                   window_minutes=config.get('LIVE_STATS_WINDOW_MINUTES', 60))
+
+    def record(self, scans, now=None):
+        """Adds committed scans (dicts with order_id, department_id, user_id, status).
+
+        Returns the alert transitions this caused, as (kind, id, raised, stats dict).
+        """
+        now = time.time() if now is None else now
+        transitions = []
+        with self._lock:
+            for scan in scans:
+                failed = scan['status'] in (ScanStatus.FAIL, ScanStatus.FAIL.value)
+                for kind in KINDS:
+                    key = (kind, scan[f'{kind}_id'])
+                    stats = self.keys.get(key)
+                    if stats is None:
+                        stats = self.keys[key] = KeyStats(self.window_minutes)
+                    stats.add(failed, now, self.alpha)
+                    if not stats.alerting and stats.total >= self.min_scans and stats.ewma >= self.threshold:
+                        stats.alerting = True
+                        transitions.append((kind, key[1], True, stats.to_dict(now)))
+                    elif stats.alerting and stats.ewma < self.clear_threshold:
+                        stats.alerting = False
+                        transitions.append((kind, key[1], False, stats.to_dict(now)))
+            self._since_prune += len(scans)
+            if self._since_prune >= _PRUNE_EVERY:
+                self._prune(now)
+        return transitions
+
+    def _prune(self, now):
+        self._since_prune = 0
+        for key in [key for key, stats in self.keys.items() if now - stats.last_seen > _IDLE_SECONDS]:
+            del self.keys[key]
+
+    def snapshot(self, kind=None, key_id=None, now=None):
+        """Current stats as [{"kind", "id", ...}], optionally for one kind or key."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return [dict(kind=k, id=i, **stats.to_dict(now)) for (k, i), stats in self.keys.items()
+                    if (kind is None or k == kind) and (key_id is None or i == key_id)]
+
+    def alerts(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            return [dict(kind=k, id=i, **stats.to_dict(now)) for (k, i), stats in self.keys.items() if stats.alerting]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def engine():
+    """The process-wide LiveStats, configured from the current app on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LiveStats.from_config(current_app.config)
+    return _engine
+
+
+def record_scans(scans):
+    """Feeds committed scans to the live stats and publishes alert changes on the event stream.
+
+    Call after commit. Never raises: monitoring must not fail a scan write.
+    """
+    try:
+        for kind, key_id, raised, stats in engine().record(scans):
+            event = dict(kind=kind, id=key_id, raised=raised, threshold=engine().threshold, **stats)
+            events.publish('alert', event)
+            log = current_app.logger.warning if raised else current_app.logger.info
+            log(f"Live stats: fail-rate alert {'raised' if raised else 'cleared'} for {kind} {key_id} "
+                f"(EWMA {stats['ewma_fail_rate']:.1%}).")
+    except Exception as e:
+        current_app.logger.error(f"Live stats update failed: {e}")
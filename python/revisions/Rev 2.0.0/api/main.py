@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, current_app, Response, stream_with_context
 from flask_login import login_required, current_user, login_user, logout_user
 from functools import wraps
-from .models import db, Order, User, Scan, ScanStatus, RoleType, Role, Department, Comment
+from werkzeug.exceptions import HTTPException
+from .models import db, Order, User, Scan, ScanStatus, RoleType, Role, Department, Comment, BoardState
+from .coalesce import coalesced, shared_scope, invalidate
+from . import refdata, scan_rules, board_state, live_stats, events, passwords, metrics
+from .wire import jsonify, get_request_data, decode_response
 import logging
 
 main = Blueprint('main', __name__)
@@ -12,7 +16,7 @@ def role_required(role_enum):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not current_user.is_authenticated or not hasattr(current_user, 'role') or current_user.role.name != role_enum:
+            if not current_user.is_authenticated or current_user.role_type != role_enum:
                 return jsonify({"message": f"Requires {role_enum.value} role"}), 403
             return f(*args, **kwargs)
         return decorated_function
@@ -23,9 +27,9 @@ def roles_required(*role_enums):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if not current_user.is_authenticated or not hasattr(current_user, 'role'):
+            if not current_user.is_authenticated:
                 return jsonify({"message": "Authentication required"}), 401
-            user_role_name = current_user.role.name
+            user_role_name = current_user.role_type
             if user_role_name not in role_enums:
                 allowed_roles_str = ', '.join([r.value for r in role_enums])
                 return jsonify({"message": f"Requires one of the following roles: {allowed_roles_str}"}), 403
@@ -40,13 +44,69 @@ def index():
     return jsonify({"message": "API is running"})
 
 
+# --- Batch Read Route ---
+# Read-only endpoints that may be combined in a single POST /batch call
+BATCHABLE_ENDPOINTS = {
+    'main.get_orders', 'main.search_orders', 'main.get_scans', 'main.get_users', 'main.get_departments',
+    'main.me', 'auth.me', 'main.get_wip', 'main.get_board', 'main.get_live_stats',
+}
+MAX_BATCH_REQUESTS = 20
+
+@main.route('/batch', methods=['POST'])
+@login_required
+def batch():
+    """Runs several read sub-requests in one round trip.
+
+    Body: {"requests": [{"path": "/orders"}, {"path": "/scans", "params": {"order_id": 3}}]}
+    Each sub-request is dispatched to its normal view inside this request's app
+    context, so they all share one DB session and the already-loaded current_user.
+    """
+    data = get_request_data()
+    sub_requests = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"message": "Missing required field: requests (non-empty list)"}), 400
+    if len(sub_requests) > MAX_BATCH_REQUESTS:
+        return jsonify({"message": f"Too many sub-requests (max {MAX_BATCH_REQUESTS})"}), 400
+
+    url_adapter = current_app.url_map.bind('localhost')
+    # Sub-requests get only what the views look at: the login cookies and content negotiation
+    # (the caller's other headers, e.g. Content-Length and Content-Type, describe the batch body)
+    auth_cookies = (current_app.config.get('SESSION_COOKIE_NAME', 'session'),
+                    current_app.config.get('REMEMBER_COOKIE_NAME', 'remember_token'))
+    sub_headers = {'Accept': request.headers.get('Accept', '*/*')}
+    cookie = '; '.join(f"{name}={value}" for name, value in request.cookies.items() if name in auth_cookies)
+    if cookie:
+        sub_headers['Cookie'] = cookie
+    results = []
+    for sub in sub_requests:
+        path = sub.get('path') if isinstance(sub, dict) else None
+        params = (sub.get('params') or {}) if isinstance(sub, dict) else {}
+        if not path:
+            results.append({"path": path, "status_code": 400, "data": {"message": "Missing path"}})
+            continue
+        try:
+            endpoint, view_args = url_adapter.match(path, method='GET')
+        except HTTPException as e:
+            results.append({"path": path, "status_code": e.code, "data": {"message": f"No readable route for '{path}'"}})
+            continue
+        if endpoint not in BATCHABLE_ENDPOINTS:
+            results.append({"path": path, "status_code": 400, "data": {"message": f"Route '{path}' cannot be batched"}})
+            continue
+
+        with current_app.test_request_context(path, method='GET', query_string=params, headers=sub_headers):
+            sub_response = current_app.make_response(current_app.view_functions[endpoint](**view_args))
+        results.append({"path": path, "status_code": sub_response.status_code, "data": decode_response(sub_response)})
+
+    return jsonify({"results": results}), 200
+
+
 # --- Order Routes ---
 @main.route('/orders', methods=['POST'])
 @login_required
 @roles_required(RoleType.ADMIN, RoleType.MANAGER)
 def create_order():
     """Creates a new order."""
-    data = request.get_json()
+    data = get_request_data()
     if not data or not data.get('order_number'):
         return jsonify({"message": "Missing required field: order_number"}), 400
 
@@ -66,6 +126,8 @@ def create_order():
     db.session.add(new_order)
     try:
         db.session.commit()
+        invalidate('main.get_orders')
+        events.publish_change('orders', 'insert', [{"id": new_order.id, "order_number": order_number}])
         current_app.logger.info(f"Order '{order_number}' created by user '{current_user.username}'.")
         # Return the created order data
         return jsonify({
@@ -74,7 +136,7 @@ def create_order():
                 "id": new_order.id,
                 "order_number": new_order.order_number,
                 "description": new_order.description,
-                "created_at": new_order.created_at.isoformat(),
+                "created_at": new_order.created_at,
                 "created_by_user_id": new_order.created_by_user_id
             }
         }), 201 # Created
@@ -86,6 +148,7 @@ def create_order():
 
 @main.route('/orders', methods=['GET'])
 @login_required
+@coalesced(scope=shared_scope)
 def get_orders():
     """Retrieves a list of orders."""
     try:
@@ -95,7 +158,7 @@ def get_orders():
             "id": order.id,
             "order_number": order.order_number,
             "description": order.description,
-            "created_at": order.created_at.isoformat(),
+            "created_at": order.created_at,
             "created_by_user_id": order.created_by_user_id,
             "creator_username": order.creator.username if order.creator else "N/A"
         } for order in orders]
@@ -106,6 +169,55 @@ def get_orders():
         return jsonify({"message": "Failed to retrieve orders"}), 500
 
 
+ORDER_SEARCH_LIMIT = 20
+MAX_ORDER_SEARCH_LIMIT = 200
+
+def _like_prefix(text):
+    """A LIKE pattern matching strings that start with `text` (wildcards escaped with '\\')."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+@main.route('/orders/search', methods=['GET'])
+@login_required
+def search_orders():
+    """Orders whose number starts with `q` (case-insensitive), for the order pickers.
+
+    Matches are sorted by order number; an empty `q` returns the most recent orders.
+    At most `limit` orders are returned (default 20); `has_more` says whether there
+    are further matches, i.e. whether a client may filter this list for longer prefixes.
+    The prefix match reads the ix_orders_order_number_lower index.
+    """
+    q = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', ORDER_SEARCH_LIMIT, type=int), MAX_ORDER_SEARCH_LIMIT))
+    query = db.select(Order.id, Order.order_number, Order.description, Order.created_at)
+    if q:
+        query = query.where(db.func.lower(Order.order_number).like(_like_prefix(q.lower()), escape='\\'))
+        query = query.order_by(db.func.lower(Order.order_number))
+    else:
+        query = query.order_by(Order.created_at.desc())
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    orders = [{
+        "id": row.id,
+        "order_number": row.order_number,
+        "description": row.description,
+        "created_at": row.created_at,
+    } for row in rows[:limit]]
+    return jsonify({"query": q, "orders": orders, "has_more": len(rows) > limit}), 200
+
+
+@main.route('/orders/<int:order_id>/barcodes', methods=['GET'])
+@login_required
+def get_order_barcodes(order_id):
+    """Every barcode already scanned for an order, for client-side duplicate checks.
+
+    A barcode may be scanned once per order whatever the department, so unlike
+    GET /scans this is not department-scoped. Read from the (order_id, barcode) index only.
+    """
+    if db.session.get(Order, order_id) is None:
+        return jsonify({"message": f"Order with ID {order_id} not found"}), 404
+    barcodes = db.session.scalars(db.select(Scan.barcode).where(Scan.order_id == order_id)).all()
+    return jsonify({"order_id": order_id, "count": len(barcodes), "barcodes": barcodes}), 200
+
+
 # --- Re-add DELETE /orders route ---
 @main.route('/orders/<int:order_id>', methods=['DELETE'])
 @login_required
@@ -117,9 +229,17 @@ def delete_order(order_id):
         return jsonify({"message": f"Order ID {order_id} not found"}), 404
     order_number = order.order_number
     try:
-        # Assuming cascade delete is set up in models for scans/comments
+        # Scans and comments go with the order via ON DELETE CASCADE (passive_deletes on the
+        # relationship), so this is a single DELETE regardless of how many boards were scanned.
+        # Boards last scanned in this order lose their state row with the scan; rebuilt below.
+        affected_barcodes = board_state.latest_scan_barcodes(Scan.order_id == order_id)
         db.session.delete(order)
+        db.session.flush()
+        board_state.rebuild(affected_barcodes) # Each board falls back to its latest scan in other orders, if any
         db.session.commit()
+        invalidate('main.get_orders')
+        events.publish_change('scans', 'delete', where={"order_id": order_id}) # One event, not one item per scan
+        events.publish_change('orders', 'delete', [{"id": order_id, "order_number": order_number}])
         current_app.logger.warning(f"Order '{order_number}' (ID: {order_id}) deleted by admin '{current_user.username}'.")
         return jsonify({"message": f"Order '{order_number}' deleted"}), 200
     except Exception as e:
@@ -129,11 +249,30 @@ def delete_order(order_id):
 
 
 # --- Scan Routes ---
+def _scan_change(scan_id, order_id, barcode, department_id, user_id):
+    """A scan's entry in a 'change' event (see events.publish_change)."""
+    return {"id": scan_id, "order_id": order_id, "barcode": barcode, "department_id": department_id, "user_id": user_id}
+
+def _replayed_scan(row):
+    """A scan found by idempotency key (scan_rules.recorded_scans), in record_scan's response shape."""
+    return {
+        "id": row.id,
+        "barcode": row.barcode,
+        "timestamp": row.timestamp,
+        "status": row.status.value,
+        "notes": row.notes,
+        "user_id": row.user_id,
+        "department_id": row.department_id,
+        "order_id": row.order_id,
+        "username": row.username,
+        "department_name": refdata.department_name(row.department_id) or "N/A",
+    }
+
 @main.route('/scans', methods=['POST'])
 @login_required
 def record_scan():
     """Records a new scan event."""
-    data = request.get_json()
+    data = get_request_data()
     required_fields = ['barcode', 'status', 'order_id']
     if not data or not all(field in data for field in required_fields):
         return jsonify({"message": f"Missing required fields: {required_fields}"}), 400
@@ -142,34 +281,21 @@ def record_scan():
     status_str = data.get('status')
     order_id = data.get('order_id')
     notes = data.get('notes') # Optional
+    idempotency_key = data.get('idempotency_key') # Optional, see Scan.idempotency_key
+    user_department_id = current_user.department_id
 
-    # Validate status
+    # Status, order, duplicate and department checks (shared with the scan listener)
     try:
-        scan_status = ScanStatus(status_str) # Convert string ('Pass'/'Fail') to Enum
-    except ValueError:
-        valid_statuses = [s.value for s in ScanStatus]
-        return jsonify({"message": f"Invalid status '{status_str}'. Must be one of: {valid_statuses}"}), 400
-
-    # Validate order ID
-    order = db.session.get(Order, order_id)
-    if not order:
-        return jsonify({"message": f"Order with ID {order_id} not found"}), 404 # Not Found
-
-    # --- Keep Duplicate Scan Check ---
-    existing_scan = db.session.scalars(
-        db.select(Scan).filter_by(barcode=barcode, order_id=order_id)
-    ).first()
-    if existing_scan:
-        current_app.logger.warning(f"Duplicate scan attempt: Barcode '{barcode}' already exists for Order ID {order_id}.")
-        return jsonify({"message": f"Barcode '{barcode}' has already been scanned for this order (Order ID: {order_id})"}), 409 # Conflict
-    # ---
-
-    # --- Re-add department logic ---
-    user_department_id = current_user.department_id
-    if not user_department_id:
-        # Handle users without department (e.g., Admin)
-        # For now, require a department for scanning.
-        return jsonify({"message": "User must belong to a department to record scans"}), 400
+        scan_rules.check_idempotency_key(idempotency_key)
+        replayed = scan_rules.recorded_scans([idempotency_key]).get(idempotency_key)
+        if replayed:
+            current_app.logger.info(f"Scan resubmitted: Barcode '{barcode}' was already recorded as scan {replayed.id}.")
+            return jsonify({"message": "Scan already recorded", "replayed": True, "scan": _replayed_scan(replayed)}), 200
+        scan_status, order = scan_rules.validate_scan(barcode, status_str, order_id, user_department_id)
+    except scan_rules.ScanRejected as e:
+        if e.status_code == 409:
+            current_app.logger.warning(f"Duplicate scan attempt: Barcode '{barcode}' already exists for Order ID {order_id}.")
+        return jsonify({"message": e.message}), e.status_code
 
     new_scan = Scan(
         barcode=barcode,
@@ -177,12 +303,21 @@ def record_scan():
         notes=notes,
         user_id=current_user.id,
         department_id=user_department_id,
-        order_id=order_id
+        order_id=order_id,
+        idempotency_key=idempotency_key
     )
 
     db.session.add(new_scan)
     try:
+        db.session.flush() # Assigns id/timestamp for the board state row
+        board_state.apply_scans([{
+            "id": new_scan.id, "barcode": barcode, "department_id": user_department_id,
+            "status": scan_status, "timestamp": new_scan.timestamp, "order_id": order_id,
+        }])
         db.session.commit()
+        live_stats.record_scans([{"order_id": order_id, "department_id": user_department_id,
+                                  "user_id": current_user.id, "status": scan_status}])
+        events.publish_change('scans', 'insert', [_scan_change(new_scan.id, order_id, barcode, user_department_id, current_user.id)])
         current_app.logger.info(f"Scan recorded: Barcode: '{barcode}', Order: {order.order_number}, Status: {scan_status.value}, User: '{current_user.username}', Dept: {user_department_id}.")
         # Return the created scan data (including department_id)
         return jsonify({
@@ -190,12 +325,15 @@ def record_scan():
             "scan": {
                 "id": new_scan.id,
                 "barcode": new_scan.barcode,
-                "timestamp": new_scan.timestamp.isoformat(),
+                "timestamp": new_scan.timestamp,
                 "status": new_scan.status.value,
-                "notes": new_scan.notes,
+                "notes": notes, # Deferred column - avoid reloading it after commit
                 "user_id": new_scan.user_id,
                 "department_id": new_scan.department_id,
-                "order_id": new_scan.order_id
+                "order_id": new_scan.order_id,
+                # Display fields, so clients can show the new row without re-fetching the list
+                "username": current_user.username,
+                "department_name": refdata.department_name(new_scan.department_id) or "N/A",
             }
         }), 201 # Created
     except Exception as e:
@@ -204,13 +342,145 @@ def record_scan():
         return jsonify({"message": "Failed to record scan"}), 500
 
 
+MAX_SCAN_BATCH = 200
+
+@main.route('/scans/batch', methods=['POST'])
+@login_required
+def record_scans():
+    """Records several scans in one transaction (a scanning station's submission queue).
+
+    Body: {"scans": [{"barcode", "status", "order_id", "notes"?, "idempotency_key"?}, ...]}.
+    Each item is accepted or rejected on its own, with record_scan's rules; `results` is
+    aligned with the input and holds {"success", "status_code", "scan"} or {"success",
+    "status_code", "message"}. An item whose idempotency key was already recorded gets
+    the original scan with status_code 200 and "replayed": true.
+    """
+    data = get_request_data()
+    items = data.get('scans') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Request body must contain a non-empty 'scans' list"}), 400
+    if len(items) > MAX_SCAN_BATCH:
+        return jsonify({"message": f"Too many scans (max {MAX_SCAN_BATCH})"}), 400
+
+    required_fields = ['barcode', 'status', 'order_id']
+    results = [None] * len(items)
+    candidates, positions = [], []
+    replayed = scan_rules.recorded_scans(
+        item.get('idempotency_key') for item in items
+        if isinstance(item, dict) and isinstance(item.get('idempotency_key'), str)
+    )
+    batch_keys = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not all(field in item for field in required_fields):
+            results[index] = {"success": False, "status_code": 400, "message": f"Missing required fields: {required_fields}"}
+            continue
+        key = item.get('idempotency_key')
+        try:
+            scan_rules.check_idempotency_key(key)
+        except scan_rules.ScanRejected as e:
+            results[index] = {"success": False, "status_code": e.status_code, "message": e.message}
+            continue
+        if key in replayed:
+            results[index] = {"success": True, "status_code": 200, "replayed": True, "scan": _replayed_scan(replayed[key])}
+            continue
+        if key is not None:
+            if key in batch_keys:
+                results[index] = {"success": False, "status_code": 400, "message": "Duplicate idempotency_key in batch"}
+                continue
+            batch_keys.add(key)
+        candidates.append({
+            'barcode': item['barcode'],
+            'status': item['status'],
+            'order_id': item['order_id'],
+            'notes': item.get('notes'),
+            'user_id': current_user.id,
+            'department_id': current_user.department_id,
+            'idempotency_key': key,
+        })
+        positions.append(index)
+
+    checked = scan_rules.validate_scan_batch(candidates)
+    rows = [result for result in checked if not isinstance(result, scan_rules.ScanRejected)]
+    try:
+        inserted = scan_rules.insert_scans(rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error recording batch of {len(rows)} scans: {e}")
+        return jsonify({"message": "Failed to record scans"}), 500
+    live_stats.record_scans(rows)
+    events.publish_change('scans', 'insert', [_scan_change(scan_id, row['order_id'], row['barcode'], row['department_id'], row['user_id'])
+                                              for row, (scan_id, _timestamp) in zip(rows, inserted)])
+    inserted = iter(inserted)
+
+    department_name = refdata.department_name(current_user.department_id) or "N/A"
+    for index, result in zip(positions, checked):
+        if isinstance(result, scan_rules.ScanRejected):
+            results[index] = {"success": False, "status_code": result.status_code, "message": result.message}
+            continue
+        scan_id, timestamp = next(inserted)
+        results[index] = {"success": True, "status_code": 201, "scan": {
+            "id": scan_id,
+            "barcode": result['barcode'],
+            "timestamp": timestamp,
+            "status": result['status'].value,
+            "notes": result['notes'],
+            "user_id": result['user_id'],
+            "department_id": result['department_id'],
+            "order_id": result['order_id'],
+            "username": current_user.username,
+            "department_name": department_name,
+        }}
+    current_app.logger.info(f"Scan batch: recorded {len(rows)} of {len(items)} scans for user '{current_user.username}'.")
+    return jsonify({"results": results}), 200
+
+
+# Every field GET /scans can return: (selected column, value formatter).
+# Department names come from the reference-data cache, so only the ID is selected.
+SCAN_FIELDS = {
+    "id": (Scan.id, None),
+    "barcode": (Scan.barcode, None),
+    "timestamp": (Scan.timestamp, None), # Encoded per wire format (ISO string / epoch ms)
+    "status": (Scan.status, lambda status: status.value),
+    "notes": (Scan.notes, None),
+    "user_id": (Scan.user_id, None),
+    "department_id": (Scan.department_id, None),
+    "order_id": (Scan.order_id, None),
+    "username": (User.username, lambda username: username or "N/A"),
+    "department_name": (Scan.department_id, lambda dept_id: refdata.department_name(dept_id) or "N/A"),
+}
+
+MAX_SCAN_PAGE = 5000
+
 @main.route('/scans', methods=['GET'])
 @login_required
 def get_scans():
-    """Retrieves a list of scans, optionally filtered by order_id."""
+    """Retrieves a list of scans, optionally filtered by order_id.
+
+    `fields=barcode,status` limits both the selected columns and the returned keys
+    (default: all fields). Only the requested columns are read, so leaving out
+    `notes` and `username` skips the Text column and the users join entirely.
+
+    Scans are limited to the caller's department by default. Admins and Managers
+    may pass another `department_id`, or `scope=all` for every department.
+
+    `limit=N` returns one page of the newest N scans plus `next_cursor`; pass it
+    back unchanged as `cursor` for the next (older) page. It is null on the last page.
+    `after_id=N` returns only scans with a higher id (what is new since a list was loaded).
+    """
+    fields_param = request.args.get('fields')
+    if fields_param:
+        fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in SCAN_FIELDS]
+        if unknown or not fields:
+            return jsonify({"message": f"Invalid fields {unknown}. Allowed: {list(SCAN_FIELDS)}"}), 400
+    else:
+        fields = list(SCAN_FIELDS)
 
     # --- Restore Filtering Logic ---
-    query = db.select(Scan)
+    query = db.select(*[SCAN_FIELDS[f][0].label(f) for f in fields]).select_from(Scan)
+    if "username" in fields:
+        query = query.outerjoin(User, Scan.user_id == User.id)
 
     # Filter by order_id
     order_id_filter = request.args.get('order_id', type=int)
@@ -222,34 +492,60 @@ def get_scans():
     if user_id_filter:
         query = query.where(Scan.user_id == user_id_filter)
 
-    # Filter by department_id
+    # Department scope (served by the (department_id, timestamp) index)
     department_id_filter = request.args.get('department_id', type=int)
+    all_departments = request.args.get('scope') == 'all'
+    privileged = current_user.role_type in (RoleType.ADMIN, RoleType.MANAGER)
+    if not privileged and (all_departments or department_id_filter not in (None, current_user.department_id)):
+        return jsonify({"message": "Requires Admin or Manager role to view other departments"}), 403
+    if department_id_filter is None and not all_departments:
+        department_id_filter = current_user.department_id
     if department_id_filter:
         query = query.where(Scan.department_id == department_id_filter)
+        scope = department_id_filter
+    elif privileged:
+        scope = "all" # Explicit scope=all, or an Admin/Manager without a department
+    else:
+        query = query.where(Scan.user_id == current_user.id) # Standard user without a department
+        scope = "user"
+
+    # Delta since a previously loaded list
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.where(Scan.id > after_id)
+
+    # Keyset pagination on (timestamp, id): the cursor is the id of the last row sent,
+    # so each page is an index range scan instead of an ever-growing OFFSET
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_SCAN_PAGE))
+        query = query.add_columns(Scan.id) # Cursor column, after the requested fields
+        cursor = request.args.get('cursor', type=int)
+        if cursor is not None:
+            cursor_ts = db.session.scalar(db.select(Scan.timestamp).where(Scan.id == cursor))
+            if cursor_ts is None:
+                return jsonify({"message": "Cursor scan no longer exists; reload from the first page"}), 410
+            query = query.where(db.or_(Scan.timestamp < cursor_ts,
+                                       db.and_(Scan.timestamp == cursor_ts, Scan.id < cursor)))
+        query = query.limit(limit + 1) # One extra row tells whether another page exists
 
     # Ordering
-    query = query.order_by(Scan.timestamp.desc())
+    query = query.order_by(Scan.timestamp.desc(), Scan.id.desc())
     # --- End Filtering ---
 
     try:
-        # Eager load related objects
-        query = query.options(db.joinedload(Scan.user), db.joinedload(Scan.department))
-        scans = db.session.scalars(query).all()
-
+        rows = db.session.execute(query).all()
+        page = {}
+        if limit is not None:
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            page = {"next_cursor": str(rows[-1][-1]) if has_more else None}
+        formatters = [(index, name, SCAN_FIELDS[name][1]) for index, name in enumerate(fields)]
         scan_list = [{
-            "id": scan.id,
-            "barcode": scan.barcode,
-            "timestamp": scan.timestamp.isoformat(),
-            "status": scan.status.value,
-            "notes": scan.notes,
-            "user_id": scan.user_id,
-            "department_id": scan.department_id,
-            "order_id": scan.order_id,
-            "username": scan.user.username if scan.user else "N/A",
-            "department_name": scan.department.name if scan.department else "N/A"
-        } for scan in scans]
-
-        return jsonify({"scans": scan_list}), 200
+            name: (fmt(row[index]) if fmt else row[index]) for index, name, fmt in formatters
+        } for row in rows]
+
+        return jsonify({"scans": scan_list, "scope": scope, **page}), 200
     except Exception as e:
         current_app.logger.error(f"Error retrieving scans: {e}")
         return jsonify({"message": "Failed to retrieve scans"}), 500
@@ -269,7 +565,7 @@ def update_scan(scan_id):
     # if current_user.role.name == RoleType.MANAGER and scan.department_id != current_user.department_id:
     #     return jsonify({"message": "Managers can only edit scans from their own department"}), 403
 
-    data = request.get_json()
+    data = get_request_data()
     if not data:
         return jsonify({"message": "No update data provided"}), 400
 
@@ -294,7 +590,9 @@ def update_scan(scan_id):
         return jsonify({"message": "No changes detected"}), 200
 
     try:
+        board_state.status_changed(scan)
         db.session.commit()
+        events.publish_change('scans', 'update', [_scan_change(scan_id, scan.order_id, scan.barcode, scan.department_id, scan.user_id)])
         current_app.logger.info(f"Scan ID {scan_id} updated by user '{current_user.username}': {', '.join(log_changes)}.")
         # Return updated scan? Or just success?
         return jsonify({"message": "Scan updated successfully"}), 200
@@ -319,9 +617,13 @@ def delete_scan(scan_id):
     #     return jsonify({"message": "Managers can only delete scans from their own department"}), 403
 
     scan_barcode = scan.barcode
+    change = _scan_change(scan_id, scan.order_id, scan_barcode, scan.department_id, scan.user_id)
     try:
         db.session.delete(scan)
+        db.session.flush()
+        board_state.rebuild([scan_barcode]) # The board falls back to its previous scan, if any
         db.session.commit()
+        events.publish_change('scans', 'delete', [change])
         current_app.logger.warning(f"Scan '{scan_barcode}' (ID: {scan_id}) deleted by user '{current_user.username}'.")
         return jsonify({"message": f"Scan '{scan_barcode}' deleted"}), 200
     except Exception as e:
@@ -330,13 +632,126 @@ def delete_scan(scan_id):
         return jsonify({"message": "Failed to delete scan"}), 500
 
 
+# --- Live Monitoring Routes ---
+@main.route('/stats/live', methods=['GET'])
+@login_required
+def get_live_stats():
+    """Streaming fail-rate stats per order/department/user (?kind=order&id=3) and active alerts."""
+    kind = request.args.get('kind')
+    if kind is not None and kind not in live_stats.KINDS:
+        return jsonify({"message": f"Invalid kind '{kind}'. Must be one of: {list(live_stats.KINDS)}"}), 400
+    engine = live_stats.engine()
+    return jsonify({
+        "threshold": engine.threshold,
+        "min_scans": engine.min_scans,
+        "window_minutes": engine.window_minutes,
+        "stats": engine.snapshot(kind, request.args.get('id', type=int)),
+        "alerts": engine.alerts(),
+    }), 200
+
+
+def _change_visibility():
+    """The current user's filter for 'change' events (events.Subscriber.visible), or None for all.
+
+    Same rule as GET /scans: only Admins and Managers see other departments' scans.
+    """
+    if current_user.role_type in (RoleType.ADMIN, RoleType.MANAGER):
+        return None
+    department_id = current_user.department_id
+
+    def visible(event_type, data):
+        if event_type != 'change' or data.get('table') != 'scans':
+            return data
+        if data.get('where'): # A bulk delete by order or user, which may include scans this user sees
+            return data
+        items = [item for item in data['items'] if item.get('department_id') == department_id]
+        return dict(data, items=items) if items else None
+    return visible
+
+
+@main.route('/stream', methods=['GET'])
+@login_required
+def event_stream():
+    """Server-sent events (?types=alert,change). Starts with the currently active alerts.
+
+    "alert": live fail-rate alerts raised or cleared. "change": scans or orders were
+    inserted, updated or deleted (events.publish_change), for the GUI's live views.
+    Events are published by this API process only, and each open stream holds a worker thread.
+    """
+    types = [t for t in request.args.get('types', '').split(',') if t] or None
+    subscriber = events.subscribe(types, _change_visibility())
+    initial = [('alert', dict(alert, raised=True)) for alert in live_stats.engine().alerts()
+               if subscriber.wants('alert')]
+    return Response(stream_with_context(events.stream(subscriber, initial)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@main.route('/metrics', methods=['GET'])
+@login_required
+@role_required(RoleType.ADMIN)
+def get_metrics():
+    """Latency percentiles and admission counters for this worker process."""
+    admission = current_app.extensions.get('admission')
+    return jsonify({
+        "latency": metrics.summary(),
+        "admission": admission.status() if admission else None,
+    }), 200
+
+
+# --- Board Location Routes ---
+@main.route('/wip', methods=['GET'])
+@login_required
+def get_wip():
+    """Boards currently in each department (from board_state, not scan history).
+
+    Without department_id: {"departments": [{"department_id", "department_name", "count"}]}.
+    With department_id (and optionally order_id): that department's count and boards.
+    """
+    department_id = request.args.get('department_id', type=int)
+    order_id = request.args.get('order_id', type=int)
+    try:
+        if department_id is None:
+            query = db.select(BoardState.department_id, db.func.count()).group_by(BoardState.department_id)
+            if order_id is not None:
+                query = query.where(BoardState.order_id == order_id)
+            counts = [{"department_id": dept_id, "department_name": refdata.department_name(dept_id) or "N/A", "count": count}
+                      for dept_id, count in db.session.execute(query)]
+            return jsonify({"departments": counts}), 200
+
+        query = db.select(BoardState).where(BoardState.department_id == department_id).order_by(BoardState.last_scan_at.desc())
+        if order_id is not None:
+            query = query.where(BoardState.order_id == order_id)
+        boards = [board.to_dict() for board in db.session.scalars(query)]
+        return jsonify({
+            "department_id": department_id,
+            "department_name": refdata.department_name(department_id) or "N/A",
+            "count": len(boards),
+            "boards": boards,
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving WIP: {e}")
+        return jsonify({"message": "Failed to retrieve WIP"}), 500
+
+
+@main.route('/boards/<path:barcode>', methods=['GET'])
+@login_required
+def get_board(barcode):
+    """Where a board is right now: its latest department, status, scan time and order."""
+    board = db.session.get(BoardState, barcode)
+    if not board:
+        return jsonify({"message": f"Board '{barcode}' has no scans"}), 404
+    board_data = board.to_dict()
+    board_data["department_name"] = refdata.department_name(board.department_id) or "N/A"
+    return jsonify({"board": board_data}), 200
+
+
 # --- Re-add Department Routes ---
 @main.route('/departments', methods=['POST'])
 @login_required
 @role_required(RoleType.ADMIN)
 def create_department():
     """Creates a new department."""
-    data = request.get_json()
+    data = get_request_data()
     if not data or not data.get('name'):
         return jsonify({"message": "Missing required field: name"}), 400
     name = data.get('name')
@@ -345,7 +760,9 @@ def create_department():
     new_dept = Department(name=name)
     db.session.add(new_dept)
     try:
+        refdata.bump_generation()
         db.session.commit()
+        invalidate('main.get_departments')
         current_app.logger.info(f"Department '{name}' created by user '{current_user.username}'.")
         return jsonify({"message": "Department created", "department": {"id": new_dept.id, "name": new_dept.name}}), 201
     except Exception as e:
@@ -355,11 +772,12 @@ def create_department():
 
 @main.route('/departments', methods=['GET'])
 @login_required
+@coalesced(scope=shared_scope)
 def get_departments():
     """Retrieves a list of all departments."""
     try:
-        departments = db.session.scalars(db.select(Department).order_by(Department.name)).all()
-        return jsonify({"departments": [{"id": d.id, "name": d.name} for d in departments]}), 200
+        departments = refdata.departments() # Already sorted by name
+        return jsonify({"departments": [{"id": d_id, "name": name} for d_id, name in departments]}), 200
     except Exception as e:
         current_app.logger.error(f"Error retrieving departments: {e}")
         return jsonify({"message": "Failed to retrieve departments"}), 500
@@ -387,7 +805,9 @@ def delete_department(department_id):
     dept_name = dept.name
     try:
         db.session.delete(dept)
+        refdata.bump_generation()
         db.session.commit()
+        invalidate('main.get_departments')
         current_app.logger.warning(f"Department '{dept_name}' (ID: {department_id}) deleted by admin '{current_user.username}'.")
         return jsonify({"message": f"Department '{dept_name}' deleted"}), 200
     except Exception as e:
@@ -401,7 +821,7 @@ def delete_department(department_id):
 @role_required(RoleType.ADMIN)
 def create_user():
     """Creates a new user (Admin only)."""
-    data = request.get_json()
+    data = get_request_data()
     required = ['username', 'password', 'role_name']
     if not data or not all(f in data for f in required):
         return jsonify({"message": f"Missing required fields: {required}"}), 400
@@ -416,25 +836,28 @@ def create_user():
 
     try:
         role_type = RoleType(role_name_str)
-        role = db.session.scalars(db.select(Role).filter_by(name=role_type)).first()
-        if not role:
+        role_id = refdata.role_id(role_type)
+        if not role_id:
             return jsonify({"message": f"Role '{role_name_str}' not found"}), 400
     except ValueError:
         return jsonify({"message": f"Invalid role_name '{role_name_str}'"}), 400
 
-    department = None
     if department_id:
-        department = db.session.get(Department, department_id)
-        if not department:
+        if refdata.department_name(department_id) is None:
             return jsonify({"message": f"Department ID {department_id} not found"}), 404
+    else:
+        department_id = None
 
-    new_user = User(username=username, role=role, department=department)
-    new_user.set_password(password)
+    new_user = User(username=username, role_id=role_id, department_id=department_id)
+    try:
+        new_user.password_hash = passwords.hash_password(password)
+    except passwords.PasswordServiceBusy as e:
+        return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": str(e.retry_after)}
     db.session.add(new_user)
     try:
         db.session.commit()
         current_app.logger.info(f"User '{username}' created by admin '{current_user.username}'.")
-        return jsonify({"message": "User created", "user": {"id": new_user.id, "username": new_user.username, "role": new_user.role.name.value, "department_id": new_user.department_id, "department_name": new_user.department.name if new_user.department else None}}), 201
+        return jsonify({"message": "User created", "user": new_user.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error creating user '{username}': {e}")
@@ -447,15 +870,7 @@ def get_users():
     """Retrieves a list of all users (Admin only)."""
     try:
         users = db.session.scalars(db.select(User).order_by(User.username)).all()
-        user_list = []
-        for user in users:
-            user_list.append({
-                "id": user.id,
-                "username": user.username,
-                "role": user.role.name.value,
-                "department_id": user.department_id,
-                "department_name": user.department.name if user.department else None
-            })
+        user_list = [user.to_dict() for user in users]
         return jsonify({"users": user_list}), 200
     except Exception as e:
         current_app.logger.error(f"Error retrieving users: {e}")
@@ -470,7 +885,7 @@ def update_user(user_id):
     if not user:
         return jsonify({"message": f"User ID {user_id} not found"}), 404
 
-    data = request.get_json()
+    data = get_request_data()
     if not data:
         return jsonify({"message": "No update data provided"}), 400
 
@@ -481,12 +896,12 @@ def update_user(user_id):
         role_name_str = data['role_name']
         try:
             role_type = RoleType(role_name_str)
-            role = db.session.scalars(db.select(Role).filter_by(name=role_type)).first()
-            if role and user.role != role:
-                user.role = role
+            role_id = refdata.role_id(role_type)
+            if role_id and user.role_id != role_id:
+                user.role_id = role_id
                 changes_made = True
                 current_app.logger.info(f"UPDATE_USER: Set role to {role_name_str} for ID {user_id}.")
-            elif not role:
+            elif not role_id:
                  current_app.logger.warning(f"UPDATE_USER: Role '{role_name_str}' not found.")
         except ValueError:
             current_app.logger.warning(f"UPDATE_USER: Invalid role_name '{role_name_str}'.")
@@ -503,8 +918,7 @@ def update_user(user_id):
             try:
                 dept_id_int = int(department_id)
                 if dept_id_int != original_dept_id:
-                    department = db.session.get(Department, dept_id_int)
-                    if department:
+                    if refdata.department_name(dept_id_int) is not None:
                         user.department_id = dept_id_int
                         changes_made = True
                         current_app.logger.info(f"UPDATE_USER: Set department ID to {dept_id_int} for ID {user_id}.")
@@ -519,10 +933,7 @@ def update_user(user_id):
     try:
         db.session.commit()
         current_app.logger.info(f"UPDATE_USER: Committed changes for ID {user_id}.")
-        updated_user = {
-             "id": user.id, "username": user.username, "role": user.role.name.value,
-             "department_id": user.department_id, "department_name": user.department.name if user.department else None
-        }
+        updated_user = user.to_dict()
         return jsonify({"message": "User updated", "user": updated_user}), 200
     except Exception as e:
         db.session.rollback()
@@ -544,15 +955,20 @@ def delete_user(user_id):
 
     username = user.username
     try:
-        # Consider implications for related scans/orders - need cascade or nullify in models?
+        # The user's scans are removed by ON DELETE CASCADE; created orders block the delete (409 below)
+        affected_barcodes = board_state.latest_scan_barcodes(Scan.user_id == user_id)
         db.session.delete(user)
+        db.session.flush()
+        board_state.rebuild(affected_barcodes) # Boards they scanned last fall back to earlier scans
         db.session.commit()
+        events.publish_change('scans', 'delete', where={"user_id": user_id})
         current_app.logger.warning(f"User '{username}' (ID: {user_id}) deleted by admin '{current_user.username}'.")
         return jsonify({"message": f"User '{username}' deleted"}), 200
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error deleting user {user_id}: {e}")
-        if "violates foreign key constraint" in str(e).lower():
+        error_text = str(e).lower()
+        if "violates foreign key constraint" in error_text or "foreign key constraint failed" in error_text:
             return jsonify({"message": f"Cannot delete user '{username}'. They likely have scans or orders associated."}), 409 # Conflict
         return jsonify({"message": "Failed to delete user"}), 500
 
@@ -560,26 +976,28 @@ def delete_user(user_id):
 @main.route('/auth/login', methods=['POST'])
 def login():
     """Authenticates a user and returns basic user data."""
-    data = request.get_json()
+    data = get_request_data()
     if not data or not data.get('username') or not data.get('password'):
         return jsonify({"message": "Username and password required"}), 400
 
     username = data.get('username')
     password = data.get('password')
 
-    # Find user (assuming User model still exists)
-    user = User.query.filter_by(username=username).first()
-
-    if user and user.check_password(password):
+    with metrics.timed('login'):
+        # Find user (assuming User model still exists)
+        user = User.query.filter_by(username=username).first()
+        try:
+            valid = user is not None and passwords.check_user_password(user, password)
+        except passwords.PasswordServiceBusy as e:
+            current_app.logger.warning(f"LOGIN: Rejected '{username}', password queue full.")
+            return jsonify({"message": "Server busy, please retry"}), 503, {"Retry-After": str(e.retry_after)}
+        if valid:
+            db.session.commit() # Persists a rehashed password, if any
+
+    if valid:
         login_user(user) # Use Flask-Login
         # Restore role/dept info in response
-        user_data = {
-            "id": user.id,
-            "username": user.username,
-            "role": user.role.name.value,
-            "department_id": user.department_id,
-            "department_name": user.department.name if user.department else ""
-        }
+        user_data = user.to_dict(missing_department="")
         current_app.logger.info(f"LOGIN: Success for '{username}'. Role: {user_data['role']}, Dept: {user_data['department_name']}.")
         return jsonify({"message": "Login successful", "user": user_data}), 200
     else:
@@ -600,11 +1018,5 @@ def logout():
 def me():
     """Returns current logged-in user's basic information."""
     # Restore role/dept info in response
-    user_data = {
-        "id": current_user.id,
-        "username": current_user.username,
-        "role": current_user.role.name.value,
-        "department_id": current_user.department_id,
-        "department_name": current_user.department.name if current_user.department else ""
-    }
+    user_data = current_user.to_dict(missing_department="")
     return jsonify({"user": user_data}), 200 
\ No newline at end of file
@@ -0,0 +1,64 @@
+# In-process latency metrics (GET /metrics)
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Each series keeps its last _RESERVOIR samples for percentiles plus lifetime
+# count/total, so memory is constant. Numbers are per worker process.
+_RESERVOIR = 2048
+_series = {}
+_lock = threading.Lock()
+
+
+class _Series:
+    __slots__ = ('samples', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.samples = deque(maxlen=_RESERVOIR)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def to_dict(self):
+        ordered = sorted(self.samples)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2) if ordered else None
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+def observe(name, seconds):
+    """Records one duration (in seconds) under `name`."""
+    with _lock:
+        series = _series.get(name)
+        if series is None:
+            series = _series[name] = _Series()
+        series.samples.append(seconds)
+        series.count += 1
+        series.total += seconds
+        series.max = max(series.max, seconds)
+
+
+@contextmanager
+def timed(name):
+    """Times the block (including when it raises) and records it under `name`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0)
+
+
+def summary():
+    """{name: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} for every series."""
+    with _lock:
+        return {name: series.to_dict() for name, series in sorted(_series.items())}
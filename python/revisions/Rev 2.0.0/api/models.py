@@ -4,7 +4,10 @@ from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from . import db, login_manager # Import db and login_manager from api package
+from .passwords import hash_method
 import os # Need os for environment variables
+import hashlib
+import secrets
 
 # Association table for many-to-many relationship between users and roles (if needed later)
 # For now, assuming one role per user for simplicity
@@ -33,12 +36,17 @@ class Role(db.Model):
             RoleType.MANAGER: 'Manager Role',
             RoleType.ADMIN: 'Administrator Role'
         }
+        existing = set(db.session.scalars(db.select(Role.name)).all()) # One query for all roles
+        created = False
         for r_enum, desc in roles.items():
-            role = db.session.scalars(db.select(Role).filter_by(name=r_enum)).first()
-            if role is None:
+            if r_enum not in existing:
                 role = Role(name=r_enum)
                 print(f'Creating role: {r_enum.value}')
                 db.session.add(role)
+                created = True
+        if created:
+            from .refdata import bump_generation
+            bump_generation()
         try:
             db.session.commit()
             print("Roles committed.")
@@ -60,6 +68,16 @@ class Department(db.Model):
     def __repr__(self):
         return f'<Department {self.name}>'
 
+class RefDataGeneration(db.Model):
+    """Single-row counter bumped whenever departments or roles change.
+
+    Each worker compares it with the generation its reference-data cache
+    (api/refdata.py) was built from, so all workers stay coherent.
+    """
+    __tablename__ = 'refdata_generation'
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -73,11 +91,14 @@ class User(UserMixin, db.Model):
     # --- Re-add role and department relationships ---
     role = db.relationship('Role', back_populates='users')
     department = db.relationship('Department', back_populates='users')
-    scans = db.relationship('Scan', back_populates='user', lazy='dynamic', cascade="all, delete-orphan")
-    orders_created = db.relationship('Order', back_populates='creator', lazy='dynamic')
+    # passive_deletes: the database removes a user's scans via ON DELETE CASCADE,
+    # so the ORM never loads the (potentially huge) collection just to delete it.
+    scans = db.relationship('Scan', back_populates='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    orders_created = db.relationship('Order', back_populates='creator', lazy='dynamic', passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # Hashes inline; request handlers use passwords.hash_password() to hash in the pool
+        self.password_hash = generate_password_hash(password, method=hash_method())
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -129,13 +150,36 @@ class User(UserMixin, db.Model):
             print(f"No changes detected for admin user '{admin_username}'.")
 
     # --- Re-add role checking properties ---
+    # Role and department names come from the reference-data cache, not a lazy load
+    @property
+    def role_type(self):
+        from .refdata import role_type
+        return role_type(self.role_id)
+
+    @property
+    def department_name(self):
+        from .refdata import department_name
+        return department_name(self.department_id)
+
     @property
     def is_admin(self):
-        return self.role and self.role.name == RoleType.ADMIN
+        return self.role_type == RoleType.ADMIN
 
     @property
     def is_manager(self):
-        return self.role and self.role.name == RoleType.MANAGER
+        return self.role_type == RoleType.MANAGER
+
+    def to_dict(self, missing_department=None):
+        """Serializes the user for API responses without querying roles/departments."""
+        role_type = self.role_type
+        department_name = self.department_name
+        return {
+            "id": self.id,
+            "username": self.username,
+            "role": role_type.value if role_type else None,
+            "department_id": self.department_id,
+            "department_name": department_name if department_name is not None else missing_department
+        }
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -153,10 +197,17 @@ class Order(db.Model):
     description = db.Column(db.String(256), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    __table_args__ = (
+        # Order picker prefix search: lower(order_number) LIKE 'abc%'. Pattern ops let
+        # PostgreSQL use the index for LIKE whatever the database collation.
+        db.Index('ix_orders_order_number_lower', db.func.lower(order_number).label('order_number_lower'),
+                 postgresql_ops={'order_number_lower': 'varchar_pattern_ops'}),
+    )
 
     # Relationships
     creator = db.relationship('User', back_populates='orders_created')
-    scans = db.relationship('Scan', back_populates='order', lazy='dynamic', cascade="all, delete-orphan")
+    # Scans (and their comments) are removed by ON DELETE CASCADE in the database
+    scans = db.relationship('Scan', back_populates='order', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f'<Order {self.order_number}>'
@@ -167,15 +218,25 @@ class ScanStatus(enum.Enum):
 
 class Scan(db.Model):
     __tablename__ = 'scans'
+    __table_args__ = (
+        # Department-scoped scan lists: WHERE department_id = ? ORDER BY timestamp DESC
+        db.Index('ix_scans_department_id_timestamp', 'department_id', 'timestamp'),
+        # Duplicate checks (barcode within an order) and an order's barcode list, from the index alone
+        db.Index('ix_scans_order_id_barcode', 'order_id', 'barcode'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     barcode = db.Column(db.String(256), nullable=False, index=True)
     timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     status = db.Column(db.Enum(ScanStatus), nullable=False)
-    notes = db.Column(db.Text, nullable=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Free text, rarely needed by list views - only loaded when accessed or explicitly selected
+    notes = db.deferred(db.Column(db.Text, nullable=True))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     # --- Re-add department_id ---
     department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    # Client-generated key (e.g. a UUID from a station's offline journal); a resubmitted scan
+    # with a known key is answered with the original scan instead of being recorded twice
+    idempotency_key = db.Column(db.String(64), nullable=True, unique=True, index=True)
 
     # Relationships
     user = db.relationship('User', back_populates='scans')
@@ -186,6 +247,34 @@ class Scan(db.Model):
     def __repr__(self):
         return f'<Scan {self.barcode} [{self.status.value}]>'
 
+class BoardState(db.Model):
+    """Where each board is now: one row per barcode, mirroring its latest scan.
+
+    Maintained in the same transaction as every scan write (api/board_state.py),
+    so "where is board X" and "what is in Bench" never read scan history.
+    Removed with its last scan (ON DELETE CASCADE); `flask rebuild-board-state` rebuilds it.
+    """
+    __tablename__ = 'board_state'
+    barcode = db.Column(db.String(256), primary_key=True)
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'), nullable=False, index=True)
+    status = db.Column(db.Enum(ScanStatus), nullable=False)
+    last_scan_at = db.Column(db.DateTime, nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True)
+    last_scan_id = db.Column(db.Integer, db.ForeignKey('scans.id', ondelete='CASCADE'), nullable=False, unique=True)
+
+    def to_dict(self):
+        return {
+            "barcode": self.barcode,
+            "department_id": self.department_id,
+            "status": self.status.value,
+            "last_scan_at": self.last_scan_at,
+            "order_id": self.order_id,
+            "last_scan_id": self.last_scan_id,
+        }
+
+    def __repr__(self):
+        return f'<BoardState {self.barcode} in department {self.department_id}>'
+
 # --- Re-add Comment Model (Optional, but was there before) ---
 class Comment(db.Model):
     __tablename__ = 'comments'
@@ -193,8 +282,8 @@ class Comment(db.Model):
     text = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)
-    scan_id = db.Column(db.Integer, db.ForeignKey('scans.id'), nullable=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=True)
+    scan_id = db.Column(db.Integer, db.ForeignKey('scans.id', ondelete='CASCADE'), nullable=True)
 
     user = db.relationship('User') # Simplified relationship for now
     order = db.relationship('Order')
@@ -204,4 +293,35 @@ class Comment(db.Model):
 
     def __repr__(self):
         link = f"Order {self.order_id}" if self.order_id else f"Scan {self.scan_id}"
-        return f'<Comment by User {self.user_id} on {link}>' 
\ No newline at end of file
+        return f'<Comment by User {self.user_id} on {link}>'
+
+class Station(db.Model):
+    """A fixed-mount scanner feeding the line-protocol listener (api/scan_listener.py).
+
+    Scans are recorded as `user` (and therefore in the user's department) against
+    the station's current order. Only a SHA-256 of the token is stored.
+    """
+    __tablename__ = 'stations'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='SET NULL'), nullable=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    user = db.relationship('User')
+    order = db.relationship('Order')
+
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def issue_token(self):
+        """Generates a new token, stores its hash and returns the plain token (shown once)."""
+        token = secrets.token_urlsafe(24)
+        self.token_hash = Station.hash_token(token)
+        return token
+
+    def __repr__(self):
+        return f'<Station {self.name}>'
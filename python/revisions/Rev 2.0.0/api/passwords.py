@@ -0,0 +1,107 @@
+# Password hashing and verification off the request thread
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from . import metrics
+
+# Hashing is deliberately CPU-bound (hundreds of ms), so it runs in a small process
+# pool: a shift-change login storm then uses at most PASSWORD_HASH_WORKERS cores and
+# cannot starve scan requests, and request threads wait without holding the GIL.
+# At most PASSWORD_MAX_PENDING hashes may be queued or running; beyond that callers
+# get PasswordServiceBusy (the login routes answer 503 with Retry-After).
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+class PasswordServiceBusy(Exception):
+    """Too many password hashes are queued; the client should retry later."""
+
+    def __init__(self, retry_after):
+        super().__init__("Password verification queue is full")
+        self.retry_after = retry_after
+
+
+def hash_method():
+    """The configured werkzeug hash method, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'."""
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    return DEFAULT_METHOD
+
+
+def needs_rehash(password_hash):
+    """True if the hash was made with a different method or cost than the configured one."""
+    return password_hash.split('$', 1)[0] != hash_method()
+
+
+def _get_pool():
+    global _pool, _slots
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 1)
+    if workers <= 0:
+        return None # Hash inline on the request thread
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _slots = threading.BoundedSemaphore(current_app.config.get('PASSWORD_MAX_PENDING', 32))
+                _pool = ProcessPoolExecutor(max_workers=workers)
+                current_app.logger.info(f"Password hashing pool started with {workers} worker(s).")
+    return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(func, *args):
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+    config = current_app.config
+    t0 = time.perf_counter()
+    if not _slots.acquire(timeout=config.get('PASSWORD_QUEUE_TIMEOUT', 5)):
+        metrics.observe('password_busy', time.perf_counter() - t0)
+        raise PasswordServiceBusy(retry_after=config.get('PASSWORD_RETRY_AFTER', 2))
+    try:
+        future = pool.submit(func, *args)
+        try:
+            return future.result(timeout=config.get('PASSWORD_HASH_TIMEOUT', 30))
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordServiceBusy(retry_after=config.get('PASSWORD_RETRY_AFTER', 2))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time, answer this one inline
+            current_app.logger.error("Password hashing pool broke; restarting it.")
+            _reset_pool(pool)
+            return func(*args)
+    finally:
+        metrics.observe('password_hash', time.perf_counter() - t0) # Includes queue wait
+        _slots.release()
+
+
+def hash_password(password):
+    """Hashes with the configured method in the pool."""
+    return _run(generate_password_hash, password, hash_method())
+
+
+def check_user_password(user, password):
+    """Verifies `user`'s password in the pool, upgrading an outdated hash on success.
+
+    The upgrade is only staged on the session; the caller commits. Raises
+    PasswordServiceBusy if the pool is saturated.
+    """
+    if not _run(check_password_hash, user.password_hash, password):
+        return False
+    if needs_rehash(user.password_hash):
+        old_method = user.password_hash.split('$', 1)[0]
+        user.password_hash = hash_password(password)
+        current_app.logger.info(f"Rehashed password for '{user.username}' ({old_method} -> {hash_method()}).")
+    return True
@@ -0,0 +1,119 @@
+# In-process cache for reference data (departments and roles)
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .models import db, Department, Role, RefDataGeneration
+
+# Departments and roles almost never change, so every worker keeps an immutable
+# snapshot of them. Writers bump the single-row generation counter in the same
+# transaction as the change; workers re-read the counter at most once every
+# REFDATA_CHECK_SECONDS and rebuild their snapshot when it moved. A lookup that
+# misses re-checks at once, so a department just created on another worker is
+# found without waiting for the next check.
+_snapshot = None
+_lock = threading.Lock()
+
+
+class _Snapshot:
+    """Lookup tables built from one read of the departments and roles tables."""
+
+    def __init__(self, generation, departments, roles):
+        self.generation = generation
+        self.checked_at = time.monotonic()
+        self.department_names = {dept_id: name for dept_id, name in departments}
+        self.department_ids = {name: dept_id for dept_id, name in departments}
+        self.role_types = {role_id: role_type for role_id, role_type in roles}
+        self.role_ids = {role_type: role_id for role_id, role_type in roles}
+
+
+def _read_generation():
+    return db.session.scalar(db.select(RefDataGeneration.value).where(RefDataGeneration.id == 1)) or 0
+
+
+def _get_snapshot(recheck=False):
+    """The current snapshot; `recheck` compares its generation with the database now."""
+    global _snapshot
+    snapshot = _snapshot
+    interval = current_app.config.get('REFDATA_CHECK_SECONDS', 5)
+    if not recheck and snapshot is not None and time.monotonic() - snapshot.checked_at < interval:
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        if not recheck and snapshot is not None and time.monotonic() - snapshot.checked_at < interval:
+            return snapshot
+        # Read the generation before the data: if a writer commits in between we
+        # hold newer data under an older generation and simply reload next check.
+        generation = _read_generation()
+        if snapshot is not None and snapshot.generation == generation:
+            snapshot.checked_at = time.monotonic()
+            return snapshot
+        departments = db.session.execute(db.select(Department.id, Department.name)).all()
+        roles = db.session.execute(db.select(Role.id, Role.name)).all()
+        _snapshot = _Snapshot(generation, departments, roles)
+        current_app.logger.info(f"Reference data cache loaded (generation {generation}): "
+                                f"{len(departments)} departments, {len(roles)} roles.")
+        return _snapshot
+
+
+def bump_generation():
+    """Marks reference data as changed. Call inside the writing transaction, before commit."""
+    updated = db.session.execute(
+        db.update(RefDataGeneration).where(RefDataGeneration.id == 1)
+        .values(value=RefDataGeneration.value + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(RefDataGeneration(id=1, value=1))
+    # This worker drops its snapshot once the change is committed (see below);
+    # dropped any earlier, a concurrent lookup could reload and keep the old data
+    db.session.info['refdata_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_snapshot_after_commit(session):
+    global _snapshot
+    if session.info.pop('refdata_changed', False):
+        _snapshot = None # Reloaded on next lookup; other workers notice the new generation
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_change(session):
+    session.info.pop('refdata_changed', None)
+
+
+# --- Lookups ---
+def _lookup(table, key):
+    """Looks `key` up in a snapshot table (attribute name); a miss re-checks the generation first."""
+    value = getattr(_get_snapshot(), table).get(key)
+    if value is None:
+        value = getattr(_get_snapshot(recheck=True), table).get(key)
+    return value
+
+
+def department_name(department_id):
+    """Returns the department's name, or None if the ID is unknown (or None)."""
+    if department_id is None:
+        return None
+    return _lookup('department_names', department_id)
+
+
+def department_id(name):
+    """Returns the ID of the department with this name, or None."""
+    return _lookup('department_ids', name)
+
+
+def departments():
+    """Returns [(id, name), ...] sorted by name."""
+    return sorted(_get_snapshot().department_names.items(), key=lambda item: item[1])
+
+
+def role_type(role_id):
+    """Returns the RoleType for a role ID, or None."""
+    return _lookup('role_types', role_id)
+
+
+def role_id(role_enum):
+    """Returns the ID of the role row for a RoleType, or None if not seeded."""
+    return _lookup('role_ids', role_enum)
@@ -0,0 +1,185 @@
+# Line-protocol TCP listener for fixed-mount scanners (run with `flask scan-listener`)
+#
+# Protocol, one line per scan (UTF-8, newline-terminated):
+#     <station token>,<barcode>,<status>        e.g.  Xy3...Qz,PCB-00012345,Pass
+# The barcode is everything between the first and the last comma. Every line gets
+# exactly one reply, in the order the lines were sent:
+#     ACK,<barcode>,<scan id>
+#     NAK,<barcode>,<reason>
+import asyncio
+from collections import namedtuple
+from .models import db, Station, User
+from . import scan_rules, live_stats
+
+_Pending = namedtuple('_Pending', 'token barcode status future')
+
+
+class _BadLine(Exception):
+    pass
+
+
+def _parse_line(raw):
+    line = raw.decode('utf-8', errors='replace').strip()
+    token, sep, rest = line.partition(',')
+    barcode, sep2, status = rest.rpartition(',')
+    if not sep or not sep2 or not token or not barcode:
+        raise _BadLine(line[:64])
+    return token, barcode, status.strip()
+
+
+class ScanListener:
+    """asyncio TCP server that validates and batch-inserts scans.
+
+    Connections only parse lines and queue them. A single flusher takes everything
+    queued (up to batch_size) and validates and inserts it in one transaction on a
+    worker thread, so batches grow with load instead of costing a commit per scan.
+    """
+
+    def __init__(self, app, host, port, batch_size=500):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.max_line = app.config.get('SCAN_LISTENER_MAX_LINE', 1024)
+        self._queue = None
+
+    async def serve(self):
+        # Bounded, so a flood of lines stops being read (TCP backpressure) while the DB catches up
+        self._queue = asyncio.Queue(maxsize=self.batch_size * 4)
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port, limit=self.max_line)
+        self.app.logger.info(f"Scan listener accepting connections on {self.host}:{self.port}.")
+        flusher = asyncio.create_task(self._flush_forever())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+
+    # --- Connections ---
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        self.app.logger.info(f"Scan listener: connection from {peer}.")
+        replies = asyncio.Queue() # Futures (or ready reply strings) in line order
+        reply_task = asyncio.create_task(self._write_replies(replies, writer))
+        try:
+            while True:
+                try:
+                    raw = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as e:
+                    raw = e.partial # Last line without newline, or EOF
+                    if not raw.strip():
+                        break
+                except asyncio.LimitOverrunError:
+                    await replies.put("NAK,,Line too long")
+                    break
+                if not raw.strip():
+                    continue
+                try:
+                    token, barcode, status = _parse_line(raw)
+                except _BadLine as e:
+                    await replies.put(f"NAK,,Malformed line '{e}' (expected token,barcode,status)")
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                await self._queue.put(_Pending(token, barcode, status, future))
+                await replies.put(future)
+        except ConnectionError:
+            pass
+        finally:
+            await replies.put(None)
+            await reply_task
+            self.app.logger.info(f"Scan listener: {peer} disconnected.")
+
+    async def _write_replies(self, replies, writer):
+        try:
+            while True:
+                item = await replies.get()
+                if item is None:
+                    break
+                reply = item if isinstance(item, str) else await item
+                writer.write(reply.encode('utf-8') + b'\n')
+                if replies.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # --- Batching ---
+    async def _flush_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                replies = await loop.run_in_executor(None, self._process_batch, batch)
+            except Exception as e:
+                self.app.logger.error(f"Scan listener: batch of {len(batch)} failed: {e}")
+                replies = [f"NAK,{item.barcode},Server error" for item in batch]
+            for item, reply in zip(batch, replies):
+                if not item.future.done(): # Connection may have gone away
+                    item.future.set_result(reply)
+
+    def _process_batch(self, batch):
+        """Validates and inserts one batch (worker thread). Returns a reply per item."""
+        with self.app.app_context():
+            try:
+                stations = self._resolve_stations({item.token for item in batch})
+                replies = [None] * len(batch)
+                candidates, positions = [], []
+                for index, item in enumerate(batch):
+                    station = stations.get(item.token)
+                    if station is None:
+                        replies[index] = f"NAK,{item.barcode},Unknown or inactive station token"
+                    elif station.order_id is None:
+                        replies[index] = f"NAK,{item.barcode},Station '{station.name}' has no order assigned"
+                    else:
+                        candidates.append({
+                            'barcode': item.barcode,
+                            'status': item.status,
+                            'order_id': station.order_id,
+                            'user_id': station.user_id,
+                            'department_id': station.department_id,
+                        })
+                        positions.append(index)
+
+                results = scan_rules.validate_scan_batch(candidates)
+                rows = [result for result in results if not isinstance(result, scan_rules.ScanRejected)]
+                inserted = scan_rules.insert_scans(rows)
+                db.session.commit()
+                live_stats.record_scans(rows)
+                inserted = iter(inserted)
+                for index, result in zip(positions, results):
+                    barcode = batch[index].barcode
+                    if isinstance(result, scan_rules.ScanRejected):
+                        replies[index] = f"NAK,{barcode},{result.message}"
+                    else:
+                        replies[index] = f"ACK,{barcode},{next(inserted).id}"
+                if rows:
+                    self.app.logger.info(f"Scan listener: recorded {len(rows)} of {len(batch)} scans.")
+                return replies
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _resolve_stations(tokens):
+        """Maps plain tokens to active station rows (with the user's department) in one query."""
+        hashes = {Station.hash_token(token): token for token in tokens}
+        rows = db.session.execute(
+            db.select(Station.token_hash, Station.name, Station.user_id, Station.order_id, User.department_id)
+            .join(User, Station.user_id == User.id)
+            .where(Station.token_hash.in_(hashes), Station.is_active.is_(True))
+        ).all()
+        return {hashes[row.token_hash]: row for row in rows}
+
+
+def run_listener(app, host, port, batch_size):
+    """Runs the listener until interrupted (blocking)."""
+    listener = ScanListener(app, host, port, batch_size)
+    try:
+        asyncio.run(listener.serve())
+    except KeyboardInterrupt:
+        app.logger.info("Scan listener stopped.")
@@ -0,0 +1,138 @@
+# Validation rules shared by every path that records scans
+from .models import db, Scan, ScanStatus, Order, User
+from . import board_state
+
+
+IDEMPOTENCY_KEY_LENGTH = 64 # Scan.idempotency_key column size
+
+
+class ScanRejected(Exception):
+    """A scan failed validation. `message` is user-facing; `status_code` is the HTTP equivalent."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def parse_status(status_str):
+    """Converts 'Pass'/'Fail' to a ScanStatus."""
+    try:
+        return ScanStatus(status_str)
+    except ValueError:
+        valid_statuses = [s.value for s in ScanStatus]
+        raise ScanRejected(f"Invalid status '{status_str}'. Must be one of: {valid_statuses}", 400)
+
+
+def _order_not_found(order_id):
+    return ScanRejected(f"Order with ID {order_id} not found", 404)
+
+
+def _duplicate(barcode, order_id):
+    return ScanRejected(f"Barcode '{barcode}' has already been scanned for this order (Order ID: {order_id})", 409)
+
+
+def _no_department():
+    # Users without a department (e.g. Admin) cannot record scans
+    return ScanRejected("User must belong to a department to record scans", 400)
+
+
+def check_idempotency_key(key):
+    """Rejects a malformed client idempotency key (None means the client sent none)."""
+    if key is not None and (not isinstance(key, str) or not key or len(key) > IDEMPOTENCY_KEY_LENGTH):
+        raise ScanRejected(f"idempotency_key must be a non-empty string of at most {IDEMPOTENCY_KEY_LENGTH} characters", 400)
+
+
+def validate_scan(barcode, status_str, order_id, department_id):
+    """Checks one scan. Returns (ScanStatus, Order) or raises ScanRejected."""
+    scan_status = parse_status(status_str)
+    order = db.session.get(Order, order_id)
+    if not order:
+        raise _order_not_found(order_id)
+    existing_scan = db.session.scalars(
+        db.select(Scan.id).filter_by(barcode=barcode, order_id=order_id)
+    ).first()
+    if existing_scan:
+        raise _duplicate(barcode, order_id)
+    if not department_id:
+        raise _no_department()
+    return scan_status, order
+
+
+def validate_scan_batch(items):
+    """Checks many scans with a fixed number of queries, applying validate_scan's rules.
+
+    `items` are dicts with barcode, status, order_id, user_id, department_id and
+    optionally notes and idempotency_key. Returns a list aligned with `items` holding either a row dict
+    ready for insert_scans() or the ScanRejected for that item. A barcode repeated
+    within the batch for the same order is accepted once and rejected as a duplicate after.
+    """
+    order_ids = {item['order_id'] for item in items}
+    barcodes = {item['barcode'] for item in items}
+    known_orders = set(db.session.scalars(db.select(Order.id).where(Order.id.in_(order_ids)))) if order_ids else set()
+    seen = set()
+    if known_orders and barcodes:
+        seen.update(db.session.execute(
+            db.select(Scan.order_id, Scan.barcode)
+            .where(Scan.order_id.in_(known_orders), Scan.barcode.in_(barcodes))
+        ).tuples())
+
+    results = []
+    for item in items:
+        try:
+            scan_status = parse_status(item['status'])
+            if item['order_id'] not in known_orders:
+                raise _order_not_found(item['order_id'])
+            key = (item['order_id'], item['barcode'])
+            if key in seen:
+                raise _duplicate(item['barcode'], item['order_id'])
+            if not item.get('department_id'):
+                raise _no_department()
+        except ScanRejected as rejection:
+            results.append(rejection)
+            continue
+        seen.add(key)
+        results.append({
+            'barcode': item['barcode'],
+            'status': scan_status,
+            'notes': item.get('notes'),
+            'user_id': item['user_id'],
+            'department_id': item['department_id'],
+            'order_id': item['order_id'],
+            'idempotency_key': item.get('idempotency_key'),
+        })
+    return results
+
+
+def recorded_scans(idempotency_keys):
+    """Scans already recorded under any of `idempotency_keys`, as {key: row}.
+
+    Rows carry the Scan columns plus the recording user's username. Clients resend
+    scans whose first submission may have gone through (e.g. the response was lost);
+    those are answered with the original scan instead of a duplicate error.
+    """
+    keys = {key for key in idempotency_keys if key}
+    if not keys:
+        return {}
+    rows = db.session.execute(
+        db.select(Scan.idempotency_key, Scan.id, Scan.barcode, Scan.timestamp, Scan.status, Scan.notes,
+                  Scan.user_id, Scan.department_id, Scan.order_id, User.username)
+        .join(User, Scan.user_id == User.id)
+        .where(Scan.idempotency_key.in_(keys))
+    ).all()
+    return {row.idempotency_key: row for row in rows}
+
+
+def insert_scans(rows):
+    """Inserts validated rows in one executemany and updates board state.
+
+    Returns the new (id, timestamp) rows in row order. Does not commit.
+    """
+    if not rows:
+        return []
+    inserted = db.session.execute(
+        db.insert(Scan).returning(Scan.id, Scan.timestamp, sort_by_parameter_order=True), rows
+    ).all()
+    board_state.apply_scans([dict(row, id=scan_id, timestamp=timestamp)
+                             for row, (scan_id, timestamp) in zip(rows, inserted)])
+    return inserted
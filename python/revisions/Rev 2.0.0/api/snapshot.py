@@ -0,0 +1,159 @@
+# Append-only columnar snapshot of scan history for reporting (`flask snapshot-scans`)
+#
+# Layout of a snapshot directory:
+#     manifest.json        row count, id watermark, column dtypes, export time
+#     labels.json          department/user/order display names at the last export
+#     <column>.bin         raw little-endian array per ScanColumns field
+# The manifest is replaced atomically after the column files are appended and
+# flushed, so readers only ever see `rows` complete rows; bytes past that
+# (from an interrupted export) are ignored and truncated by the next export.
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from .analytics import ScanColumns, load_columns
+
+MANIFEST = 'manifest.json'
+LABELS = 'labels.json'
+LOCK = 'export.lock'
+FORMAT_VERSION = 1
+# Explicit little-endian dtypes so snapshots can be copied between machines
+COLUMN_DTYPES = {name: np.dtype(dtype).newbyteorder('<') for name, dtype in ScanColumns.DTYPES.items()}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Snapshot:
+    """A read-only view of a snapshot directory; columns are memory-mapped, not loaded."""
+
+    def __init__(self, directory, manifest, labels):
+        self.directory = directory
+        self.manifest = manifest
+        self.labels = labels
+
+    @property
+    def rows(self):
+        return self.manifest['rows']
+
+    @property
+    def watermark_id(self):
+        return self.manifest['watermark_id']
+
+    @property
+    def exported_at(self):
+        return self.manifest.get('exported_at')
+
+    def columns(self):
+        """Returns ScanColumns backed by np.memmap (zero-copy; pages load on access)."""
+        if not self.rows:
+            return ScanColumns.empty()
+        return ScanColumns(**{
+            name: np.memmap(os.path.join(self.directory, f'{name}.bin'), dtype=dtype, mode='r', shape=(self.rows,))
+            for name, dtype in COLUMN_DTYPES.items()
+        })
+
+    def label(self, by, key):
+        """Display name for a department_id/user_id/order_id as of the last export."""
+        return self.labels.get(by, {}).get(str(key))
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json_atomic(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def open_snapshot(directory):
+    """Opens the snapshot in `directory`; returns None if there is none yet.
+
+    Needs no app context or database, so offline scripts can use it directly:
+        snap = open_snapshot('/data/scan_snapshot'); cols = snap.columns()
+    """
+    manifest = _read_json(os.path.join(directory, MANIFEST))
+    if manifest is None:
+        return None
+    if manifest.get('version') != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {manifest.get('version')} in {directory}")
+    return Snapshot(directory, manifest, _read_json(os.path.join(directory, LABELS), {}))
+
+
+# --- Export (needs an app context) ---
+def _export_labels():
+    from . import refdata
+    from .models import db, User, Order
+    return {
+        'department_id': {str(dept_id): name for dept_id, name in refdata.departments()},
+        'user_id': {str(user_id): username for user_id, username in db.session.execute(db.select(User.id, User.username))},
+        'order_id': {str(order_id): number for order_id, number in db.session.execute(db.select(Order.id, Order.order_number))},
+    }
+
+
+def export_scans(directory, lag_seconds=60, chunk_rows=500_000, rebuild=False, log=print):
+    """Appends scans newer than the watermark to the snapshot in `directory`.
+
+    Only scans older than `lag_seconds` are exported, so transactions that took
+    their id earlier but committed later are still picked up next time. The
+    snapshot is append-only: later edits and deletions are not reflected until
+    it is rebuilt (rebuild=True). Returns the number of rows appended.
+    """
+    os.makedirs(directory, exist_ok=True)
+    lock_path = os.path.join(directory, LOCK)
+    try:
+        lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        raise SnapshotError(f"Another export is running (remove {lock_path} if it crashed)")
+    try:
+        manifest = None if rebuild else _read_json(os.path.join(directory, MANIFEST))
+        if manifest is None:
+            manifest = {'version': FORMAT_VERSION, 'rows': 0, 'watermark_id': 0,
+                        'columns': {name: dtype.str for name, dtype in COLUMN_DTYPES.items()}}
+        files = {}
+        for name, dtype in COLUMN_DTYPES.items():
+            path = os.path.join(directory, f'{name}.bin')
+            f = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+            f.truncate(manifest['rows'] * dtype.itemsize) # Drop rows of an interrupted export
+            f.seek(0, os.SEEK_END)
+            files[name] = f
+
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=lag_seconds)
+        appended = 0
+        try:
+            while True:
+                cols = load_columns(end=cutoff, after_id=manifest['watermark_id'], limit=chunk_rows)
+                if not len(cols):
+                    break
+                for name, dtype in COLUMN_DTYPES.items():
+                    files[name].write(getattr(cols, name).astype(dtype, copy=False).tobytes())
+                appended += len(cols)
+                manifest['watermark_id'] = int(cols.id[-1])
+                log(f"Exported {appended:,} scans (up to id {manifest['watermark_id']}).")
+                if len(cols) < chunk_rows:
+                    break
+            for f in files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in files.values():
+                f.close()
+
+        manifest['rows'] += appended
+        manifest['exported_at'] = datetime.now(timezone.utc).isoformat()
+        _write_json_atomic(os.path.join(directory, LABELS), _export_labels())
+        _write_json_atomic(os.path.join(directory, MANIFEST), manifest)
+        return appended
+    finally:
+        os.close(lock_fd)
+        os.remove(lock_path)
@@ -0,0 +1,75 @@
+# Wire format negotiation (JSON or MessagePack) for API requests and responses
+import json
+from datetime import datetime, timezone
+from flask import current_app, request
+
+try:
+    import msgpack
+except ImportError: # Optional - the API speaks JSON only without it
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def _to_epoch_ms(dt):
+    # Timestamps are stored as naive UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        return _to_epoch_ms(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+
+def encode_json(payload):
+    """Datetimes become ISO 8601 strings (the format clients have always received)."""
+    return json.dumps(payload, default=_json_default, separators=(',', ':')) + "\n"
+
+
+def encode_msgpack(payload):
+    """Datetimes become integer epoch milliseconds."""
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def wants_msgpack():
+    """True if the client prefers MessagePack (JSON wins ties, e.g. for */*)."""
+    if msgpack is None:
+        return False
+    return request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+def jsonify(payload):
+    """Drop-in for flask.jsonify that answers in the negotiated format.
+
+    Routes pass datetimes as-is and this picks the representation.
+    """
+    if wants_msgpack():
+        return current_app.response_class(encode_msgpack(payload), mimetype=MSGPACK_MIMETYPE)
+    return current_app.response_class(encode_json(payload), mimetype=JSON_MIMETYPE)
+
+
+def get_request_data():
+    """Returns the decoded request body (MessagePack or JSON) like request.get_json()."""
+    if request.mimetype == MSGPACK_MIMETYPE and msgpack is not None:
+        try:
+            return msgpack.unpackb(request.get_data(), raw=False)
+        except Exception:
+            return None
+    return request.get_json()
+
+
+def decode_response(response):
+    """Decodes a (sub-)response body produced by jsonify, whichever format it used."""
+    if response.mimetype == MSGPACK_MIMETYPE and msgpack is not None:
+        return msgpack.unpackb(response.get_data(), raw=False)
+    return response.get_json()
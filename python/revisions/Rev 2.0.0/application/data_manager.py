@@ -139,8 +139,10 @@ class DataManager:
         # Create indices for faster lookups
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_scans_barcode ON scans (barcode)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans (timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_scans_order_barcode ON scans (order_id, barcode)')
         cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_order_number ON orders (order_number)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders (created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_order_number_lower ON orders (lower(order_number))')
         
         conn.commit()
         conn.close()
@@ -741,6 +743,90 @@ class DataManager:
             logging.error(f"Error retrieving orders: {e}")
             return {"success": False, "status_code": 500, "message": f"Database error: {str(e)}"}
 
+    def _order_departments(self):
+        """Department databases whose orders the current user sees: all for Admins, else their own."""
+        if self.current_user.get('role') == 'Admin':
+            conn = sqlite3.connect(self.users_db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT name FROM departments')
+            departments = [dept[0] for dept in cursor.fetchall()] + ["Admin"]
+            conn.close()
+            return departments
+        return [self.current_user.get('department')] if self.current_user.get('department') else []
+
+    def get_change_version(self):
+        """A token that changes whenever a department database this user reads is written.
+
+        Only file metadata (size, modification time) is read, so it is cheap enough to
+        poll; the databases may be shared with other stations.
+        """
+        if not self.current_user:
+            return {"success": False, "status_code": 401, "message": "Authentication required"}
+
+        try:
+            version = []
+            for dept_name in self._order_departments():
+                db_path = self._get_department_db_path(dept_name)
+                if db_path.exists():
+                    stat = db_path.stat()
+                    version.append([dept_name, stat.st_size, stat.st_mtime_ns])
+            return {"success": True, "status_code": 200, "data": {"version": version}}
+        except Exception as e:
+            logging.error(f"Error reading change version: {e}")
+            return {"success": False, "status_code": 500, "message": f"Database error: {str(e)}"}
+
+    def search_orders(self, query="", limit=None):
+        """Orders whose number starts with `query` (case-insensitive), like GET /orders/search.
+
+        Admins search every department database, other users their own. The prefix
+        is matched as a range on lower(order_number), which reads idx_orders_order_number_lower.
+        """
+        if not self.current_user:
+            return {"success": False, "status_code": 401, "message": "Authentication required"}
+
+        prefix = query.strip().lower()
+        limit = limit or 20
+        try:
+            orders_list = []
+            for dept_name in self._order_departments():
+                db_path = self._get_department_db_path(dept_name)
+                if not db_path.exists():
+                    continue
+                conn = sqlite3.connect(db_path)
+                cursor = conn.cursor()
+                if prefix:
+                    # Every string starting with the prefix sorts in [prefix, prefix + U+10FFFF)
+                    cursor.execute('''
+                        SELECT id, order_number, description, created_at FROM orders
+                        WHERE lower(order_number) >= ? AND lower(order_number) < ?
+                        ORDER BY lower(order_number) LIMIT ?
+                    ''', (prefix, prefix + '\U0010ffff', limit + 1))
+                else:
+                    cursor.execute('SELECT id, order_number, description, created_at FROM orders ORDER BY created_at DESC LIMIT ?',
+                                   (limit + 1,))
+                for order_id, order_number, description, created_at in cursor.fetchall():
+                    orders_list.append({
+                        "id": order_id,
+                        "order_number": order_number,
+                        "description": description,
+                        "created_at": created_at,
+                        "department_name": dept_name
+                    })
+                conn.close()
+
+            if prefix:
+                orders_list.sort(key=lambda order: order["order_number"].lower())
+            else:
+                orders_list.sort(key=lambda order: order["created_at"] or "", reverse=True)
+            return {
+                "success": True,
+                "status_code": 200,
+                "data": {"query": query.strip(), "orders": orders_list[:limit], "has_more": len(orders_list) > limit}
+            }
+        except Exception as e:
+            logging.error(f"Error searching orders for '{query}': {e}")
+            return {"success": False, "status_code": 500, "message": f"Database error: {str(e)}"}
+
     def delete_order(self, order_id):
         """Delete an order (Admin only)."""
         if not self.current_user:
@@ -860,7 +946,9 @@ class DataManager:
                         "notes": notes,
                         "user_id": self.current_user.get('id'),
                         "department_id": self.current_user.get('department_id'),
-                        "order_id": order_id
+                        "order_id": order_id,
+                        "username": self.current_user.get('username'),
+                        "department_name": self.current_user.get('department')
                     }
                 }
             }
@@ -868,10 +956,59 @@ class DataManager:
             logging.error(f"Error recording scan for barcode '{barcode}': {e}")
             return {"success": False, "status_code": 500, "message": f"Database error: {str(e)}"}
 
-    def get_scans(self, order_id=None, user_id=None, department_id=None):
-        """Get scans with optional filtering."""
+    def get_order_barcodes(self, order_id):
+        """Barcodes already scanned for an order, for client-side duplicate checks.
+
+        record_scan rejects duplicates within the user's department database, so
+        only that database is read.
+        """
+        if not self.current_user:
+            return {"success": False, "status_code": 401, "message": "Authentication required"}
+        
+        department_name = self.current_user.get('department')
+        if not department_name:
+            return {"success": True, "status_code": 200, "data": {"order_id": order_id, "count": 0, "barcodes": []}}
+        
+        try:
+            db_path = self._get_department_db_path(department_name)
+            barcodes = []
+            if db_path.exists():
+                conn = sqlite3.connect(db_path)
+                cursor = conn.cursor()
+                cursor.execute('SELECT barcode FROM scans WHERE order_id = ?', (order_id,))
+                barcodes = [row[0] for row in cursor.fetchall()]
+                conn.close()
+            
+            return {
+                "success": True,
+                "status_code": 200,
+                "data": {"order_id": order_id, "count": len(barcodes), "barcodes": barcodes}
+            }
+        except Exception as e:
+            logging.error(f"Error getting barcodes for order {order_id}: {e}")
+            return {"success": False, "status_code": 500, "message": f"Database error: {str(e)}"}
+
+    def get_scans(self, order_id=None, user_id=None, department_id=None, scope=None, limit=None, page_cursor=None,
+                  after_id=None, after_scan=None):
+        """Get scans with optional filtering.
+
+        Like the API, scans default to the user's own department; Admins and Managers
+        may pass another department_id or scope="all". With `limit`, one page is
+        returned with "next_cursor": the last scan's (timestamp, department, id), since
+        scan ids are only unique within a department database. Each database then only
+        reads the rows after it, so a deep page costs no more than the first.
+        `after_id` keeps scans with a higher id, per department database; `after_scan`,
+        a (timestamp, department, id), keeps the scans sorting above (newer than) it.
+        """
         if not self.current_user:
             return {"success": False, "status_code": 401, "message": "Authentication required"}
+
+        try:
+            cursor_key = json.loads(page_cursor) if page_cursor else None
+            cursor_timestamp, cursor_department, cursor_id = cursor_key if cursor_key is not None else (None, None, None)
+            after_timestamp, after_department, after_scan_id = after_scan if after_scan is not None else (None, None, None)
+        except (ValueError, TypeError):
+            return {"success": False, "status_code": 400, "message": "Invalid cursor"}
         
         try:
             scans_list = []
@@ -879,8 +1016,9 @@ class DataManager:
             # Determine which departments to query
             departments_to_query = []
             
-            if self.current_user.get('role') == 'Admin':
-                # Admin can see scans from all departments
+            own_department = self.current_user.get('department')
+            if self.current_user.get('role') in ('Admin', 'Manager') and (department_id or scope == 'all' or not own_department):
+                # Admins and Managers can see other departments when they ask for them
                 if department_id:
                     # Get specific department name if department_id is provided
                     conn = sqlite3.connect(self.users_db_path)
@@ -899,8 +1037,8 @@ class DataManager:
                     departments_to_query = [dept[0] for dept in cursor.fetchall()]
                     conn.close()
             else:
-                # Regular users only see scans from their department
-                departments_to_query = [self.current_user.get('department')] if self.current_user.get('department') else []
+                # Everyone else (and the default) sees scans from their own department
+                departments_to_query = [own_department] if own_department else []
             
             # Query each department
             for dept_name in departments_to_query:
@@ -924,10 +1062,42 @@ class DataManager:
                     conditions.append('user_id = ?')
                     params.append(user_id)
                 
+                if after_id is not None:
+                    conditions.append('id > ?')
+                    params.append(after_id)
+                
+                if cursor_key is not None:
+                    # Rows sorting after the cursor in (timestamp, department, id) DESC order
+                    if dept_name < cursor_department:
+                        conditions.append('timestamp <= ?') # Same-timestamp rows of this department come later
+                        params.append(cursor_timestamp)
+                    elif dept_name > cursor_department:
+                        conditions.append('timestamp < ?')
+                        params.append(cursor_timestamp)
+                    else:
+                        conditions.append('timestamp <= ? AND (timestamp < ? OR id < ?)')
+                        params.extend([cursor_timestamp, cursor_timestamp, cursor_id])
+                
+                if after_scan is not None:
+                    # Rows sorting before `after_scan` in (timestamp, department, id) DESC order
+                    if dept_name > after_department:
+                        conditions.append('timestamp >= ?')
+                        params.append(after_timestamp)
+                    elif dept_name < after_department:
+                        conditions.append('timestamp > ?')
+                        params.append(after_timestamp)
+                    else:
+                        conditions.append('timestamp >= ? AND (timestamp > ? OR id > ?)')
+                        params.extend([after_timestamp, after_timestamp, after_scan_id])
+                
                 if conditions:
                     query += ' WHERE ' + ' AND '.join(conditions)
                 
-                query += ' ORDER BY timestamp DESC'
+                query += ' ORDER BY timestamp DESC, id DESC'
+                if limit:
+                    # Enough rows from each department to fill this page after merging
+                    query += ' LIMIT ?'
+                    params.append(limit + 1)
                 
                 cursor.execute(query, params)
                 
@@ -951,6 +1121,14 @@ class DataManager:
                 
                 conn.close()
             
+            page = {}
+            if limit:
+                scans_list.sort(key=lambda scan: (scan["timestamp"], scan["department_name"], scan["id"]), reverse=True)
+                has_more = len(scans_list) > limit
+                scans_list = scans_list[:limit]
+                last = scans_list[-1] if scans_list else None
+                page = {"next_cursor": json.dumps([last["timestamp"], last["department_name"], last["id"]]) if has_more else None}
+
             # Get usernames for the scans
             user_ids = set(scan["user_id"] for scan in scans_list)
             usernames = {}
@@ -976,7 +1154,8 @@ class DataManager:
                 "success": True, 
                 "status_code": 200, 
                 "data": {
-                    "scans": scans_list
+                    "scans": scans_list,
+                    **page
                 }
             }
         except Exception as e:
@@ -10,6 +10,11 @@ class MainWindowAdapter:
     Adapter that presents a DataManager with the same interface as ApiClient,
     allowing the MainWindow class to work without modification.
     """
+    # MainWindow runs calls on a worker pool (gui/async_backend.py); one at a time keeps
+    # the SQLite files free of writer contention
+    max_concurrent_calls = 1
+    # Scan ids repeat across the department databases (see DataManager.get_scans)
+    scan_ids_unique = False
     
     def __init__(self, data_manager):
         """
@@ -45,6 +50,10 @@ class MainWindowAdapter:
         """Pass-through for get_orders method."""
         return self.data_manager.get_orders()
     
+    def search_orders(self, query="", limit=None):
+        """Pass-through for search_orders method."""
+        return self.data_manager.search_orders(query, limit)
+    
     def create_order(self, order_number, description=None):
         """Pass-through for create_order method."""
         return self.data_manager.create_order(order_number, description)
@@ -53,15 +62,40 @@ class MainWindowAdapter:
         """Pass-through for delete_order method."""
         return self.data_manager.delete_order(order_id)
     
+    def get_order_barcodes(self, order_id):
+        """Pass-through for get_order_barcodes method."""
+        return self.data_manager.get_order_barcodes(order_id)
+    
     # --- Scan Methods ---
     
     def record_scan(self, barcode, status, order_id, notes=None):
         """Pass-through for record_scan method."""
         return self.data_manager.record_scan(barcode, status, order_id, notes)
     
-    def get_scans(self, order_id=None, user_id=None, department_id=None):
-        """Pass-through for get_scans method."""
-        return self.data_manager.get_scans(order_id, user_id, department_id)
+    def record_scans(self, scans):
+        """Records each scan in turn; same result shape as ApiClient.record_scans."""
+        results = []
+        for scan in scans:
+            result = self.data_manager.record_scan(scan["barcode"], scan["status"], scan["order_id"], scan.get("notes"))
+            status_code = result.get("status_code") or 500
+            if status_code == 401 or status_code >= 500: # E.g. a locked database: leave the rest to be resent
+                if not results:
+                    return result
+                break
+            data = result.get("data") or {}
+            results.append({"success": result["success"], "status_code": result.get("status_code"),
+                            "scan": data.get("scan"), "message": result.get("message")})
+        return {"success": True, "status_code": 200, "data": {"results": results}}
+    
+    def get_scans(self, order_id=None, user_id=None, department_id=None, fields=None, scope=None,
+                  limit=None, cursor=None, after_id=None, after_scan=None):
+        """Pass-through for get_scans method, keeping only `fields` keys if given."""
+        result = self.data_manager.get_scans(order_id, user_id, department_id, scope, limit, cursor, after_id, after_scan)
+        if fields and result.get("success"):
+            result["data"]["scans"] = [
+                {key: scan.get(key) for key in fields} for scan in result["data"]["scans"]
+            ]
+        return result
     
     def update_scan(self, scan_id, status=None, notes=None):
         """Pass-through for update_scan method."""
@@ -103,6 +137,12 @@ class MainWindowAdapter:
         """Pass-through for delete_user method."""
         return self.data_manager.delete_user(user_id)
     
+    # --- Change Feed Method ---
+    
+    def get_change_version(self):
+        """Pass-through for get_change_version method."""
+        return self.data_manager.get_change_version()
+    
     # --- Feedback Method ---
     
     def submit_feedback(self, feedback_text):
@@ -8,6 +8,7 @@ from data_manager import DataManager
 from main_window_adapter import MainWindowAdapter
 from gui.login_window import LoginWindow
 from gui.main_window import MainWindow
+from gui.prefetch import InitialDataPrefetch
 
 # Define the directory for feedback
 FEEDBACK_DIR = "errors-feedback"
@@ -74,16 +75,19 @@ class ApplicationController:
         Args:
             user_data (dict): Data about the logged-in user received from LoginWindow.
         """
+        # 0. Start the initial reads right away; they overlap building the window
+        adapter = MainWindowAdapter(self.data_manager)
+        prefetch = InitialDataPrefetch(adapter).start()
+
         if self.login_window:
             # 1. Show loading state on LoginWindow
             logging.info("Login successful, showing loading state on login window...")
             self.login_window.show_loading_state()
             QApplication.processEvents() # Allow UI to update
         
-        # 2. Create adapter and MainWindow
+        # 2. Create MainWindow
         logging.info("Creating MainWindow instance and loading initial data...")
-        adapter = MainWindowAdapter(self.data_manager)
-        self.main_window = MainWindow(user_data, adapter, get_feedback_file_path) 
+        self.main_window = MainWindow(user_data, adapter, get_feedback_file_path, prefetch=prefetch) 
         
         # 3. Hide LoginWindow *after* MainWindow is ready
         if self.login_window:
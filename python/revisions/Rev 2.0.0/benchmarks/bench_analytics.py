@@ -0,0 +1,126 @@
+"""
+Analytics benchmark: NumPy statistics (api/analytics.py) over 10M scans.
+
+1. Builds 10M synthetic scans as ScanColumns and times each statistic.
+2. Times the same fail-rate-by-user computation done row by row in Python
+   (how it looks when iterating query results), on a 1M-row sample.
+3. With --load-rows N (default 1M, 0 to skip), fills a temporary SQLite
+   database and times load_columns(), the single Core query that builds the
+   arrays, to show the extract rate.
+
+Run from the project root:
+    python benchmarks/bench_analytics.py [--rows 10000000] [--load-rows 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api.analytics import ScanColumns, yield_trend, throughput, hourly_profile, fail_rate, BUCKETS
+
+START = 1_767_225_600 # 2026-01-01 UTC
+DEPARTMENTS = 6
+USERS = 120
+ORDERS = 400
+
+
+def make_columns(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    return ScanColumns(
+        id=np.arange(1, rows + 1, dtype=np.int64),
+        ts=START + np.sort(rng.integers(0, 180 * 86400, rows)).astype(np.int64),
+        failed=(rng.random(rows) < 0.04).astype(np.int8),
+        department_id=rng.integers(1, DEPARTMENTS + 1, rows).astype(np.int32),
+        user_id=rng.integers(1, USERS + 1, rows).astype(np.int32),
+        order_id=rng.integers(1, ORDERS + 1, rows).astype(np.int32),
+    )
+
+
+def timed(func):
+    t0 = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - t0
+
+
+def python_fail_rate(rows):
+    totals, fails = defaultdict(int), defaultdict(int)
+    for user_id, failed in rows:
+        totals[user_id] += 1
+        fails[user_id] += failed
+    return {user_id: fails[user_id] / totals[user_id] for user_id in totals}
+
+
+def bench_statistics(rows):
+    cols = make_columns(rows)
+    print(f"Statistics over {rows:,} scans (NumPy)")
+    cases = [
+        ("yield trend, daily", lambda: yield_trend(cols, BUCKETS['day'])),
+        ("throughput, hourly", lambda: throughput(cols, BUCKETS['hour'])),
+        ("throughput, daily x department", lambda: throughput(cols, BUCKETS['day'], by='department_id')),
+        ("hourly profile", lambda: hourly_profile(cols, 60 * 60)),
+        ("fail rate by user", lambda: fail_rate(cols, 'user_id')),
+        ("fail rate by order", lambda: fail_rate(cols, 'order_id')),
+    ]
+    for name, func in cases:
+        _, seconds = timed(func)
+        print(f"  {name:<34}{seconds * 1000:>9.1f} ms")
+
+    sample = min(rows, 1_000_000)
+    pairs = list(zip(cols.user_id[:sample].tolist(), cols.failed[:sample].tolist()))
+    _, seconds = timed(lambda: python_fail_rate(pairs))
+    print(f"  {'fail rate by user, Python loop':<34}{seconds * rows / sample * 1000:>9.1f} ms"
+          f"  (extrapolated from {sample:,} rows)")
+
+
+def bench_load(rows):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    from api import create_app, db
+    from api.models import Scan, ScanStatus, Department, Order, User, Role
+    from api.analytics import load_columns
+    app = create_app()
+    try:
+        with app.app_context():
+            db.create_all()
+            Role.insert_roles()
+            db.session.add(Department(id=1, name='SMT'))
+            db.session.add(User(id=1, username='bench', password_hash='-', role_id=1, department_id=1))
+            db.session.add(Order(id=1, order_number='BENCH', created_by_user_id=1))
+            db.session.commit()
+            cols = make_columns(rows)
+            timestamps = (cols.ts.astype('datetime64[s]').astype(object)).tolist()
+            failed = cols.failed.tolist()
+            chunk = 100_000
+            for offset in range(0, rows, chunk):
+                db.session.execute(db.insert(Scan.__table__), [{
+                    'barcode': f'B{offset + i}', 'timestamp': timestamps[offset + i],
+                    'status': ScanStatus.FAIL if failed[offset + i] else ScanStatus.PASS,
+                    'user_id': 1, 'department_id': 1, 'order_id': 1,
+                } for i in range(min(chunk, rows - offset))])
+            db.session.commit()
+            loaded, seconds = timed(load_columns)
+            print(f"load_columns() from SQLite: {len(loaded):,} rows in {seconds:.2f} s "
+                  f"({len(loaded) / seconds / 1e6:.2f} M rows/s)")
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--load-rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    bench_statistics(args.rows)
+    if args.load_rows:
+        bench_load(args.load_rows)
+
+
+if __name__ == '__main__':
+    main()
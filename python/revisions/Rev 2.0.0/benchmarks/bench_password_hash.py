@@ -0,0 +1,68 @@
+"""
+Password hash cost benchmark, for choosing PASSWORD_HASH_METHOD.
+
+1. Times one check_password_hash() for each candidate method on this machine.
+2. Simulates a shift-change login storm: N logins verified through a process pool
+   of each size (api/passwords.py uses the same executor), reporting the time until
+   the last login completes and the cores left free for scan traffic.
+
+Run from the project root on hardware like the API server's:
+    python benchmarks/bench_password_hash.py [--logins 60] [--methods pbkdf2:sha256:600000 ...]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+]
+PASSWORD = 'correct horse battery staple'
+
+
+def single_check_ms(password_hash, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        check_password_hash(password_hash, PASSWORD)
+        timings.append(time.perf_counter() - t0)
+    return min(timings) * 1000
+
+
+def storm_seconds(password_hash, logins, workers):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pool.submit(check_password_hash, password_hash, PASSWORD).result() # Warm up the workers
+        t0 = time.perf_counter()
+        futures = [pool.submit(check_password_hash, password_hash, PASSWORD) for _ in range(logins)]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=60, help='Logins arriving at once (stations per shift).')
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+    pool_sizes = sorted({1, max(1, cores // 4), max(1, cores // 2)})
+
+    print(f"{cores} CPU cores; {args.logins} simultaneous logins")
+    header = f"{'method':<26}{'1 check (ms)':>14}" + "".join(f"{f'pool={n} (s)':>14}" for n in pool_sizes)
+    print(header)
+    for method in args.methods:
+        password_hash = generate_password_hash(PASSWORD, method=method)
+        row = f"{method:<26}{single_check_ms(password_hash):>14.1f}"
+        row += "".join(f"{storm_seconds(password_hash, args.logins, n):>14.2f}" for n in pool_sizes)
+        print(row)
+    print("Each pool size leaves (cores - pool) cores for scan requests during the storm.")
+
+
+if __name__ == '__main__':
+    main()
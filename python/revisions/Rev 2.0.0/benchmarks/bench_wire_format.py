@@ -0,0 +1,86 @@
+"""
+Wire format benchmark: JSON vs MessagePack for a 50k-scan GET /scans listing.
+
+Encodes the payload exactly as the API does (api/wire.py) and decodes it the way
+ApiClient does (gui/api_client.py), then reports payload size and encode/decode
+time. MessagePack timestamps stay epoch-ms ints on the client; the last row shows
+what formatting all of them for display would add (the table only formats what it shows).
+
+Run from the project root:
+    python benchmarks/bench_wire_format.py [rows]
+"""
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import msgpack
+from api.wire import encode_json, encode_msgpack
+
+DEPARTMENTS = ["SMT", "Bench", "Final Assembly", "Inspection"]
+USERNAMES = [f"operator{i}" for i in range(40)]
+
+
+def make_scans(rows):
+    """Builds a listing shaped like get_scans() output (before wire encoding)."""
+    start = datetime(2026, 1, 1, 6, 0, 0)
+    scans = []
+    for i in range(rows):
+        dept_index = random.randrange(len(DEPARTMENTS))
+        user_index = random.randrange(len(USERNAMES))
+        scans.append({
+            "id": i + 1,
+            "barcode": f"PCB-{100000 + i:08d}",
+            "timestamp": start + timedelta(seconds=i * 3),
+            "status": "Fail" if random.random() < 0.04 else "Pass",
+            "notes": None if random.random() < 0.95 else "Solder bridge on U3",
+            "user_id": user_index + 1,
+            "department_id": dept_index + 1,
+            "order_id": 1 + i // 5000,
+            "username": USERNAMES[user_index],
+            "department_name": DEPARTMENTS[dept_index],
+        })
+    return {"scans": scans}
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    random.seed(42)
+    payload = make_scans(rows)
+
+    json_body = encode_json(payload).encode('utf-8')
+    msgpack_body = encode_msgpack(payload)
+
+    json_encode = best_of(lambda: encode_json(payload))
+    msgpack_encode = best_of(lambda: encode_msgpack(payload))
+    json_decode = best_of(lambda: json.loads(json_body))
+    msgpack_decode = best_of(lambda: msgpack.unpackb(msgpack_body, raw=False))
+    json_scans = json.loads(json_body)['scans']
+    msgpack_scans = msgpack.unpackb(msgpack_body, raw=False)['scans']
+    json_format = best_of(lambda: [datetime.fromisoformat(s['timestamp']) for s in json_scans])
+    msgpack_format = best_of(lambda: [datetime.fromtimestamp(s['timestamp'] / 1000, tz=timezone.utc)
+                                      for s in msgpack_scans])
+
+    print(f"GET /scans listing, {rows:,} rows")
+    print(f"{'':<28}{'JSON':>12}{'MessagePack':>14}")
+    print(f"{'payload size (KiB)':<28}{len(json_body) / 1024:>12.0f}{len(msgpack_body) / 1024:>14.0f}")
+    print(f"{'server encode (ms)':<28}{json_encode * 1000:>12.1f}{msgpack_encode * 1000:>14.1f}")
+    print(f"{'raw decode (ms)':<28}{json_decode * 1000:>12.1f}{msgpack_decode * 1000:>14.1f}")
+    print(f"{'parse every timestamp (ms)':<28}{json_format * 1000:>12.1f}{msgpack_format * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
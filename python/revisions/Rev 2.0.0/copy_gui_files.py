@@ -17,6 +17,14 @@ def copy_files(source_root, dest_root):
     # Files to copy
     files_to_copy = [
         ("gui/main_window.py", "application/gui/main_window.py"),
+        ("gui/async_backend.py", "application/gui/async_backend.py"),
+        ("gui/scan_table_model.py", "application/gui/scan_table_model.py"),
+        ("gui/scan_queue.py", "application/gui/scan_queue.py"),
+        ("gui/scan_journal.py", "application/gui/scan_journal.py"),
+        ("gui/barcode_set.py", "application/gui/barcode_set.py"),
+        ("gui/prefetch.py", "application/gui/prefetch.py"),
+        ("gui/order_picker.py", "application/gui/order_picker.py"),
+        ("gui/change_feed.py", "application/gui/change_feed.py"),
         ("gui/widgets.py", "application/gui/widgets.py"),
     ]
     
@@ -3,40 +3,92 @@
 import requests
 import json
 import logging # For logging API interactions
+import random
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+try:
+    import msgpack # Optional compact wire format, negotiated with the server
+except ImportError:
+    msgpack = None
+
+try:
+    from .transport import DEFAULT_SETTINGS, LatencyStats, EventStream, build_session, endpoint_key
+except ImportError:
+    from transport import DEFAULT_SETTINGS, LatencyStats, EventStream, build_session, endpoint_key
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+# A 503 carrying Retry-After means the server refused the request before doing any
+# work (admission control, password queue), so it is safe to resend any method.
+# Delays are jittered so stations refused together do not all come back together.
+BUSY_MAX_RETRIES = 3
+BUSY_MAX_DELAY = 8 # Seconds, per wait
+
+STREAM_READ_TIMEOUT = 45 # Seconds without data (not even the 15 s heartbeat) before an event stream counts as dead
+
+# Routine per-call messages are DEBUG; the application configures handlers and levels
+logger = logging.getLogger(__name__)
 
 class ApiClient:
     """Handles communication with the backend Flask API."""
 
-    def __init__(self, base_url="http://localhost:5000"):
+    def __init__(self, base_url="http://localhost:5000", **transport_settings):
         """
         Initializes the API client.
 
         Args:
             base_url (str): The base URL of the backend API.
+            **transport_settings: Overrides for transport.DEFAULT_SETTINGS (pool_size,
+                connect_timeout, read_timeout, max_retries, backoff_factor, compress).
         """
         if not base_url.endswith('/'):
             base_url += '/'
         self.base_url = base_url
-        # Use a requests Session object to persist cookies across requests
-        self.session = requests.Session() 
+        unknown = set(transport_settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown transport settings: {sorted(unknown)}")
+        self.transport_settings = dict(DEFAULT_SETTINGS, **transport_settings)
+        self.timeout = (self.transport_settings["connect_timeout"], self.transport_settings["read_timeout"])
+        # Pooled keep-alive session (also persists the login cookie across requests)
+        self.session = build_session(self.transport_settings)
+        # AsyncBackend runs this many calls at once, so each worker thread keeps a warm connection
+        self.max_concurrent_calls = self.transport_settings["pool_size"]
+        self.latency = LatencyStats() # Per-endpoint p50/p95, shown in Help > Connection Statistics
         self.current_user = None # Store logged-in user details
-        logging.info(f"ApiClient initialized with base URL: {self.base_url}")
+        # Ask for MessagePack when available; only send MessagePack bodies once the
+        # server has answered in it (older servers understand JSON only).
+        self.use_msgpack = msgpack is not None
+        self.server_speaks_msgpack = False
+        self.scan_batch_supported = None # Unknown until POST /scans/batch has been tried
+        self.order_search_supported = None # Unknown until GET /orders/search has been tried
+        logger.info(f"ApiClient initialized with base URL: {self.base_url}")
 
     def _make_request(self, method, endpoint, data=None, params=None):
         """Helper method to make requests and handle common errors."""
         url = self.base_url + endpoint.lstrip('/')
         headers = {'Content-Type': 'application/json'}
+        body = json.dumps(data) if data is not None else None
+        if self.use_msgpack:
+            headers['Accept'] = f'{MSGPACK_MIMETYPE}, application/json;q=0.9'
+            if self.server_speaks_msgpack and data is not None:
+                headers['Content-Type'] = MSGPACK_MIMETYPE
+                body = msgpack.packb(data, use_bin_type=True)
+        started = time.perf_counter()
+        failed = True
         try:
-            response = self.session.request(method, url, json=data, params=params, headers=headers, timeout=10) # Added timeout
-            
-            # Attempt to parse JSON, handle potential errors
+            for attempt in range(BUSY_MAX_RETRIES + 1):
+                response = self.session.request(method, url, data=body, params=params, headers=headers, timeout=self.timeout)
+                delay = self._busy_retry_delay(response, attempt)
+                if delay is None:
+                    break
+                logger.warning(f"API busy ({method} {url}); retrying in {delay:.1f}s (attempt {attempt + 1}/{BUSY_MAX_RETRIES}).")
+                time.sleep(delay)
+
+            # Attempt to parse the body (MessagePack or JSON), handle potential errors
             try:
-                 response_data = response.json()
-            except json.JSONDecodeError:
-                logging.error(f"API response for {method} {url} was not valid JSON: {response.text[:100]}...") # Log snippet
+                 response_data = self._decode_response(response)
+            except (json.JSONDecodeError, ValueError):
+                logger.error(f"API response for {method} {url} was not valid JSON: {response.text[:100]}...") # Log snippet
                 # For non-JSON errors (like 404 HTML pages), return a structured error
                 return {"success": False, "status_code": response.status_code, "message": f"Server returned non-JSON response (Status: {response.status_code})", "raw_response": response.text}
 
@@ -44,57 +96,86 @@ class ApiClient:
             if not response.ok: # response.ok is False for status codes 4xx and 5xx
                  # Log error message from JSON if available
                  error_message = response_data.get("message", f"HTTP Error {response.status_code}")
-                 logging.error(f"API Error ({method} {url}): {response.status_code} - {error_message}")
+                 logger.error(f"API Error ({method} {url}): {response.status_code} - {error_message}")
                  return {"success": False, "status_code": response.status_code, "message": error_message, "data": response_data}
 
             # Successful request
-            logging.info(f"API Success ({method} {url}): {response.status_code}")
+            failed = False
+            logger.debug(f"API Success ({method} {url}): {response.status_code}")
             return {"success": True, "status_code": response.status_code, "data": response_data}
 
         except requests.exceptions.RequestException as e:
-            logging.error(f"API Connection Error ({method} {url}): {e}")
+            logger.error(f"API Connection Error ({method} {url}): {e}")
             return {"success": False, "status_code": None, "message": f"Connection error: {e}"}
+        finally:
+            self.latency.observe(endpoint_key(method, endpoint), time.perf_counter() - started, error=failed)
             
+    @staticmethod
+    def _busy_retry_delay(response, attempt):
+        """Seconds to wait before resending a request the server refused as busy, or None."""
+        retry_after = response.headers.get('Retry-After')
+        if response.status_code != 503 or retry_after is None or attempt >= BUSY_MAX_RETRIES:
+            return None
+        try:
+            base = float(retry_after)
+        except ValueError:
+            base = 1.0 # HTTP-date form; not sent by this API
+        # Honor Retry-After as the minimum, back off exponentially above it with full jitter
+        return min(BUSY_MAX_DELAY, base + random.uniform(0, base * (2 ** attempt)))
+
+    def _decode_response(self, response):
+        """
+        Decodes a response body (MessagePack or JSON).
+
+        Note: with MessagePack, `timestamp`/`created_at` fields arrive as integer
+        epoch milliseconds instead of ISO strings. They are left as ints (converting
+        every row would cost more than the decode itself); display code formats them.
+        """
+        if self.use_msgpack and response.headers.get('Content-Type', '').startswith(MSGPACK_MIMETYPE):
+            self.server_speaks_msgpack = True
+            return msgpack.unpackb(response.content, raw=False)
+        return response.json()
+
     # --- Authentication Methods ---
     
     def login(self, username, password):
         """Attempts to log in the user."""
-        logging.info(f"Attempting login for user: {username}")
+        logger.info(f"Attempting login for user: {username}")
         payload = {"username": username, "password": password}
         result = self._make_request("POST", "auth/login", data=payload)
         
         if result["success"]:
             # Store user details if login is successful
             self.current_user = result["data"].get("user")
-            logging.info(f"Login successful for user: {username}. Role: {self.current_user.get('role') if self.current_user else 'N/A'}")
+            logger.info(f"Login successful for user: {username}. Role: {self.current_user.get('role') if self.current_user else 'N/A'}")
         else:
             self.current_user = None # Clear user on failed login
-            logging.warning(f"Login failed for user: {username}. Reason: {result.get('message')}")
+            logger.warning(f"Login failed for user: {username}. Reason: {result.get('message')}")
             
         return result # Return the full result dictionary
 
     def logout(self):
         """Logs out the current user."""
         if not self.current_user:
-             logging.warning("Logout called but no user is logged in.")
+             logger.warning("Logout called but no user is logged in.")
              return {"success": False, "message": "Not logged in"}
 
-        logging.info(f"Attempting logout for user: {self.current_user.get('username')}")
+        logger.info(f"Attempting logout for user: {self.current_user.get('username')}")
         result = self._make_request("POST", "auth/logout")
         
         if result["success"]:
-            logging.info(f"Logout successful for user: {self.current_user.get('username')}")
+            logger.info(f"Logout successful for user: {self.current_user.get('username')}")
             self.current_user = None # Clear user details on successful logout
         else:
             # Log error but maybe clear user anyway? Or handle based on error type.
-            logging.error(f"Logout failed: {result.get('message')}")
+            logger.error(f"Logout failed: {result.get('message')}")
             # Consider clearing self.current_user even on failure depending on desired behavior
             
         return result
 
     def get_current_user_info(self):
         """Fetches details for the currently logged-in user."""
-        logging.info("Fetching current user info (/auth/me)")
+        logger.debug("Fetching current user info (/auth/me)")
         return self._make_request("GET", "auth/me")
 
     def is_logged_in(self):
@@ -106,47 +187,144 @@ class ApiClient:
     # --- Order Methods ---
     def get_orders(self):
         """Fetches all orders."""
-        logging.info("Fetching orders...")
+        logger.debug("Fetching orders...")
         return self._make_request("GET", "orders")
 
+    def search_orders(self, query="", limit=None):
+        """
+        Fetches orders whose number starts with `query` (case-insensitive).
+
+        On success "data" is {"query", "orders", "has_more"}: at most `limit` orders
+        (server default 20), sorted by number, or the most recent ones for an empty
+        query. Servers without the search endpoint get all orders filtered here.
+        """
+        logger.debug(f"Searching orders for prefix '{query}'")
+        params = {"q": query}
+        if limit is not None:
+            params["limit"] = limit
+        if self.order_search_supported is not False:
+            result = self._make_request("GET", "orders/search", params=params)
+            if result["status_code"] not in (404, 405):
+                self.order_search_supported = result["success"] or self.order_search_supported
+                return result
+            logger.info("Server has no order search endpoint; filtering the full order list.")
+            self.order_search_supported = False
+        result = self.get_orders()
+        if result["success"]:
+            prefix = query.strip().lower()
+            matches = [order for order in result["data"].get("orders", [])
+                       if order["order_number"].lower().startswith(prefix)]
+            if prefix:
+                matches.sort(key=lambda order: order["order_number"].lower())
+            limit = limit or 20
+            result = dict(result, data={"query": query.strip(), "orders": matches[:limit], "has_more": len(matches) > limit})
+        return result
+
     def create_order(self, order_number, description=None):
         """Creates a new order."""
-        logging.info(f"Creating order: {order_number}")
+        logger.info(f"Creating order: {order_number}")
         payload = {"order_number": order_number, "description": description}
         return self._make_request("POST", "orders", data=payload)
 
     def delete_order(self, order_id):
         """Deletes an order (Admin only)."""
-        logging.warning(f"Attempting to delete order ID: {order_id}")
+        logger.warning(f"Attempting to delete order ID: {order_id}")
         return self._make_request("DELETE", f"orders/{order_id}")
 
+    def get_order_barcodes(self, order_id):
+        """Fetches every barcode already scanned for an order (all departments)."""
+        logger.debug(f"Fetching scanned barcodes for order ID: {order_id}")
+        return self._make_request("GET", f"orders/{order_id}/barcodes")
+
     # --- Scan Methods ---
-    def record_scan(self, barcode, status, order_id, notes=None):
-        """Records a new scan."""
-        logging.info(f"Recording scan for barcode: {barcode}")
+    def record_scan(self, barcode, status, order_id, notes=None, idempotency_key=None):
+        """
+        Records a new scan.
+
+        With an `idempotency_key`, resending a scan that was already recorded returns
+        the original scan (status 200, "replayed": true) instead of a duplicate error.
+        """
+        logger.debug(f"Recording scan for barcode: {barcode}")
         payload = {
             "barcode": barcode,
             "status": status, # Should be "Pass" or "Fail"
             "order_id": order_id,
             "notes": notes
         }
+        if idempotency_key:
+            payload["idempotency_key"] = idempotency_key
         return self._make_request("POST", "scans", data=payload)
 
-    def get_scans(self, order_id=None, user_id=None, department_id=None):
-        """Fetches scans, optionally filtered."""
-        logging.info("Fetching scans...")
+    def record_scans(self, scans):
+        """
+        Records several scans in one request (POST /scans/batch).
+
+        `scans` are dicts with barcode, status, order_id and optionally notes and
+        idempotency_key (see record_scan). On
+        success "data" is {"results": [...]}, one record_scan-style result per scan
+        in input order. Servers without the batch endpoint get one request per scan;
+        if one of those fails in a way worth retrying (no connection, 5xx, expired
+        session), "results" stops there and the remaining scans were not sent.
+        """
+        logger.debug(f"Recording batch of {len(scans)} scans")
+        if self.scan_batch_supported is not False:
+            result = self._make_request("POST", "scans/batch", data={"scans": scans})
+            if result["status_code"] not in (404, 405):
+                self.scan_batch_supported = result["success"] or self.scan_batch_supported
+                return result
+            logger.info("Server has no scan batch endpoint; recording scans one at a time.")
+            self.scan_batch_supported = False
+        results = []
+        for scan in scans:
+            result = self.record_scan(scan["barcode"], scan["status"], scan["order_id"], scan.get("notes"),
+                                      scan.get("idempotency_key"))
+            status_code = result["status_code"]
+            if status_code is None or status_code == 401 or status_code >= 500:
+                if not results:
+                    return result # Nothing recorded: the whole batch failed
+                break # Report the scans recorded so far; the caller resends the rest
+            data = result.get("data") or {}
+            results.append({"success": result["success"], "status_code": result["status_code"],
+                            "scan": data.get("scan"), "message": result.get("message")})
+        return {"success": True, "status_code": 200, "data": {"results": results}}
+
+    def get_scans(self, order_id=None, user_id=None, department_id=None, fields=None, scope=None,
+                  limit=None, cursor=None, after_id=None):
+        """
+        Fetches scans, optionally filtered.
+
+        Args:
+            fields (list, optional): Only return these keys (e.g. ["barcode", "status"]);
+                                     the server then reads only the matching columns.
+            scope (str, optional): "all" for every department (Admin/Manager only); by
+                                   default the server returns the user's department.
+            limit (int, optional): Page size; the result then carries "next_cursor",
+                                   passed back as `cursor` for the next page.
+            after_id (int, optional): Only scans with a higher id (new since a previous load).
+        """
+        logger.debug("Fetching scans...")
         params = {}
+        if fields:
+            params['fields'] = ','.join(fields)
         if order_id:
             params['order_id'] = order_id
         if user_id:
             params['user_id'] = user_id
         if department_id:
             params['department_id'] = department_id
+        if scope:
+            params['scope'] = scope
+        if limit:
+            params['limit'] = limit
+        if cursor:
+            params['cursor'] = cursor
+        if after_id is not None:
+            params['after_id'] = after_id
         return self._make_request("GET", "scans", params=params)
 
     def update_scan(self, scan_id, status=None, notes=None):
         """Updates a scan's status or notes (Admin/Manager)."""
-        logging.info(f"Updating scan ID: {scan_id}")
+        logger.info(f"Updating scan ID: {scan_id}")
         payload = {}
         if status is not None:
             payload["status"] = status
@@ -158,29 +336,29 @@ class ApiClient:
 
     def delete_scan(self, scan_id):
         """Deletes a scan (Admin/Manager)."""
-        logging.warning(f"Attempting to delete scan ID: {scan_id}")
+        logger.warning(f"Attempting to delete scan ID: {scan_id}")
         return self._make_request("DELETE", f"scans/{scan_id}")
 
     # --- Department Methods ---
     def create_department(self, name):
         """Creates a new department (Admin only)."""
-        logging.info(f"Creating department: {name}")
+        logger.info(f"Creating department: {name}")
         return self._make_request("POST", "departments", data={"name": name})
 
     def get_departments(self):
         """Fetches all departments."""
-        logging.info("Fetching departments...")
+        logger.debug("Fetching departments...")
         return self._make_request("GET", "departments")
 
     def delete_department(self, department_id):
         """Deletes a department (Admin only)."""
-        logging.warning(f"Attempting to delete department ID: {department_id}")
+        logger.warning(f"Attempting to delete department ID: {department_id}")
         return self._make_request("DELETE", f"departments/{department_id}")
 
     # --- User Methods (Admin Only) ---
     def create_user(self, username, password, role_name, department_id=None):
         """Creates a new user (Admin only)."""
-        logging.info(f"Creating user: {username}")
+        logger.info(f"Creating user: {username}")
         payload = {
             "username": username,
             "password": password,
@@ -191,12 +369,12 @@ class ApiClient:
         
     def get_users(self):
         """Fetches all users (Admin only)."""
-        logging.info("Fetching users...")
+        logger.debug("Fetching users...")
         return self._make_request("GET", "users")
         
     def update_user(self, user_id, role_name=None, department_id=None):
         """Updates a user's role and/or department (Admin only)."""
-        logging.info(f"Updating user ID: {user_id}")
+        logger.info(f"Updating user ID: {user_id}")
         payload = {}
         if role_name is not None:
             payload['role_name'] = role_name
@@ -211,14 +389,56 @@ class ApiClient:
 
     def delete_user(self, user_id):
         """Deletes a user (Admin only)."""
-        logging.warning(f"Attempting to delete user ID: {user_id}")
+        logger.warning(f"Attempting to delete user ID: {user_id}")
         return self._make_request("DELETE", f"users/{user_id}")
 
+    # --- Change Feed Methods ---
+    def stream_events(self, types=None):
+        """
+        Opens the server-sent event stream (GET /stream), e.g. types=["change"].
+
+        On success "data" is an EventStream: iterate it for (event_type, data) from a
+        dedicated thread, close() it to disconnect. The stream gets its own connection
+        (sharing the login cookie), so it never occupies the request pool.
+        """
+        logger.debug(f"Opening event stream (types: {types})")
+        session = build_session(dict(self.transport_settings, max_retries=0, compress=False))
+        session.cookies = self.session.cookies
+        try:
+            response = session.get(self.base_url + "stream", params={"types": ",".join(types)} if types else None,
+                                   headers={'Accept': 'text/event-stream'}, stream=True, allow_redirects=False,
+                                   timeout=(self.transport_settings["connect_timeout"], STREAM_READ_TIMEOUT))
+        except requests.exceptions.RequestException as e:
+            session.close()
+            return {"success": False, "status_code": None, "message": f"Connection error: {e}"}
+        if response.status_code != 200:
+            response.close()
+            session.close()
+            return {"success": False, "status_code": response.status_code,
+                    "message": f"Event stream unavailable (HTTP {response.status_code})"}
+        return {"success": True, "status_code": 200, "data": EventStream(response, session)}
+
+    def get_change_version(self):
+        """
+        A cheap token that changes when scans or orders are added: the newest scan id
+        and order id this user can see (two one-row reads). For polling when the event
+        stream is unavailable; edits and deletions are only reported by the stream.
+        """
+        scans = self._make_request("GET", "scans", params={"fields": "id", "limit": 1})
+        if not scans["success"]:
+            return scans
+        orders = self.search_orders("", limit=1)
+        if not orders["success"]:
+            return orders
+        newest = lambda items: items[0]["id"] if items else None
+        version = [newest(scans["data"].get("scans", [])), newest(orders["data"].get("orders", []))]
+        return {"success": True, "status_code": 200, "data": {"version": version}}
+
     # --- Remove Log Methods ---
 
     def submit_feedback(self, feedback_text):
         """Submits user feedback."""
-        logging.info("Submitting feedback...")
+        logger.info("Submitting feedback...")
         payload = {"feedback_text": feedback_text}
         return self._make_request("POST", "feedback", data=payload)
 
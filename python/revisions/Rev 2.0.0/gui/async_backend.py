@@ -0,0 +1,124 @@
+# Runs ApiClient / MainWindowAdapter calls off the Qt UI thread
+import itertools
+import logging
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class _CallSignals(QObject):
+    """Carries a finished call back to the UI thread (QRunnable cannot emit signals itself)."""
+    finished = pyqtSignal(int, object) # ticket, result
+    failed = pyqtSignal(int, object) # ticket, exception
+
+
+class _Call(QRunnable):
+    def __init__(self, ticket, func, args, kwargs):
+        super().__init__()
+        self.ticket = ticket
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = _CallSignals()
+        self.setAutoDelete(False) # AsyncBackend keeps it alive until its result is delivered
+
+    def run(self):
+        if self.cancelled: # Superseded while still queued; report back so it is cleaned up
+            self.signals.finished.emit(self.ticket, None)
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.ticket, e)
+        else:
+            self.signals.finished.emit(self.ticket, result)
+
+
+class AsyncBackend(QObject):
+    """Asynchronous facade over a backend (ApiClient or MainWindowAdapter).
+
+    call() runs a backend method on a thread pool and hands its result dict to a
+    callback on the UI thread. Calls sharing a `key` supersede each other: a newer
+    call cancels an older one that has not started, and an older result arriving
+    late is dropped, so clicking Refresh twice only ever shows the latest data.
+    Calls without a key (writes) are never dropped.
+
+    Backends may set `max_concurrent_calls` (e.g. 1 for SQLite files); default 4.
+    """
+    busy_changed = pyqtSignal(int) # Number of calls in flight
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(getattr(backend, 'max_concurrent_calls', 4))
+        self._tickets = itertools.count(1)
+        self._pending = {} # ticket -> (call, key, on_result, on_error)
+        self._latest = {} # key -> newest ticket
+
+    def call(self, method_name, *args, on_result=None, on_error=None, key=None, **kwargs):
+        """Runs backend.<method_name>(*args, **kwargs) in the pool; returns a ticket.
+
+        on_result(result) and on_error(exception) run on the UI thread. Without
+        on_error, an exception is logged and reported to on_result as a failed result dict.
+        """
+        return self.run(getattr(self.backend, method_name), *args,
+                        on_result=on_result, on_error=on_error, key=key, **kwargs)
+
+    def run(self, func, *args, on_result=None, on_error=None, key=None, **kwargs):
+        """Like call(), for a plain function (e.g. a backend call plus CPU-heavy post-processing)."""
+        ticket = next(self._tickets)
+        call = _Call(ticket, func, args, kwargs)
+        call.signals.finished.connect(self._on_finished)
+        call.signals.failed.connect(self._on_failed)
+        if key is not None:
+            self.cancel(key)
+            self._latest[key] = ticket
+        self._pending[ticket] = (call, key, on_result, on_error)
+        self.pool.start(call)
+        self.busy_changed.emit(len(self._pending))
+        return ticket
+
+    def cancel(self, key):
+        """Cancels the outstanding call for `key`: it is skipped if queued, ignored if running."""
+        ticket = self._latest.pop(key, None)
+        entry = self._pending.get(ticket)
+        if entry is not None:
+            entry[0].cancelled = True
+
+    def shutdown(self, timeout_ms=3000):
+        """Drops every pending result and waits briefly for running calls (window closing)."""
+        for call, *_ in self._pending.values():
+            call.cancelled = True
+        self._latest.clear()
+        self.pool.clear()
+        self.pool.waitForDone(timeout_ms)
+
+    def _take(self, ticket):
+        """Removes a finished ticket; returns its callbacks, or None if it was superseded."""
+        call, key, on_result, on_error = self._pending.pop(ticket, (None, None, None, None))
+        self.busy_changed.emit(len(self._pending))
+        if call is None or call.cancelled:
+            return None
+        if key is not None:
+            if self._latest.get(key) != ticket:
+                return None
+            del self._latest[key]
+        return on_result, on_error
+
+    @pyqtSlot(int, object)
+    def _on_finished(self, ticket, result):
+        callbacks = self._take(ticket)
+        if callbacks and callbacks[0]:
+            callbacks[0](result)
+
+    @pyqtSlot(int, object)
+    def _on_failed(self, ticket, error):
+        callbacks = self._take(ticket)
+        if not callbacks:
+            return
+        on_result, on_error = callbacks
+        logging.error(f"Background call failed: {error!r}")
+        if on_error:
+            on_error(error)
+        elif on_result:
+            on_result({"success": False, "status_code": None, "message": f"Internal error: {error}"})
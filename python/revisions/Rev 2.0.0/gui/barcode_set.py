@@ -0,0 +1,79 @@
+# Barcodes already recorded for the selected order, for an instant duplicate check
+import hashlib
+import math
+
+BLOOM_THRESHOLD = 100000 # Orders with more barcodes than this use a Bloom filter instead of a set
+BLOOM_ERROR_RATE = 0.001 # False positive rate the Bloom filter is sized for
+
+# OrderBarcodeSet.check() answers
+NEW = "new"
+DUPLICATE = "duplicate"
+POSSIBLE_DUPLICATE = "possible_duplicate" # Bloom filter hit: probably, but not certainly, scanned
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing of one blake2b digest)."""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)) # Bits
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class OrderBarcodeSet:
+    """Barcodes scanned for one order: an exact set, or a Bloom filter for very large orders.
+
+    check() answers DUPLICATE only when certain, so a good board is never turned
+    away on the client: a Bloom filter hit is POSSIBLE_DUPLICATE and left to the
+    server. Barcodes added during the session are always known exactly. discard()
+    cannot take a barcode out of the Bloom filter; it then stays a possible duplicate.
+    """
+
+    def __init__(self, order_id, barcodes, bloom_threshold=BLOOM_THRESHOLD):
+        self.order_id = order_id
+        self._bloom = None
+        if len(barcodes) > bloom_threshold:
+            self._bloom = BloomFilter(capacity=len(barcodes) * 2) # Room to grow during the shift
+            for barcode in barcodes:
+                self._bloom.add(barcode)
+            self._exact = set()
+        else:
+            self._exact = set(barcodes)
+
+    def check(self, barcode):
+        if barcode in self._exact:
+            return DUPLICATE
+        if self._bloom is not None and barcode in self._bloom:
+            return POSSIBLE_DUPLICATE
+        return NEW
+
+    def add(self, barcode):
+        self._exact.add(barcode)
+
+    def discard(self, barcode):
+        self._exact.discard(barcode)
+
+
+def load_order_barcodes(backend, order_id):
+    """Fetches an order's barcodes and builds its OrderBarcodeSet (run on a worker thread).
+
+    Returns the get_order_barcodes result with "data" replaced by the OrderBarcodeSet.
+    """
+    result = backend.get_order_barcodes(order_id)
+    if result["success"]:
+        result = dict(result, data=OrderBarcodeSet(order_id, result["data"].get("barcodes", [])))
+    return result
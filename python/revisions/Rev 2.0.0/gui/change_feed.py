@@ -0,0 +1,202 @@
+# Live change notifications for the main window: server event stream, or polling
+import logging
+import threading
+import time
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+COALESCE_MS = 300 # Changes arriving within this long are applied as one update
+RECONNECT_BASE_MS = 1000 # Stream reconnect backoff: 1s, 2s, 4s ... up to RECONNECT_MAX_MS
+RECONNECT_MAX_MS = 30000
+STREAM_MIN_SECONDS = 5 # A stream that ends sooner counts as a failed connection for the backoff
+POLL_MIN_MS = 1000 # Polling interval while things change...
+POLL_MAX_MS = 30000 # ...doubling up to this while they do not
+STREAM_POLL_MS = 15000 # Polling interval alongside the stream (for scans it does not carry)
+
+
+class ChangeSet:
+    """What changed during one coalescing interval."""
+
+    def __init__(self):
+        self.unknown = False # Something changed but not what (polled version, or events were missed)
+        self.scans = {"insert": [], "update": [], "delete": []} # Items: {"id", "order_id", "barcode", "department_id", "user_id"}
+        self.orders = {"insert": [], "delete": []} # Items: {"id", "order_number"}
+        self.scans_deleted_where = [] # Bulk deletes: {"order_id"} or {"user_id"}, rows not listed
+
+    def add(self, change):
+        """Adds a 'change' event's data ({"table", "op", "items"}, and "where" for a bulk change)."""
+        if change.get("where"):
+            if change.get("table") == "scans" and change.get("op") == "delete":
+                self.scans_deleted_where.append(change["where"])
+            else: # Not sent by the server; make sure it is not lost all the same
+                self.unknown = True
+            return
+        ops = {"scans": self.scans, "orders": self.orders}.get(change.get("table"), {})
+        if change.get("op") in ops:
+            ops[change["op"]].extend(change.get("items", []))
+
+    def __bool__(self):
+        return (self.unknown or any(self.scans.values()) or any(self.orders.values())
+                or bool(self.scans_deleted_where))
+
+
+class ChangeFeed(QObject):
+    """Reports changes made by other stations, at most once every COALESCE_MS.
+
+    With a backend that can stream (ApiClient.stream_events), a background thread
+    listens for 'change' events on GET /stream and reconnects with backoff when the
+    stream drops; changes possibly missed meanwhile are reported as `unknown`.
+    Otherwise (local mode, or a server without the stream) backend.get_change_version()
+    is polled: every POLL_MIN_MS while it keeps changing, backing off to POLL_MAX_MS
+    while it does not.
+
+    The stream only carries changes made through the API worker serving it, so while
+    it is up the version is still polled every STREAM_POLL_MS: scans recorded by
+    `flask scan-listener` (fixed-mount scanners) or other workers show up that way.
+    """
+    changes = pyqtSignal(object) # ChangeSet
+    status_changed = pyqtSignal(str) # Short text for the status bar
+    _stream_event = pyqtSignal(str, object) # From the stream thread: (kind, data)
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend # AsyncBackend
+        self._pending = ChangeSet()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(COALESCE_MS)
+        self._flush_timer.timeout.connect(self._flush)
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setSingleShot(True)
+        self._poll_timer.timeout.connect(self._poll)
+        self._poll_range = (STREAM_POLL_MS, STREAM_POLL_MS) # (min, max) interval; widened if there is no stream
+        self._poll_interval = STREAM_POLL_MS
+        self._polling = False
+        self._version = None
+        self._stopped = False
+        self._wake = threading.Event() # Interrupts the stream thread's reconnect wait on stop()
+        self._stream = None # Open EventStream (stream thread)
+        self._stream_event.connect(self._on_stream_event)
+
+    def start(self):
+        client = self.backend.backend
+        if hasattr(client, "stream_events"):
+            threading.Thread(target=self._listen, args=(client,), name="change-feed", daemon=True).start()
+        else:
+            self._start_polling()
+
+    def stop(self):
+        """Stops listening/polling (window closing); nothing is emitted afterwards."""
+        self._stopped = True
+        self._wake.set()
+        self._flush_timer.stop()
+        self._poll_timer.stop()
+        stream = self._stream
+        if stream is not None:
+            stream.close() # Unblocks the stream thread
+
+    # --- Coalescing (UI thread) ---
+    def _schedule(self):
+        # Not restarted by later changes, so a steady trickle still updates every COALESCE_MS
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush(self):
+        changes, self._pending = self._pending, ChangeSet()
+        if changes and not self._stopped:
+            self.changes.emit(changes)
+
+    # --- Event stream ---
+    def _emit(self, kind, data=None):
+        """Hands a stream thread event to the UI thread, unless the feed was stopped (and maybe deleted)."""
+        if not self._stopped:
+            try:
+                self._stream_event.emit(kind, data)
+            except RuntimeError: # Window already gone
+                pass
+
+    def _listen(self, client):
+        """Stream thread: reads change events until stopped, reconnecting with backoff."""
+        failures = 0
+        while not self._stopped:
+            result = client.stream_events(["change"])
+            if not result["success"]:
+                if result["status_code"] in (404, 405):
+                    self._emit("unsupported", result.get("message"))
+                    return
+                failures += 1
+                delay = min(RECONNECT_MAX_MS, RECONNECT_BASE_MS * 2 ** (failures - 1))
+                logging.warning(f"Change feed: {result.get('message')}; reconnecting in {delay} ms.")
+                self._emit("status", "Live updates: reconnecting...")
+                self._wake.wait(delay / 1000)
+                continue
+            self._stream = result["data"]
+            if self._stopped: # stop() ran before the stream was stored
+                self._stream.close()
+                return
+            self._emit("connected")
+            self._emit("resync") # Catch up with changes made before (re)connecting
+            opened = time.monotonic()
+            try:
+                for event_type, data in self._stream:
+                    if event_type in ("change", "resync"):
+                        self._emit(event_type, data)
+            except Exception as e: # Connection dropped, read timeout, or closed by stop()
+                if not self._stopped:
+                    logging.info(f"Change feed stream ended: {e}")
+            finally:
+                self._stream.close()
+                self._stream = None
+            failures = failures + 1 if time.monotonic() - opened < STREAM_MIN_SECONDS else 0
+            if failures and not self._stopped:
+                self._emit("status", "Live updates: reconnecting...")
+                self._wake.wait(min(RECONNECT_MAX_MS, RECONNECT_BASE_MS * 2 ** (failures - 1)) / 1000)
+
+    def _on_stream_event(self, kind, data):
+        if self._stopped:
+            return
+        if kind == "change":
+            self._pending.add(data)
+            self._schedule()
+        elif kind == "resync": # Reconnected, or the server dropped events for this client
+            self._pending.unknown = True
+            self._schedule()
+        elif kind == "connected":
+            self.status_changed.emit("Live updates on")
+            self._ensure_polling()
+        elif kind == "status":
+            self.status_changed.emit(data)
+        elif kind == "unsupported":
+            logging.info(f"Change feed: {data}; polling for changes instead.")
+            self._start_polling()
+
+    # --- Polling ---
+    def _start_polling(self):
+        """Polling is the only source of changes (no stream): poll adaptively."""
+        self.status_changed.emit("Live updates: polling")
+        self._poll_range = (POLL_MIN_MS, POLL_MAX_MS)
+        self._poll_interval = POLL_MIN_MS
+        if self._polling:
+            self._poll_timer.start(self._poll_interval)
+        self._ensure_polling()
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self._poll()
+
+    def _poll(self):
+        if not self._stopped:
+            self.backend.call("get_change_version", on_result=self._on_version, key="change_version")
+
+    def _on_version(self, result):
+        if self._stopped:
+            return
+        if result["success"] and result["data"]["version"] != self._version:
+            if self._version is not None:
+                self._pending.unknown = True
+                self._schedule()
+            self._version = result["data"]["version"]
+            self._poll_interval = self._poll_range[0]
+        else: # Unchanged, or unreachable: either way ask less often
+            self._poll_interval = min(self._poll_range[1], self._poll_interval * 2)
+        self._poll_timer.start(self._poll_interval)
@@ -5,24 +5,42 @@ import datetime # Added for feedback timestamp
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QPushButton, QMessageBox, QTabWidget, QStatusBar, QLineEdit, QComboBox, 
-    QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QDialogButtonBox,
-    QFormLayout, QGroupBox, QTextEdit, QRadioButton, QButtonGroup
+    QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QDialog, QDialogButtonBox,
+    QFormLayout, QGroupBox, QTextEdit, QRadioButton, QButtonGroup, QCheckBox,
+    QListWidget, QListWidgetItem, QFileDialog
 )
 from PyQt6.QtCore import Qt, pyqtSlot, QTimer, pyqtSignal # Remove QFileSystemWatcher
 from PyQt6.QtGui import QColor, QPalette, QPixmap, QFont # Added QFont
 import logging
+from functools import partial
 
 # Import the ApiClient (assuming it's in the same directory)
 try:
     from .api_client import ApiClient
+    from .async_backend import AsyncBackend
+    from .scan_table_model import ScanTableModel, StatusColorDelegate, STATUS_COLUMN
+    from .scan_queue import ScanSubmitQueue
+    from .scan_journal import ScanJournal
+    from .barcode_set import load_order_barcodes, DUPLICATE, POSSIBLE_DUPLICATE
+    from .order_picker import OrderPicker, OrderSearchCache, SEARCH_LIMIT
+    from .change_feed import ChangeFeed
 except ImportError:
     # Handle case where script is run directly for testing
     from api_client import ApiClient 
+    from async_backend import AsyncBackend
+    from scan_table_model import ScanTableModel, StatusColorDelegate, STATUS_COLUMN
+    from scan_queue import ScanSubmitQueue
+    from scan_journal import ScanJournal
+    from barcode_set import load_order_barcodes, DUPLICATE, POSSIBLE_DUPLICATE
+    from order_picker import OrderPicker, OrderSearchCache, SEARCH_LIMIT
+    from change_feed import ChangeFeed
 
 # Define placeholder barcode values (REPLACE WITH YOUR ACTUAL VALUES)
 PASS_BARCODE_VALUE = "__PASS__"
 FAIL_BARCODE_VALUE = "__FAIL__"
 
+RECENT_SCANS_SHOWN = 10 # Entries kept in the scan tab's recent-scans strip
+
 # --- Runtime Path Helper Function --- 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -39,7 +57,7 @@ class MainWindow(QMainWindow):
     """Main application window displayed after login."""
     logged_out = pyqtSignal() # Signal emitted when logout is successful
 
-    def __init__(self, user_data: dict, api_client: ApiClient, feedback_path_func):
+    def __init__(self, user_data: dict, api_client: ApiClient, feedback_path_func, journal_path=None, prefetch=None):
         """
         Initializes the main window.
 
@@ -47,12 +65,24 @@ class MainWindow(QMainWindow):
             user_data (dict): Dictionary containing logged-in user information.
             api_client (ApiClient): The instance of the API client.
             feedback_path_func (callable): Function that returns the path for the feedback file.
+            journal_path (str, optional): SQLite file for the offline scan journal; without
+                                          it, queued scans are kept in memory only.
+            prefetch (InitialDataPrefetch, optional): Initial reads started at login; the window
+                                                      collects them instead of fetching again.
         """
         super().__init__()
         self.user_data = user_data
         self.api_client = api_client
+        # Every backend call runs on a worker thread; results come back to slots on the UI thread
+        self.prefetch = prefetch
+        if prefetch is not None:
+            prefetch.setParent(self)
+            self.backend = prefetch.backend # One thread pool for prefetched and later calls
+        else:
+            self.backend = AsyncBackend(api_client, self)
         self.feedback_path_func = feedback_path_func # Store the function
-        self.orders = [] # Cache for orders dropdown
+        self.orders = [] # Most recent orders, listed in the order pickers before anything is typed
+        self.order_search_cache = OrderSearchCache() # Shared by the order pickers
         self.departments = [] # Cache for departments dropdown
         self.users = [] # Cache for users list
         self.roles = ["Standard", "Manager", "Admin"] # Available roles
@@ -61,6 +91,15 @@ class MainWindow(QMainWindow):
         self.expecting_status_scan = False
         self.current_board_barcode = None
         self.current_scan_status = None # Stores "Pass" or "Fail"
+        # Pipelined scanning: completed scans are journaled, queued and submitted in the background
+        self.scan_journal = self._open_scan_journal(journal_path)
+        self.scan_queue = ScanSubmitQueue(self.backend, self.scan_journal, self)
+        self.scan_queue.scan_finished.connect(self._on_queued_scan_finished)
+        self.recent_scan_items = {} # Queue item seq -> its entry in the recent-scans strip
+        self.order_barcodes = None # OrderBarcodeSet of the selected scan order, once loaded
+        # Changes made on other stations are applied as they happen
+        self.change_feed = ChangeFeed(self.backend, self)
+        self.change_feed.changes.connect(self._apply_changes)
 
         self.setWindowTitle("Label Tracker")
         self.setGeometry(100, 100, 900, 700) # Adjusted size
@@ -74,6 +113,7 @@ class MainWindow(QMainWindow):
         self._init_ui()
         # --- Remove log monitoring start ---
         self._load_initial_data()
+        self.change_feed.start()
 
     def _init_ui(self):
         """Initialize the main window UI elements."""
@@ -130,10 +170,24 @@ class MainWindow(QMainWindow):
             self.tab_widget.addTab(self.admin_tab_orders, "Manage Orders")
         elif is_manager:
              self.tab_widget.addTab(self.admin_tab_orders, "Manage Orders")
+
+        # Admin tables load the first time their tab is shown, not at login
+        self.lazy_tab_loaders = {self.admin_tab_users: self._load_users}
+        self.tab_widget.currentChanged.connect(self._on_tab_changed)
         
         # --- Status Bar, Menu Bar, Layout ---
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        self.busy_label = QLabel("")
+        self.status_bar.addPermanentWidget(self.busy_label)
+        self.backend.busy_changed.connect(lambda count: self.busy_label.setText("Working..." if count else ""))
+        self.scan_queue_label = QLabel("")
+        self.status_bar.addPermanentWidget(self.scan_queue_label)
+        self.scan_queue.depth_changed.connect(
+            lambda depth: self.scan_queue_label.setText(f"Unsent scans: {depth}" if depth else ""))
+        self.live_status_label = QLabel("")
+        self.status_bar.addPermanentWidget(self.live_status_label)
+        self.change_feed.status_changed.connect(self.live_status_label.setText)
         self.update_status_bar()
         self._create_menu_bar()
         central_widget.setLayout(main_layout)
@@ -146,9 +200,15 @@ class MainWindow(QMainWindow):
         # --- Order Selection --- 
         order_group = QGroupBox("Select Order")
         order_layout = QHBoxLayout()
-        self.scan_order_combo = QComboBox()
+        self.scan_order_combo = OrderPicker(self.backend, self.order_search_cache,
+                                            empty_text="No orders found - Create one first!")
         order_layout.addWidget(QLabel("Order:"))
         order_layout.addWidget(self.scan_order_combo)
+        # Reload the order's known barcodes once the selection settles (clear/addItem emit many changes)
+        self.order_barcodes_timer = QTimer(self)
+        self.order_barcodes_timer.setSingleShot(True)
+        self.order_barcodes_timer.timeout.connect(self._load_order_barcodes)
+        self.scan_order_combo.currentIndexChanged.connect(lambda _index: self.order_barcodes_timer.start())
         refresh_orders_btn = QPushButton("Refresh Orders")
         refresh_orders_btn.clicked.connect(self._load_orders)
         order_layout.addWidget(refresh_orders_btn)
@@ -233,6 +293,19 @@ class MainWindow(QMainWindow):
         self.scan_status_label.setStyleSheet("QLabel { font-weight: bold; }")
         layout.addWidget(self.scan_status_label)
 
+        # --- Recent Scans (pipelined submissions and their results) ---
+        recent_group = QGroupBox("Recent Scans")
+        recent_layout = QVBoxLayout()
+        self.pipelined_scan_check = QCheckBox("Keep scanning while scans are submitted")
+        self.pipelined_scan_check.setChecked(True)
+        recent_layout.addWidget(self.pipelined_scan_check)
+        self.recent_scans_list = QListWidget()
+        self.recent_scans_list.setMaximumHeight(150)
+        self.recent_scans_list.setFocusPolicy(Qt.FocusPolicy.NoFocus) # Keep focus on the barcode input
+        recent_layout.addWidget(self.recent_scans_list)
+        recent_group.setLayout(recent_layout)
+        layout.addWidget(recent_group)
+
         layout.addStretch()
         
         # Focus on barcode input initially
@@ -244,10 +317,17 @@ class MainWindow(QMainWindow):
         # --- Filters --- 
         filter_group = QGroupBox("Filter Scans")
         filter_layout = QHBoxLayout()
-        self.view_order_filter_combo = QComboBox()
-        self.view_order_filter_combo.addItem("All Orders", -1)
+        self.view_order_filter_combo = OrderPicker(self.backend, self.order_search_cache,
+                                                   fixed_items=[("All Orders", -1)])
+        self.view_order_filter_combo.set_orders([])
         filter_layout.addWidget(QLabel("Filter by Order:"))
         filter_layout.addWidget(self.view_order_filter_combo)
+        # Scans default to the user's own department; Admins/Managers may widen the view
+        self.view_all_departments_check = QCheckBox("All departments")
+        self.view_all_departments_check.setToolTip("Show scans from every department (slower for large histories)")
+        self.view_all_departments_check.setVisible(self.user_data.get("role") in ("Admin", "Manager"))
+        self.view_all_departments_check.toggled.connect(self._load_scans_for_view)
+        filter_layout.addWidget(self.view_all_departments_check)
         refresh_view_btn = QPushButton("Refresh Scans")
         refresh_view_btn.clicked.connect(self._load_scans_for_view)
         filter_layout.addWidget(refresh_view_btn)
@@ -255,15 +335,21 @@ class MainWindow(QMainWindow):
         layout.addWidget(filter_group)
 
         # --- Scans Table --- 
-        self.view_scans_table = QTableWidget()
-        self.view_scans_table.setColumnCount(7) # ID, Barcode, Timestamp, Status, Notes, User, Dept
-        self.view_scans_table.setHorizontalHeaderLabels(["ID", "Barcode", "Timestamp", "Status", "Notes", "User", "Department"])
-        self.view_scans_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers) # Read-only
-        self.view_scans_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        # Model/view: pages are fetched as the user scrolls and cells are formatted only when painted
+        self.scan_model = ScanTableModel(self.backend, parent=self)
+        self.scan_model.load_failed.connect(
+            lambda message: QMessageBox.warning(self, "Error Loading Scans", f"Could not fetch scans: {message}"))
+        self.view_scans_table = QTableView()
+        self.view_scans_table.setModel(self.scan_model)
+        self.view_scans_table.setItemDelegateForColumn(STATUS_COLUMN, StatusColorDelegate(self.view_scans_table))
+        self.view_scans_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers) # Read-only
+        self.view_scans_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.view_scans_table.verticalHeader().setVisible(False) # Hide row numbers
+        self.view_scans_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed) # No per-row measuring
+        self.view_scans_table.setWordWrap(False)
         header = self.view_scans_table.horizontalHeader()
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch) # Barcode stretch
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents) # Timestamp fit
+        header.resizeSection(2, 150) # Timestamp (fixed: ResizeToContents would measure every row)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch) # Notes stretch
         layout.addWidget(self.view_scans_table)
         
@@ -390,7 +476,8 @@ class MainWindow(QMainWindow):
         # --- Restore Delete Order Section (Admin Only) --- 
         delete_order_group = QGroupBox("Delete Existing Order")
         delete_order_layout = QHBoxLayout()
-        self.delete_order_combo = QComboBox() # Use cached orders
+        self.delete_order_combo = OrderPicker(self.backend, self.order_search_cache,
+                                              label=lambda order: order['order_number'], empty_text="No orders found")
         delete_order_layout.addWidget(QLabel("Select Order to Delete:"))
         delete_order_layout.addWidget(self.delete_order_combo)
         delete_order_btn = QPushButton("Delete Selected Order")
@@ -403,7 +490,7 @@ class MainWindow(QMainWindow):
         layout.addStretch()
         self.admin_tab_orders.setLayout(layout)
         create_order_btn.clicked.connect(self._handle_create_order)
-        # Populate the delete combo when orders are loaded (handled in _load_orders)
+        # The delete combo is filled with the other order pickers (_apply_orders)
 
     def _create_feedback_tab(self):
         """Creates the UI elements for the feedback tab."""
@@ -461,6 +548,9 @@ class MainWindow(QMainWindow):
 
         # Help Menu (Optional)
         help_menu = menu_bar.addMenu("&Help")
+        if hasattr(self.api_client, "latency"): # Server mode only; local mode has no HTTP transport
+             stats_action = help_menu.addAction("Connection Statistics...")
+             stats_action.triggered.connect(self._show_connection_stats_dialog)
         about_action = help_menu.addAction("About")
         about_action.triggered.connect(self._show_about_dialog)
 
@@ -474,119 +564,145 @@ class MainWindow(QMainWindow):
 
     # --- Data Loading Methods ---
     def _load_initial_data(self):
-        """Load data needed for dropdowns etc. when window opens."""
-        self._load_orders()
-        self._load_scans_for_view() # Load initial scans
-        
-        # --- Load admin data ONLY if user is Admin --- 
-        user_role = self.user_data.get("role")
-        if user_role == "Admin":
-             logging.info("User is Admin, loading users and departments.")
-             # Check if the UI elements exist before loading (belt and suspenders)
-             if hasattr(self, 'admin_users_table'):
-                  self._load_users()
-             if hasattr(self, 'admin_depts_table'):
-                  self._load_departments()
+        """Loads what the window shows first: orders, departments and the first page of scans, concurrently.
+
+        With a login prefetch these are already in flight (or done) and only collected.
+        """
+        if self.prefetch is not None:
+            self.prefetch.take("orders", self._apply_orders)
+            self.prefetch.take("departments", self._apply_departments)
+            self.scan_model.reload_prefetched(self._scan_filter_params(), partial(self.prefetch.take, "scans"))
         else:
-             logging.info(f"User role is '{user_role}', skipping load of admin-only data.")
+            self._load_orders()
+            self._load_departments()
+            self._load_scans_for_view() # Paged separately by the scan table model
+
+    @pyqtSlot(int)
+    def _on_tab_changed(self, index):
+        loader = self.lazy_tab_loaders.pop(self.tab_widget.widget(index), None)
+        if loader is not None:
+            loader()
+
+    def _scan_filter_params(self):
+        """Returns the get_scans filter for the View Data tab's current selection."""
+        params = {}
+        if self.view_all_departments_check.isChecked():
+            params["scope"] = "all"
+        selected_order_id = self.view_order_filter_combo.currentData()
+        if selected_order_id is not None and selected_order_id != -1: # Not "All Orders"
+            params["order_id"] = selected_order_id
+        return params
 
     @pyqtSlot()
     def _load_orders(self):
         logging.info("Loading orders for dropdowns...")
-        result = self.api_client.get_orders()
+        self.order_search_cache.clear() # Refresh, or an order was created/deleted
+        self.backend.call("search_orders", "", limit=SEARCH_LIMIT, on_result=self._apply_orders, key="orders")
+
+    def _order_pickers(self):
+        pickers = [self.scan_order_combo, self.view_order_filter_combo]
+        if hasattr(self, 'delete_order_combo'): # Admin only
+            pickers.append(self.delete_order_combo)
+        return pickers
+
+    def _apply_orders(self, result):
+        """Lists the most recent orders (a search_orders result) in the order pickers; older ones are found by typing."""
         if result["success"]:
             self.orders = result["data"].get("orders", [])
-            # Populate Scan Tab Combo Box
-            self.scan_order_combo.clear()
-            if not self.orders:
-                 self.scan_order_combo.addItem("No orders found - Create one first!", -1)
-            else:
-                for order in self.orders:
-                    self.scan_order_combo.addItem(f"{order['order_number']} - {order.get('description','')[:30]}...", order['id'])
-            
-            # Populate View Data Tab Combo Box
-            self.view_order_filter_combo.clear()
-            self.view_order_filter_combo.addItem("All Orders", -1)
-            for order in self.orders:
-                self.view_order_filter_combo.addItem(f"{order['order_number']} - {order.get('description','')[:30]}...", order['id'])
-            
-            # Populate Delete Order Combo (if it exists - Admin/Manager)
-            if hasattr(self, 'delete_order_combo'):
-                 self.delete_order_combo.clear()
-                 if not self.orders:
-                      self.delete_order_combo.addItem("No orders found", -1)
-                 else:
-                      for order in self.orders:
-                           self.delete_order_combo.addItem(f"{order['order_number']}", order['id'])
-            
+            self.order_search_cache.put("", self.orders, not result["data"].get("has_more"))
+            for picker in self._order_pickers():
+                picker.set_orders(self.orders)
             logging.info(f"Loaded {len(self.orders)} orders.")
         else:
             QMessageBox.warning(self, "Error Loading Orders", f"Could not fetch orders: {result.get('message')}")
-            self.scan_order_combo.clear()
-            self.scan_order_combo.addItem("Error loading orders", -1)
-            self.view_order_filter_combo.clear()
-            self.view_order_filter_combo.addItem("Error loading orders", -1)
-            if hasattr(self, 'delete_order_combo'):
-                 self.delete_order_combo.clear()
-                 self.delete_order_combo.addItem("Error loading orders", -1)
+            for picker in self._order_pickers():
+                picker.set_error("Error loading orders")
             
     @pyqtSlot()
     def _load_scans_for_view(self):
         logging.info("-----> Attempting to load scans for view tab...")
-        self.view_scans_table.setRowCount(0) # Clear table
-
-        selected_order_id = self.view_order_filter_combo.currentData()
-        if selected_order_id == -1: # "All Orders" selected
-             selected_order_id = None
-
+        params = self._scan_filter_params()
         # --- Add logging for filter ---
-        logging.info(f"-----> Filtering scans for Order ID: {selected_order_id}")
+        logging.info(f"-----> Filtering scans for Order ID: {params.get('order_id')}")
         # ---
-        result = self.api_client.get_scans(order_id=selected_order_id)
+        self.scan_model.reload(params)
 
-        if result["success"]:
-            scans = result["data"].get("scans", [])
-            self.view_scans_table.setRowCount(len(scans))
-            for row, scan in enumerate(scans):
-                # ID, Barcode, Timestamp, Status, Notes, User, Dept
-                self.view_scans_table.setItem(row, 0, QTableWidgetItem(str(scan['id'])))
-                self.view_scans_table.setItem(row, 1, QTableWidgetItem(scan['barcode']))
-                # Format timestamp nicely (optional)
-                try:
-                    ts = scan['timestamp']
-                    # Attempt to parse ISO format and display locally
-                    from datetime import datetime
-                    dt_obj = datetime.fromisoformat(ts.replace('Z', '+00:00')) # Handle Z timezone
-                    local_ts = dt_obj.astimezone().strftime('%Y-%m-%d %H:%M:%S') # Convert to local timezone
-                except Exception:
-                    local_ts = ts # Fallback to original string
-                self.view_scans_table.setItem(row, 2, QTableWidgetItem(local_ts))
-                
-                status_item = QTableWidgetItem(scan['status'])
-                if scan['status'] == 'Fail':
-                     status_item.setBackground(QColor('#FFCCCC')) # Light red background for Fail
-                elif scan['status'] == 'Pass':
-                     status_item.setBackground(QColor('#CCFFCC')) # Light green background for Pass
-                self.view_scans_table.setItem(row, 3, status_item)
-                
-                self.view_scans_table.setItem(row, 4, QTableWidgetItem(scan.get('notes', '')))
-                self.view_scans_table.setItem(row, 5, QTableWidgetItem(scan['username']))
-                self.view_scans_table.setItem(row, 6, QTableWidgetItem(scan['department_name']))
-            logging.info(f"-----> Displayed {len(scans)} scans in table.")
-            # --- Force UI update ---
-            QApplication.processEvents()
-            self.view_scans_table.viewport().update() # Explicitly update viewport
-            # ---
+    @pyqtSlot()
+    def _load_order_barcodes(self):
+        """Loads the barcodes already scanned for the selected order (duplicate pre-check)."""
+        self.order_barcodes = None
+        order_id = self.scan_order_combo.currentData()
+        if order_id is None or order_id == -1:
+            self.backend.cancel("order_barcodes")
+            return
+        self.backend.run(load_order_barcodes, self.api_client, order_id,
+                         on_result=self._apply_order_barcodes, key="order_barcodes")
+
+    def _apply_order_barcodes(self, result):
+        if not result["success"]:
+            logging.warning(f"Could not load scanned barcodes for the order ({result.get('message')}); duplicates are only caught on submit.")
+            return
+        if result["data"].order_id == self.scan_order_combo.currentData():
+            self.order_barcodes = result["data"]
+
+    def _remember_barcode(self, order_id, barcode):
+        """Adds a barcode just recorded (or queued) for `order_id` to the duplicate pre-check."""
+        if self.order_barcodes is not None and self.order_barcodes.order_id == order_id:
+            self.order_barcodes.add(barcode)
+
+    # --- Live Updates ---
+    def _apply_changes(self, changes):
+        """Applies changes made elsewhere (a ChangeFeed ChangeSet) to the scans view, order pickers and duplicate pre-check.
+
+        Events only carry ids, so new rows are fetched through the normal (permission-checked) reads.
+        An `unknown` change (polling, or a stream reconnect) re-syncs new scans, the order lists and
+        the selected order's barcodes; edits and deletes made elsewhere are only seen with the event
+        stream. A bulk delete (an order's or a user's scans) does not list the rows, so the views
+        that may hold them reload.
+        """
+        scans = changes.scans
+        bulk_deletes = changes.scans_deleted_where
+        if any(self.scan_model.may_hold(where) for where in bulk_deletes) or \
+                self.scan_model.has_scans([scan["id"] for scan in scans["update"]]):
+            self._load_scans_for_view() # Rows cannot be picked out, or the new status/notes are not in the event
         else:
-            QMessageBox.warning(self, "Error Loading Scans", f"Could not fetch scans: {result.get('message')}")
-            logging.error("-----> Failed to load scans for view tab.")
-            
+            # Scans recorded here are already listed (add_scan)
+            if changes.unknown or any(self.scan_model.matches(scan) and not self.scan_model.has_scans([scan["id"]])
+                                      for scan in scans["insert"]):
+                self.scan_model.sync_new()
+            self.scan_model.remove_scans([scan["id"] for scan in scans["delete"]])
+        if self.order_barcodes is not None and (changes.unknown or any(
+                where.get("order_id") in (None, self.order_barcodes.order_id) for where in bulk_deletes)):
+            self._load_order_barcodes() # Scans recorded elsewhere (e.g. by `flask scan-listener`) are not listed
+        elif self.order_barcodes is not None:
+            for scan in scans["insert"]:
+                if scan["order_id"] == self.order_barcodes.order_id:
+                    self.order_barcodes.add(scan["barcode"])
+            for scan in scans["delete"]:
+                if scan["order_id"] == self.order_barcodes.order_id:
+                    self.order_barcodes.discard(scan["barcode"])
+        for order in changes.orders["delete"]:
+            for picker in self._order_pickers():
+                picker.remove_order(order["id"])
+        if changes.unknown or any(changes.orders.values()):
+            self.order_search_cache.clear()
+            self.backend.call("search_orders", "", limit=SEARCH_LIMIT, on_result=self._apply_live_orders, key="orders")
+
+    def _apply_live_orders(self, result):
+        if result["success"]:
+            self._apply_orders(result)
+        else: # Not worth a dialog: the lists are just not refreshed
+            logging.warning(f"Could not refresh orders after a change: {result.get('message')}")
+
     @pyqtSlot()
     def _load_users(self):
         logging.info("Loading users for admin tab...")
         if not hasattr(self, 'admin_users_table'): return
+        self.backend.call("get_users", on_result=self._apply_users, key="users")
+
+    def _apply_users(self, result):
+        """Fills the admin users table from a get_users result."""
         self.admin_users_table.setRowCount(0)
-        result = self.api_client.get_users()
         if result["success"]:
              self.users = result["data"].get("users", [])
              self.admin_users_table.setRowCount(len(self.users))
@@ -603,8 +719,11 @@ class MainWindow(QMainWindow):
     def _load_departments(self):
         logging.info("Loading departments for admin tab...")
         if not hasattr(self, 'admin_depts_table'): return
+        self.backend.call("get_departments", on_result=self._apply_departments, key="departments")
+
+    def _apply_departments(self, result):
+        """Fills the admin departments table from a get_departments result."""
         self.admin_depts_table.setRowCount(0)
-        result = self.api_client.get_departments()
         if result["success"]:
              self.departments = result["data"].get("departments", [])
              self.admin_depts_table.setRowCount(len(self.departments))
@@ -634,13 +753,26 @@ class MainWindow(QMainWindow):
                  self.scan_barcode_input.setFocus()
                  return # Do not proceed to step 2
             # ---
+
+            # --- Instant duplicate check against the order's known barcodes ---
+            verdict = self.order_barcodes.check(scanned_value) if self.order_barcodes is not None else None
+            if verdict == DUPLICATE:
+                 logging.warning(f"Board barcode '{scanned_value}' already scanned for this order; rejected before the status scan.")
+                 self.show_scan_status_message(f"Duplicate: {scanned_value} has already been scanned for this order.", is_error=True)
+                 self.scan_barcode_input.clear()
+                 self.scan_barcode_input.setFocus()
+                 return
+            # ---
             
             self.current_board_barcode = scanned_value
             self.current_scan_status = None 
             self.expecting_status_scan = True
             self.scan_barcode_input.clear()
             self.scan_barcode_input.setPlaceholderText("NOW Scan PASS or FAIL Barcode then Press Enter...")
-            self.show_scan_status_message(f"Board: {self.current_board_barcode}. Now scan PASS/FAIL.", is_error=False)
+            if verdict == POSSIBLE_DUPLICATE:
+                 self.show_scan_status_message(f"Board: {self.current_board_barcode} (may already be scanned for this order). Now scan PASS/FAIL.", is_error=False)
+            else:
+                 self.show_scan_status_message(f"Board: {self.current_board_barcode}. Now scan PASS/FAIL.", is_error=False)
             logging.info(f"Board barcode captured: {self.current_board_barcode}")
             self.scan_barcode_input.setFocus()
             self.scan_notes_input.setEnabled(True)
@@ -674,13 +806,15 @@ class MainWindow(QMainWindow):
 
             # Valid Status Scan - Proceed to Submit
             self.current_scan_status = status_determined 
+            if self.pipelined_scan_check.isChecked():
+                 self._enqueue_scan()
+                 return
             self.scan_status_label.setStyleSheet(f"QLabel {{ color: {status_color}; font-weight: bold; }}")
             self.scan_status_label.setText(status_msg)
             self.scan_barcode_input.clear()
             self.scan_barcode_input.setPlaceholderText("Submitting...")
             self.scan_barcode_input.setEnabled(False) # Disable input during submit
             self.scan_notes_input.setEnabled(False) # Disable notes during submit
-            QApplication.processEvents() # Update UI before potential blocking API call
 
             # --- Directly Call Submit Logic --- 
             self._submit_scan_data_now()
@@ -696,14 +830,18 @@ class MainWindow(QMainWindow):
              self._reset_scan_state()
              return
              
-        # Call the API
-        result = self.api_client.record_scan(
+        # Call the API (input stays disabled until the result arrives)
+        self.backend.call(
+            "record_scan",
             barcode=self.current_board_barcode,
             status=self.current_scan_status, 
             order_id=order_id, 
-            notes=notes if notes else None
+            notes=notes if notes else None,
+            on_result=self._on_scan_recorded,
         )
 
+    def _on_scan_recorded(self, result):
+        """Shows the outcome of a record_scan call and readies the scan tab for the next board."""
         # Re-enable inputs after API call
         self.scan_barcode_input.setEnabled(True)
         self.scan_notes_input.setEnabled(True)
@@ -711,10 +849,10 @@ class MainWindow(QMainWindow):
         if result["success"]:
             self.show_scan_status_message(f"OK: {self.current_board_barcode} -> {self.current_scan_status}. Ready for next board.", is_error=False)
             
-            # --- Sync View Data Tab (Simplified) --- 
-            # Always reload the data for the view tab in the background.
-            # The table will be updated when the user switches to that tab.
-            self._load_scans_for_view() 
+            # --- Sync View Data Tab --- 
+            # Add just this scan to the table; no reload, so the next scan never waits on it
+            self.scan_model.add_scan(result["data"]["scan"])
+            self._remember_barcode(result["data"]["scan"]["order_id"], result["data"]["scan"]["barcode"])
             # ---
             
             self._reset_scan_state() # Reset for next scan
@@ -722,6 +860,57 @@ class MainWindow(QMainWindow):
             self.show_scan_status_message(f"Submit Error: {result.get('message')}. Scan board again.", is_error=True)
             self._reset_scan_state()
             
+    def _open_scan_journal(self, journal_path):
+        """Opens the offline scan journal, or returns None (scans then queue in memory only)."""
+        if not journal_path:
+            return None
+        try:
+            return ScanJournal(journal_path, self.user_data.get("username"))
+        except Exception as e:
+            logging.error(f"Could not open scan journal '{journal_path}': {e}. Queued scans will not survive a restart.")
+            return None
+
+    def _enqueue_scan(self):
+        """Queues the completed scan for background submission and readies the tab for the next board."""
+        order_id = self.scan_order_combo.currentData()
+        if order_id is None or order_id == -1:
+             self.show_scan_status_message("Please select an order before scanning.", is_error=True)
+             self._reset_scan_state()
+             return
+        notes = self.scan_notes_input.toPlainText().strip()
+        try:
+            item = self.scan_queue.enqueue(self.current_board_barcode, self.current_scan_status, order_id, notes or None)
+        except Exception as e: # Journal write failed (disk full, file locked...)
+            logging.error(f"Could not journal scan for '{self.current_board_barcode}': {e}")
+            self.show_scan_status_message(f"Could not save scan: {e}. Scan board again.", is_error=True)
+            self._reset_scan_state()
+            return
+        self._remember_barcode(order_id, item["barcode"]) # A second scan of this board is caught before it is sent
+        entry = QListWidgetItem(f"[..] {item['barcode']}  {item['status']}  (submitting)")
+        self.recent_scans_list.insertItem(0, entry)
+        self.recent_scan_items[item["seq"]] = entry
+        while self.recent_scans_list.count() > RECENT_SCANS_SHOWN:
+             self.recent_scans_list.takeItem(self.recent_scans_list.count() - 1)
+        # Entries scrolled out of the strip are forgotten; their results are only logged
+        self.recent_scan_items = {seq: e for seq, e in self.recent_scan_items.items() if self.recent_scans_list.row(e) >= 0}
+        self._reset_scan_state()
+        self.show_scan_status_message(f"Queued: {item['barcode']} -> {item['status']}. Scan next board.", is_error=False)
+
+    def _on_queued_scan_finished(self, item, result):
+        """Shows the server's answer for one queued scan in the recent-scans strip."""
+        entry = self.recent_scan_items.pop(item["seq"], None)
+        if result["success"]:
+             text, color = f"[OK] {item['barcode']}  {item['status']}", QColor('#006400')
+             self.scan_model.add_scan(result["scan"])
+        else:
+             text, color = f"[FAIL] {item['barcode']}  {item['status']}: {result.get('message')}", QColor('red')
+             if result.get("status_code") != 409 and self.order_barcodes is not None and self.order_barcodes.order_id == item["order_id"]:
+                  self.order_barcodes.discard(item["barcode"]) # Not recorded after all
+             logging.warning(f"Queued scan for '{item['barcode']}' was rejected: {result.get('message')}")
+        if entry is not None:
+             entry.setText(text)
+             entry.setForeground(color)
+
     def _reset_scan_state(self):
         """Resets the scan tab state for the next board scan."""
         self.current_board_barcode = None
@@ -758,8 +947,9 @@ class MainWindow(QMainWindow):
               return
               
          self.admin_order_status_label.setText("Creating order...")
-         result = self.api_client.create_order(order_num, desc if desc else None)
-         
+         self.backend.call("create_order", order_num, desc if desc else None, on_result=self._on_order_created)
+
+    def _on_order_created(self, result):
          if result["success"]:
               self.admin_order_status_label.setStyleSheet("color: green;")
               self.admin_order_status_label.setText("Order created successfully!")
@@ -786,12 +976,13 @@ class MainWindow(QMainWindow):
         if dialog.exec():
             name = name_input.text().strip()
             if name:
-                 result = self.api_client.create_department(name)
-                 if result["success"]:
-                      QMessageBox.information(self, "Success", f"Department '{name}' created.")
-                      self._load_departments() # Refresh list and potentially user add/edit dialogs
-                 else:
-                      QMessageBox.warning(self, "Error", f"Could not create department: {result.get('message')}")
+                 def on_result(result):
+                      if result["success"]:
+                           QMessageBox.information(self, "Success", f"Department '{name}' created.")
+                           self._load_departments() # Refresh list and potentially user add/edit dialogs
+                      else:
+                           QMessageBox.warning(self, "Error", f"Could not create department: {result.get('message')}")
+                 self.backend.call("create_department", name, on_result=on_result)
             else:
                  QMessageBox.warning(self, "Input Error", "Department name cannot be empty.")
                  
@@ -880,22 +1071,20 @@ class MainWindow(QMainWindow):
                  QMessageBox.warning(self, "Input Error", "Password cannot be empty for new user.")
                  return
                  
-            if is_edit:
-                 # Call update API
-                 result = self.api_client.update_user(existing_user['id'], role_name=role_name, department_id=dept_id)
+            action = "updated" if is_edit else "created"
+            def on_result(result):
                  if result["success"]:
-                      QMessageBox.information(self, "Success", f"User '{username}' updated.")
+                      QMessageBox.information(self, "Success", f"User '{username}' {action}.")
                       self._load_users() # Refresh list
                  else:
-                      QMessageBox.warning(self, "Error", f"Could not update user: {result.get('message')}")
+                      QMessageBox.warning(self, "Error", f"Could not {action[:-1]} user: {result.get('message')}")
+
+            if is_edit:
+                 # Call update API
+                 self.backend.call("update_user", existing_user['id'], role_name=role_name, department_id=dept_id, on_result=on_result)
             else:
                  # Call create API
-                 result = self.api_client.create_user(username, password, role_name, department_id=dept_id)
-                 if result["success"]:
-                      QMessageBox.information(self, "Success", f"User '{username}' created.")
-                      self._load_users() # Refresh list
-                 else:
-                      QMessageBox.warning(self, "Error", f"Could not create user: {result.get('message')}")
+                 self.backend.call("create_user", username, password, role_name, department_id=dept_id, on_result=on_result)
                       
     @pyqtSlot()
     def _handle_delete_user(self):
@@ -921,19 +1110,20 @@ class MainWindow(QMainWindow):
                                      QMessageBox.StandardButton.No)
 
         if reply == QMessageBox.StandardButton.Yes:
-            result = self.api_client.delete_user(user_id)
-            if result["success"]:
-                 QMessageBox.information(self, "Success", f"User '{username}' deleted.")
-                 self._load_users() # Refresh list
-            else:
-                 QMessageBox.critical(self, "Error", f"Could not delete user: {result.get('message')}")
+            def on_result(result):
+                 if result["success"]:
+                      QMessageBox.information(self, "Success", f"User '{username}' deleted.")
+                      self._load_users() # Refresh list
+                 else:
+                      QMessageBox.critical(self, "Error", f"Could not delete user: {result.get('message')}")
+            self.backend.call("delete_user", user_id, on_result=on_result)
 
     @pyqtSlot()
     def _handle_delete_order(self):
          if not hasattr(self, 'delete_order_combo'): return # Should only be callable by Admin
          
          order_id = self.delete_order_combo.currentData()
-         order_text = self.delete_order_combo.currentText()
+         order_text = self.delete_order_combo.itemText(self.delete_order_combo.currentIndex()) # Not a half-typed search
          if order_id == -1:
               QMessageBox.warning(self, "Selection Error", "Please select a valid order to delete.")
               return
@@ -944,13 +1134,16 @@ class MainWindow(QMainWindow):
                                       QMessageBox.StandardButton.No)
 
          if reply == QMessageBox.StandardButton.Yes:
-             result = self.api_client.delete_order(order_id)
-             if result["success"]:
-                  QMessageBox.information(self, "Success", f"Order '{order_text}' deleted.")
-                  self._load_orders() # Refresh all order lists
-                  self._load_scans_for_view() # Refresh scans view
-             else:
-                  QMessageBox.critical(self, "Error", f"Could not delete order: {result.get('message')}")
+             def on_result(result):
+                  if result["success"]:
+                       QMessageBox.information(self, "Success", f"Order '{order_text}' deleted.")
+                       for picker in self._order_pickers():
+                            picker.remove_order(order_id)
+                       self._load_orders() # Refresh all order lists
+                       self._load_scans_for_view() # Refresh scans view
+                  else:
+                       QMessageBox.critical(self, "Error", f"Could not delete order: {result.get('message')}")
+             self.backend.call("delete_order", order_id, on_result=on_result)
 
     @pyqtSlot()
     def _handle_edit_scan(self):
@@ -962,11 +1155,11 @@ class MainWindow(QMainWindow):
              QMessageBox.warning(self, "Selection Error", "Please select only one scan to edit.")
              return
              
-        selected_row_index = selected_rows[0].row()
-        scan_id = int(self.view_scans_table.item(selected_row_index, 0).text())
-        current_status = self.view_scans_table.item(selected_row_index, 3).text()
-        current_notes = self.view_scans_table.item(selected_row_index, 4).text()
-        barcode = self.view_scans_table.item(selected_row_index, 1).text()
+        scan = self.scan_model.scan_at(selected_rows[0].row())
+        scan_id = scan['id']
+        current_status = scan['status']
+        current_notes = scan['notes'] or ""
+        barcode = scan['barcode']
         
         # Show Edit Scan Dialog
         dialog = QDialog(self)
@@ -997,12 +1190,13 @@ class MainWindow(QMainWindow):
                   QMessageBox.information(self, "No Change", "Scan status and notes were not changed.")
                   return
                   
-             result = self.api_client.update_scan(scan_id, status=new_status, notes=new_notes)
-             if result["success"]:
-                  QMessageBox.information(self, "Success", f"Scan {scan_id} updated.")
-                  self._load_scans_for_view() # Refresh scan list
-             else:
-                  QMessageBox.warning(self, "Error", f"Could not update scan: {result.get('message')}")
+             def on_result(result):
+                  if result["success"]:
+                       QMessageBox.information(self, "Success", f"Scan {scan_id} updated.")
+                       self._load_scans_for_view() # Refresh scan list
+                  else:
+                       QMessageBox.warning(self, "Error", f"Could not update scan: {result.get('message')}")
+             self.backend.call("update_scan", scan_id, status=new_status, notes=new_notes, on_result=on_result)
 
     @pyqtSlot()
     def _handle_delete_scan(self):
@@ -1014,9 +1208,9 @@ class MainWindow(QMainWindow):
              QMessageBox.warning(self, "Selection Error", "Please select only one scan to delete.")
              return
              
-        selected_row_index = selected_rows[0].row()
-        scan_id = int(self.view_scans_table.item(selected_row_index, 0).text())
-        barcode = self.view_scans_table.item(selected_row_index, 1).text()
+        scan = self.scan_model.scan_at(selected_rows[0].row())
+        scan_id = scan['id']
+        barcode = scan['barcode']
 
         reply = QMessageBox.question(self, "Confirm Delete Scan", 
                                      f"Are you sure you want to DELETE scan '{barcode}' (ID: {scan_id})?",
@@ -1024,12 +1218,15 @@ class MainWindow(QMainWindow):
                                      QMessageBox.StandardButton.No)
 
         if reply == QMessageBox.StandardButton.Yes:
-            result = self.api_client.delete_scan(scan_id)
-            if result["success"]:
-                 QMessageBox.information(self, "Success", f"Scan '{barcode}' deleted.")
-                 self._load_scans_for_view() # Refresh list
-            else:
-                 QMessageBox.critical(self, "Error", f"Could not delete scan: {result.get('message')}")
+            def on_result(result):
+                 if result["success"]:
+                      QMessageBox.information(self, "Success", f"Scan '{barcode}' deleted.")
+                      if self.order_barcodes is not None:
+                           self.order_barcodes.discard(barcode) # May be scanned again (the server has the final say anyway)
+                      self._load_scans_for_view() # Refresh list
+                 else:
+                      QMessageBox.critical(self, "Error", f"Could not delete scan: {result.get('message')}")
+            self.backend.call("delete_scan", scan_id, on_result=on_result)
 
     @pyqtSlot()
     def _handle_submit_feedback(self):
@@ -1065,7 +1262,14 @@ class MainWindow(QMainWindow):
     # --- Other Handlers ---
     @pyqtSlot()
     def _handle_logout(self):
-        logout_result = self.api_client.logout()
+        pending = self.scan_queue.depth()
+        if pending and self.scan_journal is None and QMessageBox.question(
+                self, "Scans Pending", f"{pending} scan(s) have not been submitted yet and will be lost. Log out anyway?"
+        ) != QMessageBox.StandardButton.Yes:
+             return
+        self.backend.call("logout", on_result=self._on_logged_out, key="logout")
+
+    def _on_logged_out(self, logout_result):
         if logout_result["success"]:
              # Don't show message box here, controller will handle window switch
              # QMessageBox.information(self, "Logout", "You have been logged out.")
@@ -1080,9 +1284,67 @@ class MainWindow(QMainWindow):
          QMessageBox.about(self, "About Label Tracker", 
                            "Label Tracker Application\nVersion 1.0\n\nDeveloped for tracking label scans.")
 
+    @pyqtSlot()
+    def _show_connection_stats_dialog(self):
+        """Shows per-endpoint API latency (p50/p95) recorded by the ApiClient transport."""
+        latency = self.api_client.latency
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Connection Statistics")
+        dialog.resize(700, 400)
+        layout = QVBoxLayout(dialog)
+        
+        settings = self.api_client.transport_settings
+        layout.addWidget(QLabel(
+            f"Server: {self.api_client.base_url} | Pool: {settings['pool_size']} connections | "
+            f"Timeouts: {settings['connect_timeout']}s connect, {settings['read_timeout']}s read | "
+            f"Retries: {settings['max_retries']}"))
+        
+        columns = ["Endpoint", "Calls", "Errors", "Mean (ms)", "p50 (ms)", "p95 (ms)", "Max (ms)"]
+        table = QTableWidget(0, len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(table)
+        
+        def refresh():
+             summary = latency.summary()
+             table.setRowCount(len(summary))
+             for row, (endpoint, stats) in enumerate(summary.items()):
+                  values = [endpoint, stats["count"], stats["errors"], stats["mean_ms"], stats["p50_ms"], stats["p95_ms"], stats["max_ms"]]
+                  for col, value in enumerate(values):
+                       table.setItem(row, col, QTableWidgetItem(str(value)))
+        
+        def save():
+             path, _ = QFileDialog.getSaveFileName(dialog, "Save Connection Statistics", "connection_stats.json", "JSON (*.json)")
+             if not path:
+                  return
+             try:
+                  latency.dump(path)
+             except OSError as e:
+                  QMessageBox.critical(dialog, "Error", f"Could not save statistics: {e}")
+        
+        def reset():
+             latency.reset()
+             refresh()
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        for text, handler in (("Refresh", refresh), ("Save...", save), ("Reset", reset)):
+             button = buttons.addButton(text, QDialogButtonBox.ButtonRole.ActionRole)
+             button.clicked.connect(handler)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        
+        refresh()
+        dialog.exec()
+
     def closeEvent(self, event):
         """Stop timers/watchers when window closes, if they exist."""
         # --- Remove log timer/watcher stop logic ---
+        self.scan_queue.stop()
+        self.change_feed.stop()
+        self.backend.shutdown() # Results arriving after close are dropped
+        if self.scan_journal is not None:
+            self.scan_journal.close() # Unsent scans stay on disk and are replayed at the next login
         super().closeEvent(event)
 
     @pyqtSlot()
@@ -1108,13 +1370,14 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.StandardButton.Yes:
             logging.info(f"Attempting to delete department ID: {dept_id} ('{dept_name}')")
-            result = self.api_client.delete_department(dept_id)
-            if result["success"]:
-                 QMessageBox.information(self, "Success", f"Department '{dept_name}' deleted.")
-                 self._load_departments() # Refresh department list
-                 self._load_users()       # Refresh user list (might show N/A for deleted dept)
-            else:
-                 QMessageBox.critical(self, "Delete Failed", f"Could not delete department: {result.get('message')}")
+            def on_result(result):
+                 if result["success"]:
+                      QMessageBox.information(self, "Success", f"Department '{dept_name}' deleted.")
+                      self._load_departments() # Refresh department list
+                      self._load_users()       # Refresh user list (might show N/A for deleted dept)
+                 else:
+                      QMessageBox.critical(self, "Delete Failed", f"Could not delete department: {result.get('message')}")
+            self.backend.call("delete_department", dept_id, on_result=on_result)
 
 # Example Usage (kept for testing, might need adjustments)
 if __name__ == '__main__':
@@ -1127,7 +1390,7 @@ if __name__ == '__main__':
         {"id": 1, "order_number": "ORD-001", "description": "Desc 1", "creator_username": "admin"},
         {"id": 2, "order_number": "ORD-002", "description": "Desc 2", "creator_username": "admin"}
     ]}}
-    dummy_client.get_scans = lambda order_id=None: {"success": True, "data": {"scans": [
+    dummy_client.get_scans = lambda order_id=None, **params: {"success": True, "data": {"scans": [
         {"id": 101, "barcode": "BC1", "timestamp": "2023-01-01T10:00:00", "status": "Pass", "notes": "", "order_id": 1, "user_id": 1, "department_id": 1, "order_number": "ORD-001", "username": "admin", "department_name": "IT"} 
     ] if order_id == 1 else []}}
     dummy_client.get_departments = lambda: {"success": True, "data": {"departments": [
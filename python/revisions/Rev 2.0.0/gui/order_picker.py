@@ -0,0 +1,196 @@
+# Searchable order combo: holds the orders matching what is typed, not every order
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QComboBox, QCompleter
+
+SEARCH_LIMIT = 50 # Orders per search, and listed before anything is typed
+SEARCH_DELAY_MS = 250 # Pause in typing before a search is sent
+CACHE_SIZE = 64 # Searches remembered by OrderSearchCache
+CACHE_TTL = 60 # Seconds a remembered search is used (orders created on other stations appear after this)
+
+
+def order_label(order):
+    return f"{order['order_number']} - {(order.get('description') or '')[:30]}..."
+
+
+class OrderSearchCache:
+    """Recent order searches (least recently used dropped first), shared by a window's pickers.
+
+    A complete result (the server had no further matches) for a prefix also answers
+    every longer prefix, filtered here, so narrowing a search needs no request.
+    """
+
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict() # lower-case prefix -> (stored at, orders, complete)
+
+    def get(self, query):
+        """Cached orders matching `query`, or None if it has to be asked for."""
+        prefix = query.strip().lower()
+        now = time.monotonic()
+        for length in range(len(prefix), -1, -1):
+            key = prefix[:length]
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            stored_at, orders, complete = entry
+            if now - stored_at > self.ttl:
+                del self._entries[key]
+                continue
+            if key == prefix:
+                self._entries.move_to_end(key)
+                return orders
+            if complete:
+                self._entries.move_to_end(key)
+                matches = [order for order in orders if order['order_number'].lower().startswith(prefix)]
+                return sorted(matches, key=lambda order: order['order_number'].lower())
+        return None
+
+    def put(self, query, orders, complete):
+        key = query.strip().lower()
+        self._entries[key] = (time.monotonic(), orders, complete)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forgets every search (after an order is created or deleted)."""
+        self._entries.clear()
+
+
+class OrderPicker(QComboBox):
+    """Editable order combo box that searches as the user types.
+
+    The combo only ever holds the orders matching the typed prefix (at most
+    SEARCH_LIMIT, from search_orders after a pause in typing, or from the shared
+    OrderSearchCache) plus the current selection, and the completer pops them up.
+    currentData() is the selected order's id, or -1 for placeholder items;
+    `fixed_items` [(text, data)] stay at the top whatever is typed (e.g. "All Orders").
+    """
+
+    def __init__(self, backend, cache, fixed_items=(), label=order_label, empty_text=None, parent=None):
+        super().__init__(parent)
+        self.backend = backend # AsyncBackend
+        self.cache = cache
+        self.fixed_items = list(fixed_items)
+        self.label = label # order dict -> item text
+        self.empty_text = empty_text # Placeholder item when there are no orders at all
+        self.setEditable(True)
+        self.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.lineEdit().setPlaceholderText("Type an order number...")
+        # The combo's own items are the matches, so the completer lists them unfiltered
+        completer = QCompleter(self.model(), self)
+        completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setCompleter(completer)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DELAY_MS)
+        self._search_timer.timeout.connect(self._search)
+        self.lineEdit().textEdited.connect(lambda _text: self._search_timer.start())
+        self.lineEdit().returnPressed.connect(self._select_first_match)
+        self.lineEdit().editingFinished.connect(self._restore_selection_text)
+
+    def set_orders(self, orders):
+        """Lists `orders` (e.g. the most recent ones); an order already selected stays selected."""
+        selected, selected_text = self.currentData(), self.itemText(self.currentIndex())
+        if self.hasFocus() and self.lineEdit().text().strip() != selected_text.strip():
+            self._search() # Mid-search (e.g. a live refresh): update the matches instead
+            return
+        keep_selected = selected not in (None, -1) and selected not in [data for _text, data in self.fixed_items]
+        # A kept selection does not change, so listeners are not told about the rebuild
+        was_blocked = self.blockSignals(keep_selected)
+        try:
+            self.clear()
+            for text, data in self.fixed_items:
+                self.addItem(text, data)
+            if keep_selected and all(order['id'] != selected for order in orders):
+                self.addItem(selected_text, selected)
+            if not orders and not keep_selected and self.empty_text:
+                self.addItem(self.empty_text, -1)
+            for order in orders:
+                self.addItem(self.label(order), order['id'])
+            if keep_selected:
+                self.setCurrentIndex(self.findData(selected))
+        finally:
+            self.blockSignals(was_blocked)
+        if keep_selected:
+            self.lineEdit().setText(self.itemText(self.currentIndex())) # clear() emptied it
+
+    def remove_order(self, order_id):
+        """Takes a deleted order out of the list (and the selection)."""
+        index = self.findData(order_id)
+        if index >= 0:
+            # Only the selected row's removal changes the selection; other rows just shift
+            was_blocked = self.blockSignals(index != self.currentIndex())
+            try:
+                self.removeItem(index)
+            finally:
+                self.blockSignals(was_blocked)
+
+    def set_error(self, text):
+        self.clear()
+        self.addItem(text, -1)
+
+    def _search(self):
+        query = self.lineEdit().text().strip()
+        if self.currentIndex() >= 0 and query == self.itemText(self.currentIndex()).strip():
+            return # The text is the selection, not a search
+        orders = self.cache.get(query)
+        if orders is not None:
+            self._show_matches(orders)
+            return
+        self.backend.call("search_orders", query, limit=SEARCH_LIMIT, key=f"order_search_{id(self)}",
+                          on_result=partial(self._on_search_result, query))
+
+    def _on_search_result(self, query, result):
+        if not result["success"]:
+            logging.warning(f"Order search for '{query}' failed: {result.get('message')}")
+            return
+        data = result["data"]
+        self.cache.put(query, data.get("orders", []), not data.get("has_more"))
+        if self.lineEdit().text().strip() == query: # Otherwise a newer search is on its way
+            self._show_matches(data.get("orders", []))
+
+    def _show_matches(self, orders):
+        """Replaces the listed orders with `orders`, leaving the selection and the typed text alone."""
+        line_edit = self.lineEdit()
+        text, cursor = line_edit.text(), line_edit.cursorPosition()
+        selected = self.currentData()
+        # The selection does not change, so listeners are not told about the row shuffle
+        was_blocked = self.blockSignals(self.count() > 0)
+        try:
+            for row in range(self.count() - 1, len(self.fixed_items) - 1, -1):
+                if row != self.currentIndex():
+                    self.removeItem(row)
+            for order in orders:
+                if order['id'] != selected:
+                    self.addItem(self.label(order), order['id'])
+        finally:
+            self.blockSignals(was_blocked)
+        line_edit.setText(text)
+        line_edit.setCursorPosition(cursor)
+        if self.hasFocus():
+            if orders:
+                self.completer().complete()
+            else:
+                self.completer().popup().hide() # Only the selection would be listed
+
+    def _select_first_match(self):
+        """Enter without picking from the list selects the first order matching the typed text."""
+        prefix = self.lineEdit().text().strip().lower()
+        if not prefix:
+            return
+        for row in range(len(self.fixed_items), self.count()):
+            if self.itemData(row) != -1 and self.itemText(row).lower().startswith(prefix):
+                self.setCurrentIndex(row)
+                self.lineEdit().setText(self.itemText(row))
+                return
+
+    def _restore_selection_text(self):
+        """Leaving the field with a half-typed search shows the selection again."""
+        if self.currentIndex() >= 0 and not self.completer().popup().isVisible():
+            self.lineEdit().setText(self.itemText(self.currentIndex()))
@@ -0,0 +1,57 @@
+# Loads the main window's first data concurrently, starting right after login
+import logging
+from functools import partial
+from PyQt6.QtCore import QObject
+
+try:
+    from .async_backend import AsyncBackend
+    from .scan_table_model import SCAN_FIELDS, PAGE_SIZE
+    from .order_picker import SEARCH_LIMIT
+except ImportError:
+    from async_backend import AsyncBackend
+    from scan_table_model import SCAN_FIELDS, PAGE_SIZE
+    from order_picker import SEARCH_LIMIT
+
+# (name, backend method, kwargs). "orders" are the most recent ones the order pickers list;
+# "scans" is the View Data table's first page for its default filter (the user's department, all orders).
+PREFETCH_CALLS = [
+    ("orders", "search_orders", {"limit": SEARCH_LIMIT}),
+    ("departments", "get_departments", {}),
+    ("scans", "get_scans", {"fields": SCAN_FIELDS, "limit": PAGE_SIZE}),
+]
+
+
+class InitialDataPrefetch(QObject):
+    """Starts the main window's initial reads in parallel as soon as credentials are accepted.
+
+    The calls overlap each other and the construction of the main window instead
+    of running after it. The window adopts `backend` (so all calls share one
+    thread pool) and collects each result with take(), which calls back
+    immediately if the result is already in, or once it arrives.
+    """
+
+    def __init__(self, api_client, parent=None):
+        super().__init__(parent)
+        self.backend = AsyncBackend(api_client, self)
+        self._results = {}
+        self._callbacks = {}
+
+    def start(self):
+        logging.info("Prefetching recent orders, departments and the first page of scans...")
+        for name, method, kwargs in PREFETCH_CALLS:
+            self.backend.call(method, on_result=partial(self._store, name), **kwargs)
+        return self
+
+    def take(self, name, callback):
+        """Hands the `name` result to callback(result), now or when it arrives (once)."""
+        if name in self._results:
+            callback(self._results.pop(name))
+        else:
+            self._callbacks[name] = callback
+
+    def _store(self, name, result):
+        callback = self._callbacks.pop(name, None)
+        if callback is not None:
+            callback(result)
+        else:
+            self._results[name] = result
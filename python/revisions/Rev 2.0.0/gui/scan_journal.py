@@ -0,0 +1,75 @@
+# Durable on-disk journal of scans not yet accepted by the server
+import datetime
+import logging
+import os
+import sqlite3
+import uuid
+
+
+class ScanJournal:
+    """Append-only SQLite journal: a scan is written here before it is submitted.
+
+    WAL with synchronous=FULL means append() returns only once the scan is on disk,
+    so a crash, power cut or network outage never loses a completed scan. Entries
+    are removed once the server has given a final answer for them. Every entry
+    carries a random idempotency key, sent with each submission, so resubmitting a
+    scan whose response was lost cannot record it twice.
+
+    Entries belong to the user who scanned them; pending() only replays the
+    current user's scans, since the server records them under the session's user.
+    """
+
+    def __init__(self, path, username):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.username = username
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=FULL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS pending_scans (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                username TEXT NOT NULL,
+                barcode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                order_id INTEGER NOT NULL,
+                notes TEXT,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        self.conn.commit()
+
+    def append(self, barcode, status, order_id, notes=None):
+        """Writes one scan durably; returns it as a queue item dict (seq, idempotency_key, ...)."""
+        item = {"idempotency_key": uuid.uuid4().hex, "barcode": barcode, "status": status,
+                "order_id": order_id, "notes": notes}
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO pending_scans (idempotency_key, username, barcode, status, order_id, notes, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (item["idempotency_key"], self.username, barcode, status, order_id, notes,
+                 datetime.datetime.now().isoformat()))
+        item["seq"] = cursor.lastrowid
+        return item
+
+    def pending(self):
+        """The current user's journaled scans, oldest first."""
+        rows = self.conn.execute(
+            'SELECT seq, idempotency_key, barcode, status, order_id, notes FROM pending_scans '
+            'WHERE username = ? ORDER BY seq', (self.username,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove(self, seqs):
+        """Drops entries the server has answered for (recorded or rejected)."""
+        if not seqs:
+            return
+        with self.conn:
+            self.conn.executemany('DELETE FROM pending_scans WHERE seq = ?', [(seq,) for seq in seqs])
+
+    def close(self):
+        try:
+            self.conn.close()
+        except sqlite3.Error as e:
+            logging.error(f"Error closing scan journal '{self.path}': {e}")
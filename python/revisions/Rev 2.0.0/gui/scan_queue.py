@@ -0,0 +1,115 @@
+# Client-side submission queue for pipelined scanning
+import itertools
+import logging
+import uuid
+from collections import deque
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+MAX_BATCH = 50 # Scans per submission; the server accepts up to 200
+RETRY_BASE_MS = 1000 # Backoff while the server cannot be reached: 1s, 2s, 4s ... up to RETRY_MAX_MS
+RETRY_MAX_MS = 60000
+
+
+class ScanSubmitQueue(QObject):
+    """Submits completed scans in the background, in order, so scanning never waits.
+
+    At most one submission is in flight. Scans completed meanwhile accumulate and go
+    out together in the next one (record_scans, one request for the whole batch), so
+    the queue drains faster the more it falls behind. A scan the server rejects
+    (duplicate, unknown order...) is finished with that result; a submission that
+    did not get through (connection error, 5xx, expired session) is retried, in
+    order, with exponential backoff.
+
+    With a ScanJournal, scans are written to disk before they are queued and only
+    removed once answered, and scans left over from an earlier session are replayed
+    on start. Each scan carries an idempotency key, so a retry after a lost response
+    gets the original scan back instead of a duplicate error.
+    """
+    scan_finished = pyqtSignal(object, object) # item, per-scan result {"success", "status_code", "scan" | "message"}
+    depth_changed = pyqtSignal(int) # Scans queued or in flight
+
+    def __init__(self, backend, journal=None, parent=None):
+        super().__init__(parent)
+        self.backend = backend # AsyncBackend
+        self.journal = journal # ScanJournal, or None to keep scans in memory only
+        self._queue = deque(journal.pending() if journal else [])
+        self._in_flight = []
+        self._seq = itertools.count(1)
+        self._failures = 0
+        self._stopped = False
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._submit_next)
+        if self._queue:
+            logging.info(f"Replaying {len(self._queue)} journaled scan(s).")
+            QTimer.singleShot(0, self._start_replay) # Once the owner has connected its slots
+
+    def depth(self):
+        return len(self._queue) + len(self._in_flight)
+
+    def enqueue(self, barcode, status, order_id, notes=None):
+        """Queues one scan; returns the item dict (its "seq" identifies it in scan_finished)."""
+        if self.journal is not None:
+            item = self.journal.append(barcode, status, order_id, notes)
+        else:
+            item = {"seq": next(self._seq), "idempotency_key": uuid.uuid4().hex, "barcode": barcode,
+                    "status": status, "order_id": order_id, "notes": notes}
+        self._queue.append(item)
+        self.depth_changed.emit(self.depth())
+        self._submit_next()
+        return item
+
+    def stop(self):
+        """Stops submitting (window closing); journaled scans stay on disk for the next session."""
+        self._stopped = True
+        self._retry_timer.stop()
+
+    def _start_replay(self):
+        self.depth_changed.emit(self.depth())
+        self._submit_next()
+
+    def _submit_next(self):
+        if self._stopped or self._in_flight or not self._queue or self._retry_timer.isActive():
+            return
+        while self._queue and len(self._in_flight) < MAX_BATCH:
+            self._in_flight.append(self._queue.popleft())
+        scans = [{key: item[key] for key in ("barcode", "status", "order_id", "notes", "idempotency_key")}
+                 for item in self._in_flight]
+        self.backend.call("record_scans", scans, on_result=self._on_submitted)
+
+    def _on_submitted(self, result):
+        if self._stopped:
+            return
+        batch, self._in_flight = self._in_flight, []
+        if not result["success"]:
+            status_code = result.get("status_code")
+            if status_code is None or status_code == 401 or status_code >= 500:
+                # Not recorded (or not known to be): put the batch back in front and resend later;
+                # the idempotency keys make a resend of scans that did get through harmless
+                self._retry_later(batch, result.get("message"))
+                return
+            # Rejected as a whole (e.g. malformed request): report it on every scan
+            results = [{"success": False, "status_code": status_code, "message": result.get("message")}] * len(batch)
+        else:
+            results = result["data"]["results"]
+        # Fewer results than scans: sent one at a time and the server failed partway
+        answered, unsent = batch[:len(results)], batch[len(results):]
+        if self.journal is not None:
+            self.journal.remove([item["seq"] for item in answered])
+        for item, scan_result in zip(answered, results):
+            self.scan_finished.emit(item, scan_result)
+        if unsent:
+            self._retry_later(unsent, "server failed partway through the batch")
+            return
+        self._failures = 0
+        self.depth_changed.emit(self.depth())
+        self._submit_next()
+
+    def _retry_later(self, items, reason):
+        """Puts unsent items back in front of the queue and resends them after a backoff."""
+        self._queue.extendleft(reversed(items))
+        delay = min(RETRY_MAX_MS, RETRY_BASE_MS * 2 ** self._failures)
+        self._failures += 1
+        logging.warning(f"Scan submission failed ({reason}); {len(self._queue)} queued, retrying in {delay} ms.")
+        self._retry_timer.start(delay)
+        self.depth_changed.emit(self.depth())
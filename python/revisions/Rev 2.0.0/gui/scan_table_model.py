@@ -0,0 +1,256 @@
+# Paged, lazily formatted table model for the View Data scans table
+import datetime
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QBrush, QColor
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+# (result key, header) per column; rows are stored as plain tuples in this order
+SCAN_COLUMNS = [
+    ("id", "ID"),
+    ("barcode", "Barcode"),
+    ("timestamp", "Timestamp"),
+    ("status", "Status"),
+    ("notes", "Notes"),
+    ("username", "User"),
+    ("department_name", "Department"),
+]
+SCAN_FIELDS = [key for key, _ in SCAN_COLUMNS]
+ID_COLUMN = SCAN_FIELDS.index("id")
+DEPARTMENT_COLUMN = SCAN_FIELDS.index("department_name")
+STATUS_COLUMN = SCAN_FIELDS.index("status")
+TIMESTAMP_COLUMN = SCAN_FIELDS.index("timestamp")
+PAGE_SIZE = 500
+
+STATUS_BRUSHES = {"Pass": QBrush(QColor('#CCFFCC')), "Fail": QBrush(QColor('#FFCCCC'))} # Light green / light red
+
+
+def format_timestamp(ts):
+    """Formats an API timestamp (ISO string, or epoch ms from MessagePack) in local time."""
+    try:
+        if isinstance(ts, (int, float)):
+            dt_obj = datetime.datetime.fromtimestamp(ts / 1000, tz=datetime.timezone.utc)
+        else:
+            dt_obj = datetime.datetime.fromisoformat(ts.replace('Z', '+00:00')) # Handle Z timezone
+            if dt_obj.tzinfo is None:
+                dt_obj = dt_obj.replace(tzinfo=datetime.timezone.utc) # Server stores naive UTC
+        return dt_obj.astimezone().strftime('%Y-%m-%d %H:%M:%S') # Convert to local timezone
+    except Exception:
+        return str(ts) # Fallback to original value
+
+
+class ScanTableModel(QAbstractTableModel):
+    """Scans fetched a page at a time as the view scrolls (canFetchMore/fetchMore).
+
+    Rows are kept as raw tuples and only formatted in data(), i.e. only for the
+    cells actually painted. Pages are requested through an AsyncBackend, so
+    fetching never blocks the UI thread.
+
+    New scans are added with add_scan() instead of reloading: a scan that directly
+    follows the newest loaded id is inserted as is; after a gap (other stations
+    scanned meanwhile) only the missing scans are fetched (get_scans after_id).
+
+    A backend with `scan_ids_unique = False` (local mode: one database per
+    department, each numbering its own scans) has rows told apart by (department,
+    id), and new scans fetched as those sorting above the newest row (after_scan).
+    """
+    load_failed = pyqtSignal(str) # Error message
+    rows_loaded = pyqtSignal(int) # Total rows loaded so far
+
+    def __init__(self, backend, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.backend = backend # AsyncBackend
+        self.page_size = page_size
+        self.params = {}
+        self._rows = []
+        self._cursor = None
+        self._has_more = False
+        self._loading = False
+        self.unique_ids = getattr(backend.backend, "scan_ids_unique", True)
+        self._keys = set() # _key()s of the loaded scans, to skip scans that are already shown
+        self._newest_id = 0 # Highest loaded id (unique ids only)
+        self._syncing = False
+        self._generation = 0 # Bumped on every reload; a prefetched page for an older one is dropped
+
+    # --- Loading ---
+    def reload(self, params=None):
+        """Clears the table and loads the first page for the given get_scans filter."""
+        self._reset(params)
+        self._request_page()
+
+    def reload_prefetched(self, params, take_page):
+        """Like reload(), but the first page comes from take_page(callback), e.g. a login prefetch."""
+        self._reset(params)
+        self._loading = True
+        generation = self._generation
+        take_page(lambda result: self._apply_page(result) if generation == self._generation else None)
+
+    def _reset(self, params):
+        self.beginResetModel()
+        self._generation += 1
+        self.params = dict(params or {})
+        self._rows = []
+        self._cursor = None
+        self._has_more = True
+        self._loading = False
+        self._keys = set()
+        self._newest_id = 0
+        self._syncing = False
+        self.backend.cancel("scan_delta")
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._request_page()
+
+    def _request_page(self):
+        self._loading = True
+        # Same key as a reload: a new filter supersedes pages still in flight for the old one
+        self.backend.call("get_scans", fields=SCAN_FIELDS, limit=self.page_size, cursor=self._cursor,
+                          on_result=self._apply_page, key="scan_page", **self.params)
+
+    def _apply_page(self, result):
+        self._loading = False
+        if not result["success"]:
+            self._has_more = False
+            self.load_failed.emit(result.get("message") or "Unknown error")
+            return
+        data = result["data"]
+        scans = [scan for scan in data.get("scans", []) if self._scan_key(scan) not in self._keys] # Already added by add_scan()
+        self._cursor = data.get("next_cursor")
+        # Servers without paging return everything at once and no cursor
+        self._has_more = self._cursor is not None
+        if scans:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(scans) - 1)
+            self._rows.extend(tuple(scan.get(key) for key in SCAN_FIELDS) for scan in scans)
+            self.endInsertRows()
+            self._remember(scans)
+        self.rows_loaded.emit(len(self._rows))
+
+    def _key(self, department_name, scan_id):
+        return scan_id if self.unique_ids else (department_name, scan_id)
+
+    def _scan_key(self, scan):
+        return self._key(scan.get("department_name"), scan["id"])
+
+    def _remember(self, scans):
+        self._keys.update(self._scan_key(scan) for scan in scans)
+        self._newest_id = max(self._newest_id, max(scan["id"] for scan in scans))
+
+    # --- Incremental updates ---
+    def matches(self, scan):
+        """True if `scan` belongs in the list for the current filter."""
+        return all(self.params.get(key) in (None, scan.get(key)) for key in ("order_id", "user_id", "department_id"))
+
+    def add_scan(self, scan):
+        """Shows a just-recorded scan (the dict returned by record_scan) without a reload."""
+        if not self.matches(scan) or self._scan_key(scan) in self._keys:
+            return
+        # Gap: scans we have not seen were recorded in between (ids that repeat across departments cannot tell)
+        if self._syncing or (self._rows and (not self.unique_ids or scan["id"] != self._newest_id + 1)):
+            self._sync_new()
+            return
+        self._prepend([scan])
+
+    def _prepend(self, scans):
+        """Inserts scans (newest first) above the loaded rows."""
+        scans = [scan for scan in scans if self._scan_key(scan) not in self._keys]
+        if not scans:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(scans) - 1)
+        self._rows[0:0] = [tuple(scan.get(key) for key in SCAN_FIELDS) for scan in scans]
+        self.endInsertRows()
+        self._remember(scans)
+        self.rows_loaded.emit(len(self._rows))
+
+    def sync_new(self):
+        """Fetches scans recorded since the newest loaded one (e.g. on other stations)."""
+        if self._loading and not self._rows:
+            return # The first page is on its way and will include them
+        self._sync_new() # Supersedes a sync in flight, which may have been sent before these scans
+
+    def remove_scans(self, ids):
+        """Drops deleted scans (server scan ids, e.g. from the change feed) from the loaded rows."""
+        ids = set(ids)
+        if not self.has_scans(ids):
+            return
+        for row in range(len(self._rows) - 1, -1, -1):
+            if self._rows[row][ID_COLUMN] in ids:
+                self._keys.discard(self._key(self._rows[row][DEPARTMENT_COLUMN], self._rows[row][ID_COLUMN]))
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+        self.rows_loaded.emit(len(self._rows))
+
+    def may_hold(self, where):
+        """True if loaded rows could match `where` (e.g. {"order_id": 5}); rows do not keep the order or user."""
+        return bool(self._rows) and all(self.params.get(key) in (None, value) for key, value in where.items())
+
+    def has_scans(self, ids):
+        """True if a scan with any of these (server) ids is loaded."""
+        if self.unique_ids:
+            return not self._keys.isdisjoint(ids)
+        ids = set(ids)
+        return any(row[ID_COLUMN] in ids for row in self._rows)
+
+    def _sync_new(self):
+        self._syncing = True
+        if self.unique_ids:
+            after = {"after_id": self._newest_id}
+        elif self._rows: # Rows are newest first
+            after = {"after_scan": [self._rows[0][TIMESTAMP_COLUMN], self._rows[0][DEPARTMENT_COLUMN], self._rows[0][ID_COLUMN]]}
+        else:
+            after = {}
+        self.backend.call("get_scans", fields=SCAN_FIELDS, limit=self.page_size, on_result=self._apply_new,
+                          key="scan_delta", **after, **self.params)
+
+    def _apply_new(self, result):
+        self._syncing = False
+        if not result["success"]:
+            self.reload(self.params)
+            return
+        data = result["data"]
+        if data.get("next_cursor") is not None:
+            self.reload(self.params) # More than a page behind: start over
+            return
+        self._prepend(data.get("scans", []))
+
+    # --- Access ---
+    def scan_at(self, row):
+        """The scan in `row` as a dict of SCAN_FIELDS."""
+        return dict(zip(SCAN_FIELDS, self._rows[row]))
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(SCAN_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return SCAN_COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole) or not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if value is None:
+            return ""
+        if index.column() == TIMESTAMP_COLUMN:
+            return format_timestamp(value)
+        return str(value)
+
+
+class StatusColorDelegate(QStyledItemDelegate):
+    """Paints the status cell's background from its text (no per-cell QColor objects)."""
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        brush = STATUS_BRUSHES.get(index.data())
+        if brush is not None:
+            option.backgroundBrush = brush
@@ -0,0 +1,152 @@
+# HTTP transport for ApiClient: pooled keep-alive session, retries, per-endpoint latency, event streams
+import json
+import re
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING # Encodings urllib3 can decode (br if brotli is installed)
+from urllib3.util.retry import Retry
+
+# Defaults, overridable from the [Transport] section of gui_config.ini
+DEFAULT_SETTINGS = {
+    "pool_size": 6, # Keep-alive connections per host; also ApiClient.max_concurrent_calls. Keep below the server's ADMISSION_READ_LIMIT
+    "connect_timeout": 3.05, # Seconds to establish a connection (just over a TCP retransmit window)
+    "read_timeout": 30.0, # Seconds to wait for response data
+    "max_retries": 3, # Connection failures (any method) and 502/504 responses (idempotent methods)
+    "backoff_factor": 0.5, # Retry delays of 0.5s, 1s, 2s ...
+    "compress": True, # Ask for compressed responses (br/gzip/deflate)
+}
+RETRY_STATUSES = (502, 504) # Gateway errors; 503 + Retry-After is handled by ApiClient itself
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+LATENCY_SAMPLES = 2048 # Most recent calls kept per endpoint for percentiles
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+def build_session(settings):
+    """A requests Session with a sized connection pool and a retry policy.
+
+    Connection errors are retried for every method, since the request never
+    reached the server. Read timeouts and gateway errors are only retried for
+    idempotent methods; POSTs that may have been processed are left to the
+    caller (scan submissions carry idempotency keys for that).
+    """
+    retry = Retry(
+        total=settings["max_retries"],
+        connect=settings["max_retries"],
+        read=settings["max_retries"],
+        status=settings["max_retries"],
+        backoff_factor=settings["backoff_factor"],
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        raise_on_status=False, # Hand the last response back instead of raising
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=settings["pool_size"], max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if settings["compress"]:
+        # Advertise compressed responses explicitly; requests/urllib3 decompress transparently
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    else:
+        session.headers['Accept-Encoding'] = 'identity'
+    return session
+
+
+class EventStream:
+    """An open server-sent event stream (GET /stream).
+
+    Iterating yields (event_type, data) as events arrive, blocking in between
+    (the server sends a heartbeat comment every 15 s), and ends when the server
+    closes the stream. close() may be called from any thread; a read blocked on
+    another thread then fails with an exception.
+    """
+
+    def __init__(self, response, session):
+        self.response = response
+        self.session = session # Dedicated to this stream, so it never holds a pooled API connection
+        response.encoding = 'utf-8'
+
+    def __iter__(self):
+        event_type, data_lines = "message", []
+        # chunk_size=None: hand over lines as they arrive instead of waiting for a full buffer
+        for line in self.response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line: # Blank line ends an event
+                if data_lines:
+                    yield event_type, json.loads("\n".join(data_lines))
+                event_type, data_lines = "message", []
+            elif line.startswith(':'):
+                continue # Comment (connected, heartbeat)
+            else:
+                field, _, value = line.partition(':')
+                value = value[1:] if value.startswith(' ') else value
+                if field == 'event':
+                    event_type = value
+                elif field == 'data':
+                    data_lines.append(value)
+
+    def close(self):
+        self.response.close()
+        self.session.close()
+
+
+def endpoint_key(method, endpoint):
+    """Groups calls by route: ("GET", "orders/12/barcodes") -> "GET orders/{id}/barcodes"."""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', '/' + endpoint.strip('/'))[1:]}"
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class LatencyStats:
+    """Per-endpoint call latency (wall time including retries); thread-safe."""
+
+    def __init__(self, max_samples=LATENCY_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._counts = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds, error=False):
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.max_samples)
+                self._counts[key] = 0
+                self._errors[key] = 0
+            self._samples[key].append(seconds)
+            self._counts[key] += 1
+            self._errors[key] += bool(error)
+
+    def summary(self):
+        """{endpoint: {count, errors, mean_ms, p50_ms, p95_ms, max_ms}}, slowest p95 first."""
+        with self._lock:
+            snapshot = {key: (sorted(samples), self._counts[key], self._errors[key])
+                        for key, samples in self._samples.items()}
+        result = {}
+        for key, (values, count, errors) in snapshot.items():
+            result[key] = {
+                "count": count,
+                "errors": errors,
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                "p50_ms": round(_percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(_percentile(values, 0.95) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+            }
+        return dict(sorted(result.items(), key=lambda item: item[1]["p95_ms"], reverse=True))
+
+    def dump(self, path):
+        """Writes summary() to `path` as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"generated_at": time.strftime('%Y-%m-%d %H:%M:%S'), "endpoints": self.summary()}, f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._errors.clear()
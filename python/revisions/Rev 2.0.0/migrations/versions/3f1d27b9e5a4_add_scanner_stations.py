@@ -0,0 +1,41 @@
+"""Add scanner stations
+
+Revision ID: 3f1d27b9e5a4
+Revises: 74c023bc07fc
+Create Date: 2026-10-18 13:05:22.481730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1d27b9e5a4'
+down_revision = '74c023bc07fc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('stations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stations_token_hash'), ['token_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('stations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stations_token_hash'))
+
+    op.drop_table('stations')
@@ -0,0 +1,26 @@
+"""Add scans (department_id, timestamp) index
+
+Revision ID: 5d2e8a61c7f3
+Revises: b81e4c0f2d69
+Create Date: 2026-10-18 16:41:37.205518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8a61c7f3'
+down_revision = 'b81e4c0f2d69'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scans', schema=None) as batch_op:
+        batch_op.create_index('ix_scans_department_id_timestamp', ['department_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scans', schema=None) as batch_op:
+        batch_op.drop_index('ix_scans_department_id_timestamp')
@@ -0,0 +1,54 @@
+"""Cascade deletes for scans and comments
+
+Revision ID: 6c9acccd63e7
+Revises: ae0b6924c645
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c9acccd63e7'
+down_revision = 'ae0b6924c645'
+branch_labels = None
+depends_on = None
+
+# The initial migration created unnamed foreign keys. PostgreSQL names them
+# <table>_<column>_fkey; for SQLite batch mode reflects them under this convention.
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+# (table, column, referred table) for every FK that should cascade on delete
+CASCADE_FKS = [
+    ('scans', 'order_id', 'orders'),
+    ('scans', 'user_id', 'users'),
+    ('comments', 'order_id', 'orders'),
+    ('comments', 'scan_id', 'scans'),
+]
+
+
+def _fk_name(table, column, referred):
+    if op.get_bind().dialect.name == 'postgresql':
+        return f'{table}_{column}_fkey'
+    return naming_convention['fk'] % {
+        'table_name': table, 'column_0_name': column, 'referred_table_name': referred
+    }
+
+
+def _recreate_fks(ondelete):
+    for table, column, referred in CASCADE_FKS:
+        name = _fk_name(table, column, referred)
+        with op.batch_alter_table(table, schema=None, naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _recreate_fks('CASCADE')
+
+
+def downgrade():
+    _recreate_fks(None)
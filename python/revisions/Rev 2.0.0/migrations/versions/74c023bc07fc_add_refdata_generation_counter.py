@@ -0,0 +1,30 @@
+"""Add reference data generation counter
+
+Revision ID: 74c023bc07fc
+Revises: 6c9acccd63e7
+Create Date: 2026-10-18 10:41:07.552913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '74c023bc07fc'
+down_revision = '6c9acccd63e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    refdata_generation = op.create_table('refdata_generation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # The single row the API workers compare against
+    op.bulk_insert(refdata_generation, [{'id': 1, 'value': 0}])
+
+
+def downgrade():
+    op.drop_table('refdata_generation')
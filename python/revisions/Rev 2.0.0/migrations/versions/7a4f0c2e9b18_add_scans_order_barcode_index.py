@@ -0,0 +1,26 @@
+"""Add scans (order_id, barcode) index
+
+Revision ID: 7a4f0c2e9b18
+Revises: e3c9a7b1d054
+Create Date: 2026-10-18 22:31:08.402177
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4f0c2e9b18'
+down_revision = 'e3c9a7b1d054'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scans', schema=None) as batch_op:
+        batch_op.create_index('ix_scans_order_id_barcode', ['order_id', 'barcode'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('scans', schema=None) as batch_op:
+        batch_op.drop_index('ix_scans_order_id_barcode')
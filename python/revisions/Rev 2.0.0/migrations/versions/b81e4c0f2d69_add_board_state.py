@@ -0,0 +1,57 @@
+"""Add board state
+
+Revision ID: b81e4c0f2d69
+Revises: 3f1d27b9e5a4
+Create Date: 2026-10-18 14:22:09.734118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81e4c0f2d69'
+down_revision = '3f1d27b9e5a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('board_state',
+    sa.Column('barcode', sa.String(length=256), nullable=False),
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    # The scanstatus type already exists (scans.status)
+    sa.Column('status', postgresql.ENUM('PASS', 'FAIL', name='scanstatus', create_type=False), nullable=False),
+    sa.Column('last_scan_at', sa.DateTime(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('last_scan_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['last_scan_id'], ['scans.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('barcode'),
+    sa.UniqueConstraint('last_scan_id')
+    )
+    with op.batch_alter_table('board_state', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_board_state_department_id'), ['department_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_board_state_order_id'), ['order_id'], unique=False)
+
+    # Backfill from history: each board's latest scan
+    op.execute("""
+        INSERT INTO board_state (barcode, department_id, status, last_scan_at, order_id, last_scan_id)
+        SELECT barcode, department_id, status, timestamp, order_id, id
+        FROM (
+            SELECT id, barcode, department_id, status, timestamp, order_id,
+                   ROW_NUMBER() OVER (PARTITION BY barcode ORDER BY timestamp DESC, id DESC) AS rank
+            FROM scans
+        ) ranked
+        WHERE rank = 1
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('board_state', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_board_state_order_id'))
+        batch_op.drop_index(batch_op.f('ix_board_state_department_id'))
+
+    op.drop_table('board_state')
@@ -0,0 +1,29 @@
+"""Add orders lower(order_number) index for prefix search
+
+Revision ID: c4b8e2f1a6d3
+Revises: 7a4f0c2e9b18
+Create Date: 2026-10-18 23:52:14.613920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4b8e2f1a6d3'
+down_revision = '7a4f0c2e9b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /orders/search matches lower(order_number) LIKE 'prefix%'; PostgreSQL only
+    # uses a b-tree for LIKE under the C collation or with pattern ops
+    expression = 'lower(order_number)'
+    if op.get_bind().dialect.name == 'postgresql':
+        expression += ' varchar_pattern_ops'
+    op.create_index('ix_orders_order_number_lower', 'orders', [sa.text(expression)], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_orders_order_number_lower', table_name='orders')
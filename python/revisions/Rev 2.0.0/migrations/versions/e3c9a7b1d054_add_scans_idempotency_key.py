@@ -0,0 +1,28 @@
+"""Add scans.idempotency_key
+
+Revision ID: e3c9a7b1d054
+Revises: 5d2e8a61c7f3
+Create Date: 2026-10-18 22:14:52.731940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3c9a7b1d054'
+down_revision = '5d2e8a61c7f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scans', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_scans_idempotency_key'), ['idempotency_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('scans', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_scans_idempotency_key'))
+        batch_op.drop_column('idempotency_key')
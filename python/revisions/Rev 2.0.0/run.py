@@ -14,7 +14,7 @@ print(f"[run.py Debug] .env loaded: {loaded}")
 # --- End Environment Loading ---
 
 from api import create_app, db
-from api.models import User, Order, Scan, Role, Department, Comment # Import ALL models
+from api.models import User, Order, Scan, Role, Department, Comment, RefDataGeneration, Station, BoardState # Import ALL models
 from flask_migrate import Migrate
 
 app = create_app() # create_app will now use config potentially already populated by loaded env vars
@@ -24,7 +24,8 @@ migrate = Migrate(app, db)
 @app.shell_context_processor
 def make_shell_context():
     return {'db': db, 'User': User, 'Role': Role, 'Department': Department,
-            'Order': Order, 'Scan': Scan, 'Comment': Comment}
+            'Order': Order, 'Scan': Scan, 'Comment': Comment, 'Station': Station,
+            'BoardState': BoardState}
 
 # --- Custom CLI Commands ---
 @app.cli.command("seed")
@@ -46,6 +47,109 @@ def seed_data(admin_pass):
         Role.insert_roles() # Create roles first
         User.create_admin() # Create admin user
     print("Database seeding complete.")
+
+@app.cli.command("scan-listener")
+@click.option('--host', help='Interface to listen on (default: SCAN_LISTENER_HOST).')
+@click.option('--port', type=int, help='TCP port (default: SCAN_LISTENER_PORT).')
+def scan_listener(host, port):
+    """Runs the TCP line-protocol listener for fixed-mount scanners."""
+    from api.scan_listener import run_listener
+    run_listener(app,
+                 host or app.config['SCAN_LISTENER_HOST'],
+                 port or app.config['SCAN_LISTENER_PORT'],
+                 app.config['SCAN_LISTENER_BATCH_SIZE'])
+
+@app.cli.command("station-add")
+@click.argument('name')
+@click.option('--user', 'username', required=True, help='User the station records scans as (scans go to their department).')
+@click.option('--order', 'order_number', help='Order the station scans into.')
+def station_add(name, username, order_number):
+    """Registers a scanner station and prints its token."""
+    with app.app_context():
+        user = db.session.scalars(db.select(User).filter_by(username=username)).first()
+        if not user:
+            raise click.ClickException(f"User '{username}' not found.")
+        if not user.department_id:
+            raise click.ClickException(f"User '{username}' has no department and cannot record scans.")
+        order = None
+        if order_number:
+            order = db.session.scalars(db.select(Order).filter_by(order_number=order_number)).first()
+            if not order:
+                raise click.ClickException(f"Order '{order_number}' not found.")
+        if db.session.scalars(db.select(Station).filter_by(name=name)).first():
+            raise click.ClickException(f"Station '{name}' already exists.")
+        station = Station(name=name, user=user, order=order)
+        token = station.issue_token()
+        db.session.add(station)
+        db.session.commit()
+    print(f"Station '{name}' created. Token (shown only once): {token}")
+
+@app.cli.command("station-order")
+@click.argument('name')
+@click.argument('order_number')
+def station_order(name, order_number):
+    """Points a scanner station at a different order."""
+    with app.app_context():
+        station = db.session.scalars(db.select(Station).filter_by(name=name)).first()
+        if not station:
+            raise click.ClickException(f"Station '{name}' not found.")
+        order = db.session.scalars(db.select(Order).filter_by(order_number=order_number)).first()
+        if not order:
+            raise click.ClickException(f"Order '{order_number}' not found.")
+        station.order = order
+        db.session.commit()
+    print(f"Station '{name}' now scans into order '{order_number}'.")
+
+@app.cli.command("rebuild-board-state")
+def rebuild_board_state():
+    """Recomputes every board's current location from scan history."""
+    from api import board_state
+    with app.app_context():
+        count = board_state.rebuild()
+        db.session.commit()
+    print(f"Board state rebuilt for {count} boards.")
+
+@app.cli.command("analytics")
+@click.argument('report', type=click.Choice(['yield', 'throughput', 'hourly-profile', 'fail-rate']))
+@click.option('--days', default=30, show_default=True, help='How many days back to include.')
+@click.option('--by', type=click.Choice(['department', 'user', 'order']), help='Group throughput/fail-rate by this.')
+@click.option('--bucket', type=click.Choice(['hour', 'day', 'week']), default='day', show_default=True)
+@click.option('--utc-offset', default=0, help='Plant time zone in minutes east of UTC (for hour/day boundaries).')
+@click.option('--live', is_flag=True, help='Query the scans table even if a snapshot is configured.')
+def analytics_report(report, days, by, bucket, utc_offset, live):
+    """Prints a scan analytics report (yield, throughput, hourly profile, fail rate)."""
+    from datetime import datetime, timedelta, timezone
+    from api import analytics
+    from api.snapshot import open_snapshot
+    with app.app_context():
+        start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+        snapshot_dir = app.config.get('SCAN_SNAPSHOT_DIR')
+        snapshot = open_snapshot(snapshot_dir) if snapshot_dir and not live else None
+        cols = snapshot.columns().matching(start=start) if snapshot else analytics.load_columns(start=start)
+        headers, rows = analytics.report_table(report, cols, by=f"{by}_id" if by else None,
+                                               bucket_seconds=analytics.BUCKETS[bucket],
+                                               utc_offset_seconds=utc_offset * 60, snapshot=snapshot)
+    source = f"snapshot up to scan {snapshot.watermark_id}" if snapshot else "live"
+    print(f"{report} over {len(cols):,} scans (last {days} days, {source})")
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for line in [headers, *rows]:
+        print("  ".join(str(value).rjust(width) for value, width in zip(line, widths)))
+
+@app.cli.command("snapshot-scans")
+@click.option('--dir', 'directory', help='Snapshot directory (default: SCAN_SNAPSHOT_DIR).')
+@click.option('--rebuild', is_flag=True, help='Start over (picks up edited and deleted scans).')
+def snapshot_scans(directory, rebuild):
+    """Appends new scans to the columnar reporting snapshot."""
+    from api.snapshot import export_scans, SnapshotError
+    directory = directory or app.config.get('SCAN_SNAPSHOT_DIR')
+    if not directory:
+        raise click.ClickException("No snapshot directory: set SCAN_SNAPSHOT_DIR or pass --dir.")
+    with app.app_context():
+        try:
+            appended = export_scans(directory, lag_seconds=app.config['SCAN_SNAPSHOT_LAG_SECONDS'], rebuild=rebuild)
+        except SnapshotError as e:
+            raise click.ClickException(str(e))
+    print(f"Snapshot in {directory} updated: {appended:,} scans appended.")
 # --- End Custom CLI Commands ---
 
 if __name__ == '__main__':
@@ -8,11 +8,15 @@ from PyQt6.QtWidgets import QApplication
 from gui.login_window import LoginWindow
 from gui.main_window import MainWindow
 from gui.api_client import ApiClient
+from gui.transport import DEFAULT_SETTINGS
+from gui.prefetch import InitialDataPrefetch
 
 # --- Logging Setup --- 
 
 # Define the directory for feedback (logs are removed)
 FEEDBACK_DIR = "errors-feedback"
+# Station data (the offline scan journal)
+DATA_DIR = "station-data"
 
 def setup_logging():
     """Configures logging to console ONLY."""
@@ -48,6 +52,10 @@ def get_feedback_file_path():
     os.makedirs(FEEDBACK_DIR, exist_ok=True)
     return os.path.abspath(os.path.join(FEEDBACK_DIR, 'user_feedback.txt'))
 
+def get_scan_journal_path():
+    """Returns the absolute path for the offline scan journal (SQLite)."""
+    return os.path.abspath(os.path.join(DATA_DIR, 'scan_journal.db'))
+
 # --- Function to Read GUI Configuration (Keep as is) ---
 def load_gui_config():
     """Reads configuration from gui_config.ini."""
@@ -69,15 +77,41 @@ def load_gui_config():
         logging.error(f"Error reading {config_file}: {e}. Using default API URL: {default_url}")
         return default_url
 
+def load_transport_config():
+    """Reads optional [Transport] overrides (see gui/transport.py DEFAULT_SETTINGS) from gui_config.ini."""
+    config = configparser.ConfigParser()
+    config_file = 'gui_config.ini'
+    settings = {}
+    if not os.path.exists(config_file):
+        return settings
+    try:
+        config.read(config_file)
+        if config.has_section('Transport'):
+            for name, default in DEFAULT_SETTINGS.items():
+                if not config.has_option('Transport', name):
+                    continue
+                if isinstance(default, bool):
+                    settings[name] = config.getboolean('Transport', name)
+                elif isinstance(default, int):
+                    settings[name] = config.getint('Transport', name)
+                else:
+                    settings[name] = config.getfloat('Transport', name)
+        if settings:
+            logging.info(f"Read transport settings from {config_file}: {settings}")
+    except Exception as e:
+        logging.error(f"Error reading [Transport] from {config_file}: {e}. Using default transport settings.")
+        return {}
+    return settings
+
 # --- Application Controller --- 
 class ApplicationController:
     """Manages the flow between login and main windows."""
 
-    def __init__(self, api_base_url):
-        """Initializes the controller with the API base URL."""
+    def __init__(self, api_base_url, transport_settings=None):
+        """Initializes the controller with the API base URL and optional transport settings."""
         logging.info(f"Initializing ApplicationController with API base URL: {api_base_url}")
         # Initialize the API client with the loaded URL
-        self.api_client = ApiClient(base_url=api_base_url) 
+        self.api_client = ApiClient(base_url=api_base_url, **(transport_settings or {})) 
         
         self.login_window = None
         self.main_window = None
@@ -103,6 +137,9 @@ class ApplicationController:
         Args:
             user_data (dict): Data about the logged-in user received from LoginWindow.
         """
+        # 0. Start the initial reads right away, in parallel; they overlap building the window
+        prefetch = InitialDataPrefetch(self.api_client).start()
+
         if self.login_window:
             # 1. Show loading state on LoginWindow
             logging.info("Login successful, showing loading state on login window...")
@@ -111,7 +148,8 @@ class ApplicationController:
         
         # 2. Create MainWindow (this takes time as it loads data)
         logging.info("Creating MainWindow instance and loading initial data...")
-        self.main_window = MainWindow(user_data, self.api_client, get_feedback_file_path) 
+        self.main_window = MainWindow(user_data, self.api_client, get_feedback_file_path,
+                                      journal_path=get_scan_journal_path(), prefetch=prefetch)
         
         # 3. Hide LoginWindow *after* MainWindow is ready
         if self.login_window:
@@ -136,6 +174,7 @@ if __name__ == '__main__':
 
     # 3. Load GUI Configuration (API URL)
     api_url = load_gui_config()
+    transport_settings = load_transport_config()
     
     # 4. Create Qt Application
     app = QApplication(sys.argv)
@@ -143,7 +182,7 @@ if __name__ == '__main__':
     logging.info("Starting EMS Scan Application...") # Log application start
     
     # 5. Create the controller (passing the loaded URL) and run the app
-    controller = ApplicationController(api_base_url=api_url)
+    controller = ApplicationController(api_base_url=api_url, transport_settings=transport_settings)
     controller.run() # Start by showing the login window
     
     # 6. Start the Qt event loop